@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AuthAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'auth_service.auth_app'
+
+    def ready(self):
+        from dodo_backend.metrics import register_collector
+        from . import signals  # noqa: F401
+        from .throttling import collect_throttle_metrics
+
+        register_collector(collect_throttle_metrics)
@@ -0,0 +1,67 @@
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.views import View
+from rest_framework.exceptions import ParseError, Throttled
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.request import Request
+
+from dodo_backend.aio import run_in_background
+from .delivery import adeliver_otp
+from .otp_store import get_otp_store
+from .serializers import SendOTPSerializer
+from .views import SendOTPView
+
+
+class AsyncSendOTPView(View):
+    """
+    Async variant of `SendOTPView` for ASGI deployments (ASYNC_VIEWS=True).
+
+    Same request, responses and throttles, but the OTP is handed to MSG91
+    from the event loop over a pooled aiohttp session instead of occupying
+    a delivery thread.
+    """
+    throttle_classes = SendOTPView.throttle_classes
+    throttle_scope = SendOTPView.throttle_scope
+    parsers = [JSONParser(), FormParser(), MultiPartParser()]
+
+    def check_throttles(self, request):
+        """Return the waits of the throttles that reject the request; empty if allowed."""
+        waits = []
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not throttle.allow_request(request, self):
+                waits.append(throttle.wait())
+        return waits
+
+    async def post(self, request):
+        request = Request(request, parsers=self.parsers)
+        try:
+            data = request.data
+        except ParseError as e:
+            return JsonResponse({'detail': e.detail}, status=e.status_code)
+
+        waits = await sync_to_async(self.check_throttles, thread_sensitive=False)(request)
+        if waits:
+            wait = max((wait for wait in waits if wait is not None), default=None)
+            throttled = Throttled(wait)
+            response = JsonResponse({'detail': throttled.detail}, status=throttled.status_code)
+            if wait:
+                response['Retry-After'] = str(int(wait))
+            return response
+
+        serializer = SendOTPSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=400)
+
+        mobile = serializer.validated_data['mobile']
+
+        # Generate OTP
+        otp = await get_otp_store().aissue(mobile)
+
+        # Deliver in the background on this event loop
+        run_in_background(adeliver_otp(mobile, otp))
+
+        return JsonResponse({
+            'message': 'OTP sent successfully',
+            'mobile': mobile
+        })
@@ -0,0 +1,65 @@
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+
+class LazyTokenUser(TokenUser):
+    """
+    A user built from the claims of a validated access token.
+
+    `id`, `user_type`, `is_staff`, `is_superuser` and `is_active` are read
+    straight from the token. Any other attribute (mobile, email, profiles...)
+    loads the `User` row on first access and is served from it afterwards.
+    """
+
+    @cached_property
+    def id(self):
+        return get_user_model()._meta.pk.to_python(self.token[api_settings.USER_ID_CLAIM])
+
+    @cached_property
+    def pk(self):
+        return self.id
+
+    @cached_property
+    def user_type(self):
+        return self.token.get('user_type')
+
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', True)
+
+    @cached_property
+    def instance(self):
+        """The backing `User` row, fetched once per request."""
+        return get_user_model().objects.get(pk=self.id)
+
+    def __str__(self):
+        return str(self.instance)
+
+    def __getattr__(self, attr):
+        # Only called for attributes not found on the token user itself
+        if attr.startswith('_') or attr == 'token':
+            raise AttributeError(attr)
+        return getattr(self.instance, attr)
+
+
+class StatelessJWTAuthentication(JWTStatelessUserAuthentication):
+    """
+    JWT authentication that trusts the claims embedded by `ClaimsRefreshToken`
+    instead of loading the user from the database on every request.
+
+    Deactivating a user takes effect once their current access token expires,
+    since `TokenRefreshView` re-reads the claims from the database.
+    """
+
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        return user
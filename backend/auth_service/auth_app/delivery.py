@@ -0,0 +1,36 @@
+import asyncio
+import logging
+
+from django.conf import settings
+
+from .gateways import SMSGatewayError, get_sms_gateway
+
+logger = logging.getLogger(__name__)
+
+
+async def adeliver_otp(mobile, otp):
+    """
+    Send an OTP from an ASGI event loop, retrying transient failures with
+    exponential backoff. Returns True if the gateway accepted it. The
+    synchronous path queues `auth_app.tasks.send_otp` instead.
+    """
+    gateway = get_sms_gateway()
+    attempts = settings.OTP_DELIVERY_MAX_RETRIES + 1
+
+    for attempt in range(1, attempts + 1):
+        try:
+            await gateway.asend_otp(mobile, otp)
+            return True
+        except SMSGatewayError as e:
+            if not e.retryable or attempt == attempts:
+                logger.error(f"Error sending OTP to {mobile} (attempt {attempt}): {str(e)}")
+                return False
+            delay = settings.OTP_DELIVERY_BACKOFF * (2 ** (attempt - 1))
+            logger.warning(f"Retrying OTP to {mobile} in {delay}s after: {str(e)}")
+            await asyncio.sleep(delay)
+        except Exception:
+            logger.exception(f"Unexpected error sending OTP to {mobile}")
+            return False
+
+    return False
+
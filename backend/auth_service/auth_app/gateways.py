@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import threading
+from functools import lru_cache
+
+import aiohttp
+import requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils.module_loading import import_string
+from requests.adapters import HTTPAdapter
+
+from dodo_backend.aio import get_client_session
+from dodo_backend.metrics import track_external
+
+logger = logging.getLogger(__name__)
+
+
+class SMSGatewayError(Exception):
+    """Raised when a gateway fails to accept a message."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class BaseSMSGateway:
+    """Interface for OTP delivery gateways."""
+
+    def send_otp(self, mobile, otp):
+        raise NotImplementedError
+
+    async def asend_otp(self, mobile, otp):
+        """Async variant of `send_otp`; runs it in a worker thread unless overridden."""
+        return await sync_to_async(self.send_otp, thread_sensitive=False)(mobile, otp)
+
+
+def split_mobile(mobile):
+    """Return (country_code, number) for a mobile number, defaulting to India (91)."""
+    # Remove country code if present
+    if mobile.startswith('+'):
+        mobile = mobile[1:]
+
+    country_code = '91'
+    if len(mobile) > 10:
+        country_code = mobile[:-10]
+        mobile = mobile[-10:]
+
+    return country_code, mobile
+
+
+class MSG91Gateway(BaseSMSGateway):
+    """
+    Sends OTPs through the MSG91 API over a persistent, pooled HTTP session
+    with bounded connect/read timeouts.
+    """
+
+    def __init__(self):
+        self.url = settings.MSG91_API_URL
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=settings.OTP_DELIVERY_WORKERS,
+        )
+        self.session.mount('https://', adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+        self.timeout = (settings.MSG91_CONNECT_TIMEOUT, settings.MSG91_READ_TIMEOUT)
+
+    def build_payload(self, mobile, otp):
+        country_code, number = split_mobile(mobile)
+
+        return {
+            "template_id": settings.MSG91_TEMPLATE_ID,
+            "mobile": f"{country_code}{number}",
+            "authkey": settings.MSG91_AUTH_KEY,
+            "otp": otp,
+            "sender": settings.MSG91_SENDER_ID
+        }
+
+    def check_response(self, status_code, text):
+        if status_code != 200:
+            # Client errors (bad number, bad template) will not succeed on retry
+            retryable = status_code >= 500 or status_code == 429
+            raise SMSGatewayError(f"MSG91 API error: {text}", retryable=retryable)
+
+    def send_otp(self, mobile, otp):
+        try:
+            with track_external('msg91'):
+                response = self.session.post(self.url, json=self.build_payload(mobile, otp), timeout=self.timeout)
+        except requests.RequestException as e:
+            raise SMSGatewayError(f"MSG91 request failed: {e}")
+
+        self.check_response(response.status_code, response.text)
+        return response.json()
+
+    async def asend_otp(self, mobile, otp):
+        """Send over the event loop's pooled aiohttp session instead of a thread."""
+        session = get_client_session('msg91', limit=settings.OTP_DELIVERY_WORKERS)
+        timeout = aiohttp.ClientTimeout(sock_connect=self.timeout[0], sock_read=self.timeout[1])
+
+        try:
+            with track_external('msg91'):
+                async with session.post(self.url, json=self.build_payload(mobile, otp), timeout=timeout) as response:
+                    text = await response.text()
+                    self.check_response(response.status, text)
+                    return await response.json(content_type=None)
+        except aiohttp.ClientError as e:
+            raise SMSGatewayError(f"MSG91 request failed: {e}")
+        except asyncio.TimeoutError:
+            raise SMSGatewayError("MSG91 request timed out")
+
+
+class LocalSMSGateway(BaseSMSGateway):
+    """
+    Keeps messages in memory instead of sending them. For tests and local
+    development: set OTP_SMS_GATEWAY=auth_service.auth_app.gateways.LocalSMSGateway.
+    """
+
+    def __init__(self):
+        self.outbox = []
+        self._lock = threading.Lock()
+
+    def send_otp(self, mobile, otp):
+        with self._lock:
+            self.outbox.append({'mobile': mobile, 'otp': otp})
+        logger.info(f"OTP for {mobile} kept in local outbox")
+        return {'type': 'success'}
+
+
+@lru_cache(maxsize=None)
+def get_sms_gateway():
+    """Return the process-wide gateway configured by OTP_SMS_GATEWAY."""
+    return import_string(settings.OTP_SMS_GATEWAY)()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from auth_service.auth_app.models import OTP
+
+
+class Command(BaseCommand):
+    help = 'Delete expired and already verified OTPs from the OTP table'
+
+    def handle(self, *args, **options):
+        deleted = OTP.purge()
+        self.stdout.write(self.style.SUCCESS(f'Purged {deleted} OTP rows'))
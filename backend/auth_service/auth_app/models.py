@@ -1,7 +1,7 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import F
 from django.utils import timezone
-import random
-import string
 from datetime import timedelta
 
 
@@ -9,23 +9,31 @@ class OTP(models.Model):
     mobile = models.CharField(max_length=15)
     otp = models.CharField(max_length=6)
     is_verified = models.BooleanField(default=False)
+    attempts = models.PositiveSmallIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
 
+    class Meta:
+        indexes = [
+            # Send replaces by mobile, verify looks up live OTPs by mobile and expiry
+            models.Index(fields=['mobile', 'expires_at'], name='otp_mobile_expires_idx'),
+            # purge() removes expired and verified OTPs
+            models.Index(fields=['expires_at'], name='otp_expires_at_idx'),
+            models.Index(fields=['id'], condition=models.Q(is_verified=True), name='otp_verified_idx'),
+        ]
+
     def __str__(self):
         return f"OTP for {self.mobile}: {self.otp}"
 
     def save(self, *args, **kwargs):
-        # Set expiration time to 10 minutes from creation
+        # Set expiration time to OTP_TTL seconds (10 minutes by default) from creation
         if not self.expires_at:
-            self.expires_at = timezone.now() + timedelta(minutes=10)
+            self.expires_at = timezone.now() + timedelta(seconds=settings.OTP_TTL)
         super().save(*args, **kwargs)
 
     @classmethod
-    def generate_otp(cls, mobile):
-        # Generate a 6-digit OTP
-        otp = ''.join(random.choices(string.digits, k=6))
-
+    def generate_otp(cls, mobile, otp):
+        """Store `otp`, from otp_store.generate_code, as the mobile's only OTP."""
         # Delete any existing OTPs for this mobile number
         cls.objects.filter(mobile=mobile).delete()
 
@@ -38,16 +46,25 @@ class OTP(models.Model):
         return otp_obj
 
     @classmethod
-    def verify_otp(cls, mobile, otp):
-        try:
-            otp_obj = cls.objects.get(
-                mobile=mobile,
-                otp=otp,
-                is_verified=False,
-                expires_at__gt=timezone.now()
-            )
-            otp_obj.is_verified = True
-            otp_obj.save()
+    def verify_otp(cls, mobile, otp, max_attempts=None):
+        """
+        Mark a matching, unexpired OTP as verified. The conditional UPDATE
+        makes verification atomic, so an OTP can only be used once.
+        """
+        live = cls.objects.filter(mobile=mobile, is_verified=False, expires_at__gt=timezone.now())
+        if max_attempts is not None:
+            live = live.filter(attempts__lt=max_attempts)
+
+        if live.filter(otp=otp).update(is_verified=True):
             return True
-        except cls.DoesNotExist:
-            return False
+
+        live.update(attempts=F('attempts') + 1)
+        return False
+
+    @classmethod
+    def purge(cls):
+        """Delete expired and already verified OTPs. Returns the number removed."""
+        # Two deletes rather than one OR, so each is served by its own index
+        expired, _ = cls.objects.filter(expires_at__lte=timezone.now()).delete()
+        verified, _ = cls.objects.filter(is_verified=True).delete()
+        return expired + verified
@@ -0,0 +1,150 @@
+import secrets
+import string
+import threading
+import time
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+
+from .models import OTP
+
+
+def generate_code(length=6):
+    """A random numeric code from the OS CSPRNG; every store uses it."""
+    return ''.join(secrets.choice(string.digits) for _ in range(length))
+
+
+class BaseOTPStore:
+    """
+    Storage for one-time passwords. A mobile has at most one live OTP;
+    issuing a new one replaces the previous OTP and resets its attempts.
+    `verify` consumes the OTP atomically, so it succeeds at most once, and
+    gives up after OTP_MAX_VERIFY_ATTEMPTS wrong guesses.
+    """
+
+    def issue(self, mobile):
+        raise NotImplementedError
+
+    def verify(self, mobile, otp):
+        raise NotImplementedError
+
+    async def aissue(self, mobile):
+        return await sync_to_async(self.issue)(mobile)
+
+    async def averify(self, mobile, otp):
+        return await sync_to_async(self.verify)(mobile, otp)
+
+    @property
+    def ttl(self):
+        return settings.OTP_TTL
+
+    @property
+    def max_attempts(self):
+        return settings.OTP_MAX_VERIFY_ATTEMPTS
+
+
+class DatabaseOTPStore(BaseOTPStore):
+    """Stores OTPs in the `OTP` table."""
+
+    def issue(self, mobile):
+        return OTP.generate_otp(mobile, generate_code()).otp
+
+    def verify(self, mobile, otp):
+        return OTP.verify_otp(mobile, otp, max_attempts=self.max_attempts)
+
+
+class CacheOTPStore(BaseOTPStore):
+    """
+    Stores OTPs in a Django cache with native TTL expiry. Use a cache shared
+    by all workers (Redis, Memcached); a per-process cache would make an OTP
+    issued by one worker unknown to the others.
+    """
+
+    def __init__(self):
+        self.cache = caches[settings.OTP_CACHE_ALIAS]
+
+    def _code_key(self, mobile):
+        return f'otp:code:{mobile}'
+
+    def _attempts_key(self, mobile):
+        return f'otp:attempts:{mobile}'
+
+    def issue(self, mobile):
+        otp = generate_code()
+        self.cache.set_many({
+            self._code_key(mobile): otp,
+            self._attempts_key(mobile): 0,
+        }, timeout=self.ttl)
+        return otp
+
+    def verify(self, mobile, otp):
+        code_key = self._code_key(mobile)
+        expected = self.cache.get(code_key)
+        if expected is None:
+            return False
+
+        if not secrets.compare_digest(expected, otp):
+            try:
+                attempts = self.cache.incr(self._attempts_key(mobile))
+            except ValueError:
+                attempts = self.max_attempts
+            if attempts >= self.max_attempts:
+                self.cache.delete(code_key)
+            return False
+
+        # Only the request that actually removes the key consumes the OTP
+        consumed = self.cache.delete(code_key)
+        self.cache.delete(self._attempts_key(mobile))
+        return bool(consumed)
+
+
+class LocalOTPStore(BaseOTPStore):
+    """
+    In-process OTP store. Only suitable for a single-process deployment,
+    local development and tests.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def issue(self, mobile):
+        otp = generate_code()
+        with self._lock:
+            self._purge_expired()
+            self._entries[mobile] = {
+                'otp': otp,
+                'expires_at': time.monotonic() + self.ttl,
+                'attempts': 0,
+            }
+        return otp
+
+    def verify(self, mobile, otp):
+        with self._lock:
+            entry = self._entries.get(mobile)
+            if entry is None or entry['expires_at'] <= time.monotonic():
+                self._entries.pop(mobile, None)
+                return False
+
+            if not secrets.compare_digest(entry['otp'], otp):
+                entry['attempts'] += 1
+                if entry['attempts'] >= self.max_attempts:
+                    del self._entries[mobile]
+                return False
+
+            del self._entries[mobile]
+            return True
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        for mobile in [m for m, entry in self._entries.items() if entry['expires_at'] <= now]:
+            del self._entries[mobile]
+
+
+@lru_cache(maxsize=None)
+def get_otp_store():
+    """Return the process-wide store configured by OTP_STORE."""
+    return import_string(settings.OTP_STORE)()
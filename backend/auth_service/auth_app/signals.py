@@ -0,0 +1,11 @@
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .gateways import get_sms_gateway
+
+
+@receiver(setting_changed)
+def reset_sms_gateway(sender, setting, **kwargs):
+    """Use the new gateway after OTP_SMS_GATEWAY changes, e.g. in tests."""
+    if setting == 'OTP_SMS_GATEWAY':
+        get_sms_gateway.cache_clear()
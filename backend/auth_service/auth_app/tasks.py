@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.conf import settings
+
+from task_queue.registry import Retry, periodic_task, task
+from .gateways import SMSGatewayError, get_sms_gateway
+from .models import OTP
+
+
+@task(queue='otp', max_retries=settings.OTP_DELIVERY_MAX_RETRIES, retry_backoff=settings.OTP_DELIVERY_BACKOFF)
+def send_otp(mobile, otp):
+    """Send an OTP through the configured gateway; transient failures are retried."""
+    try:
+        get_sms_gateway().send_otp(mobile, otp)
+    except SMSGatewayError as e:
+        if e.retryable:
+            raise Retry(f"Error sending OTP to {mobile}: {str(e)}")
+        raise
+
+
+@periodic_task(every=timedelta(hours=1))
+def purge_otps():
+    """Delete expired and already verified OTPs."""
+    return OTP.purge()
@@ -1,3 +1,409 @@
-from django.test import TestCase
+import asyncio
+import importlib
+import time
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import requests
+
+from django.core.cache import cache
+from django.test import AsyncClient, TestCase, override_settings
+from django.urls import include, path, resolve
+from django.utils import timezone
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework.throttling import SimpleRateThrottle
+
+from dodo_backend import aio
+from dodo_backend.metrics import render_metrics
+from dodo_backend.testing import QueryPlanAssertions
+from user_service.user_app.models import User
+from . import tasks, urls
+from .async_views import AsyncSendOTPView
+from .authentication import StatelessJWTAuthentication
+from .delivery import adeliver_otp
+from .gateways import SMSGatewayError, get_sms_gateway
+from .models import OTP
+from .otp_store import CacheOTPStore, DatabaseOTPStore, LocalOTPStore, get_otp_store
+from .throttling import GlobalRateThrottle
+from .tokens import ClaimsRefreshToken
+
+
+class OTPQueryPlanTests(QueryPlanAssertions, TestCase):
+    """OTP send, verify and purge must not scan the OTP table."""
+
+    def test_replace_by_mobile_uses_index(self):
+        self.assertUsesIndex(OTP.objects.filter(mobile='919999999999'))
+
+    def test_verify_uses_index(self):
+        self.assertUsesIndex(OTP.objects.filter(
+            mobile='919999999999', is_verified=False, expires_at__gt=timezone.now(), otp='123456'
+        ))
+
+    def test_purge_uses_index(self):
+        self.assertUsesIndex(OTP.objects.filter(expires_at__lte=timezone.now()))
+        self.assertUsesIndex(OTP.objects.filter(is_verified=True))
+
+
+class StatelessAuthenticationTests(TestCase):
+    """request.user comes from token claims; the User row is only loaded when needed."""
+
+    def setUp(self):
+        self.user = User.objects.create(mobile='9876543210', email='vendor@example.com', user_type='vendor')
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return StatelessJWTAuthentication().authenticate(request)[0]
+
+    def test_claims_are_embedded(self):
+        access = ClaimsRefreshToken.for_user(self.user).access_token
+        self.assertEqual(
+            {claim: access[claim] for claim in ('user_type', 'is_staff', 'is_superuser', 'is_active')},
+            {'user_type': 'vendor', 'is_staff': False, 'is_superuser': False, 'is_active': True},
+        )
+
+    def test_row_is_loaded_lazily_for_other_attributes(self):
+        access = ClaimsRefreshToken.for_user(self.user).access_token
+
+        with self.assertNumQueries(0):
+            user = self.authenticate(access)
+            self.assertEqual(
+                (user.id, user.user_type, user.is_staff, user.is_active), (self.user.id, 'vendor', False, True)
+            )
+        with self.assertNumQueries(1):
+            self.assertEqual(user.mobile, '9876543210')
+        with self.assertNumQueries(0):
+            self.assertEqual(user.email, 'vendor@example.com')
+
+    def test_inactive_claim_is_rejected(self):
+        refresh = ClaimsRefreshToken.for_user(self.user)
+        refresh['is_active'] = False
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(refresh.access_token)
+
+    def test_refresh_rereads_claims(self):
+        refresh = ClaimsRefreshToken.for_user(self.user)
+        User.objects.filter(id=self.user.id).update(user_type='admin', is_staff=True)
+
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 200)
+        user = self.authenticate(response.json()['access'])
+        self.assertEqual((user.user_type, user.is_staff), ('admin', True))
+
+    def test_refresh_rejects_deactivated_user(self):
+        refresh = ClaimsRefreshToken.for_user(self.user)
+        User.objects.filter(id=self.user.id).update(is_active=False)
+
+        response = APIClient().post('/api/auth/token/refresh/', {'refresh': str(refresh)})
+        self.assertEqual(response.status_code, 401)
+
+    def test_me_shows_the_stored_row(self):
+        access = ClaimsRefreshToken.for_user(self.user).access_token
+        User.objects.filter(id=self.user.id).update(user_type='customer')
+
+        response = APIClient().get('/api/users/users/me/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        self.assertEqual(response.json()['user_type'], 'customer')
+        self.assertEqual(response.json()['mobile'], '9876543210')
+
+
+class OTPStoreTests:
+    """Behaviour every OTP store shares; subclasses pick the store."""
+    store_class = None
+    mobile = '919876543210'
+
+    def setUp(self):
+        cache.clear()
+        limit = override_settings(OTP_MAX_VERIFY_ATTEMPTS=3)
+        limit.enable()
+        self.addCleanup(limit.disable)
+        self.store = self.store_class()
+
+    def wrong(self, otp):
+        return '000000' if otp != '000000' else '111111'
+
+    def test_codes_come_from_the_shared_generator(self):
+        with mock.patch('auth_service.auth_app.otp_store.generate_code', return_value='424242'):
+            self.assertEqual(self.store.issue(self.mobile), '424242')
+        self.assertTrue(self.store.verify(self.mobile, '424242'))
+
+    def test_otp_is_single_use(self):
+        otp = self.store.issue(self.mobile)
+        self.assertRegex(otp, r'^\d{6}$')
+
+        self.assertTrue(self.store.verify(self.mobile, otp))
+        self.assertFalse(self.store.verify(self.mobile, otp))
+
+    def test_attempt_limit(self):
+        otp = self.store.issue(self.mobile)
+        self.assertFalse(self.store.verify(self.mobile, self.wrong(otp)))
+        self.assertFalse(self.store.verify(self.mobile, self.wrong(otp)))
+        self.assertTrue(self.store.verify(self.mobile, otp))
+
+        otp = self.store.issue(self.mobile)
+        for _ in range(3):
+            self.assertFalse(self.store.verify(self.mobile, self.wrong(otp)))
+        self.assertFalse(self.store.verify(self.mobile, otp))
+
+    def test_reissue_replaces_and_resets_attempts(self):
+        first = self.store.issue(self.mobile)
+        for _ in range(2):
+            self.store.verify(self.mobile, self.wrong(first))
+
+        second = self.store.issue(self.mobile)
+        self.assertFalse(self.store.verify(self.mobile, self.wrong(second)))
+        if first != second:
+            self.assertFalse(self.store.verify(self.mobile, first))
+        self.assertTrue(self.store.verify(self.mobile, second))
+
+    def test_mobiles_are_independent(self):
+        otp = self.store.issue(self.mobile)
+        self.assertFalse(self.store.verify('919876543211', otp))
+        self.assertTrue(self.store.verify(self.mobile, otp))
+
+
+class DatabaseOTPStoreTests(OTPStoreTests, TestCase):
+    store_class = DatabaseOTPStore
+
+    def test_expired_otp_is_rejected(self):
+        otp = self.store.issue(self.mobile)
+        OTP.objects.update(expires_at=timezone.now())
+        self.assertFalse(self.store.verify(self.mobile, otp))
+
+
+class CacheOTPStoreTests(OTPStoreTests, TestCase):
+    store_class = CacheOTPStore
+
+
+class LocalOTPStoreTests(OTPStoreTests, TestCase):
+    store_class = LocalOTPStore
+
+    def test_expired_otp_is_rejected(self):
+        otp = self.store.issue(self.mobile)
+        with mock.patch('auth_service.auth_app.otp_store.time.monotonic', return_value=time.monotonic() + 601):
+            self.assertFalse(self.store.verify(self.mobile, otp))
+
+
+class ThrottleTests(TestCase):
+    """OTP endpoints are limited per mobile number over a sliding window."""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {
+            'otp_send_mobile': '2/min', 'otp_send_ip': '100/min', 'otp_send_global': '100/min',
+            'test_global': '10/min',
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_rejected_with_retry_after(self):
+        client = APIClient()
+        # The same number, however it is written
+        for mobile in ('9876543210', '+91 98765 43210'):
+            self.assertEqual(client.post('/api/auth/otp/send/', {'mobile': mobile}).status_code, 200)
+
+        with self.assertLogs('auth_service.auth_app.throttling', 'WARNING'):
+            response = client.post('/api/auth/otp/send/', {'mobile': '919876543210'})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        # Other numbers are not affected
+        self.assertEqual(client.post('/api/auth/otp/send/', {'mobile': '9876543211'}).status_code, 200)
+
+        self.assertRegex(render_metrics(), r'auth_throttled_requests_total\{scope="otp_send_mobile"\} [1-9]')
+
+    def test_sliding_window(self):
+        view = SimpleNamespace(throttle_scope='test')
+
+        def hit(now):
+            throttle = GlobalRateThrottle()
+            throttle.timer = lambda: now
+            with mock.patch('auth_service.auth_app.throttling.logger'):
+                return throttle.allow_request(None, view), throttle
+
+        # The whole limit is used up in the first minute
+        for _ in range(10):
+            self.assertTrue(hit(30)[0])
+        self.assertFalse(hit(59)[0])
+
+        # A quarter into the next minute, 3/4 of the previous one still counts: 7.5 + 3 >= 10
+        for _ in range(3):
+            self.assertTrue(hit(75)[0])
+        allowed, throttle = hit(75)
+        self.assertFalse(allowed)
+
+        # Retry-After is when enough of the previous minute has slid out
+        wait = throttle.wait()
+        self.assertFalse(hit(75 + wait - 1)[0])
+        self.assertTrue(hit(75 + wait)[0])
+
+
+def msg91_response(status_code, text='{"type": "success"}'):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = text.encode()
+    return response
+
+
+@override_settings(
+    TASK_BROKER='task_queue.brokers.ImmediateBroker',
+    OTP_SMS_GATEWAY='auth_service.auth_app.gateways.MSG91Gateway',
+)
+class OTPDeliveryTests(TestCase):
+    """OTPs are sent by a background task that retries transient gateway failures."""
+
+    def setUp(self):
+        cache.clear()
+        # Backoff sleeps of the inline broker
+        patcher = mock.patch('task_queue.brokers.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def send(self, *responses):
+        gateway = get_sms_gateway()
+        with mock.patch.object(gateway.session, 'post', side_effect=responses) as post, \
+                self.assertLogs('task_queue.worker', 'INFO') as logs:
+            tasks.send_otp.delay('9876543210', '123456')
+        return post, logs
+
+    def test_transient_failures_are_retried_with_backoff(self):
+        post, logs = self.send(
+            requests.Timeout('read timed out'), msg91_response(503, 'unavailable'), msg91_response(200)
+        )
+
+        self.assertEqual(post.call_count, 3)
+        self.assertEqual(post.call_args.kwargs['json']['mobile'], '919876543210')
+        self.assertEqual(post.call_args.kwargs['json']['otp'], '123456')
+        backoff = tasks.send_otp.retry_backoff
+        self.assertEqual([c.args[0] for c in self.sleep.call_args_list], [backoff, backoff * 2])
+        self.assertIn('succeeded', logs.output[-1])
+
+    def test_client_errors_are_not_retried(self):
+        post, logs = self.send(msg91_response(400, 'invalid mobile'))
+
+        self.assertEqual(post.call_count, 1)
+        self.sleep.assert_not_called()
+        self.assertIn('SMSGatewayError: MSG91 API error: invalid mobile', logs.output[-1])
+
+    def test_rate_limits_are_retried(self):
+        post, _ = self.send(msg91_response(429, 'slow down'), msg91_response(200))
+        self.assertEqual(post.call_count, 2)
+
+    @override_settings(OTP_SMS_GATEWAY='auth_service.auth_app.gateways.LocalSMSGateway')
+    def test_send_view_delivers_after_commit(self):
+        outbox = get_sms_gateway().outbox
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = APIClient().post('/api/auth/otp/send/', {'mobile': '919876543210'})
+        self.assertEqual(response.status_code, 200)
+        # Nothing is sent before the OTP is stored
+        self.assertEqual(outbox, [])
+
+        for callback in callbacks:
+            callback()
+        self.assertEqual(len(outbox), 1)
+        self.assertEqual(outbox[0]['mobile'], '919876543210')
+        self.assertTrue(get_otp_store().verify('919876543210', outbox[0]['otp']))
+
+
+class AsyncOTPDeliveryTests(TestCase):
+    """adeliver_otp retries transient failures with exponential backoff."""
+
+    def deliver(self, *outcomes):
+        gateway = mock.Mock(asend_otp=mock.AsyncMock(side_effect=outcomes))
+        with mock.patch('auth_service.auth_app.delivery.get_sms_gateway', return_value=gateway), \
+                mock.patch('auth_service.auth_app.delivery.asyncio.sleep') as sleep, \
+                self.assertLogs('auth_service.auth_app.delivery', 'WARNING'):
+            delivered = asyncio.run(adeliver_otp('919876543210', '123456'))
+        return delivered, gateway.asend_otp, sleep
+
+    @override_settings(OTP_DELIVERY_BACKOFF=0.5, OTP_DELIVERY_MAX_RETRIES=3)
+    def test_transient_failures_are_retried(self):
+        delivered, send, sleep = self.deliver(SMSGatewayError('timed out'), SMSGatewayError('503'), {})
+
+        self.assertTrue(delivered)
+        self.assertEqual(send.await_count, 3)
+        self.assertEqual([c.args[0] for c in sleep.call_args_list], [0.5, 1.0])
+
+    @override_settings(OTP_DELIVERY_MAX_RETRIES=1)
+    def test_gives_up(self):
+        delivered, send, _ = self.deliver(SMSGatewayError('timed out'), SMSGatewayError('timed out'))
+
+        self.assertFalse(delivered)
+        self.assertEqual(send.await_count, 2)
+
+    def test_client_errors_are_not_retried(self):
+        delivered, send, sleep = self.deliver(SMSGatewayError('invalid mobile', retryable=False))
+
+        self.assertFalse(delivered)
+        self.assertEqual(send.await_count, 1)
+        sleep.assert_not_called()
+
+
+@override_settings(
+    ASYNC_VIEWS=True,
+    OTP_SMS_GATEWAY='auth_service.auth_app.gateways.LocalSMSGateway',
+)
+class AsyncSendOTPViewTests(TestCase):
+    """With ASYNC_VIEWS the send endpoint answers like SendOTPView and delivers on the event loop."""
+
+    def setUp(self):
+        cache.clear()
+        get_sms_gateway.cache_clear()
+        # The view is picked when the URLconf is imported
+        importlib.reload(urls)
+        self.addCleanup(self.reload_sync_urls)
+
+        class URLConf:
+            urlpatterns = [path('api/auth/', include(urls))]
+
+        urlconf = override_settings(ROOT_URLCONF=URLConf)
+        urlconf.enable()
+        self.addCleanup(urlconf.disable)
+        patcher = mock.patch.dict(SimpleRateThrottle.THROTTLE_RATES, {
+            'otp_send_mobile': '2/min', 'otp_send_ip': '100/min', 'otp_send_global': '100/min',
+        })
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def reload_sync_urls(self):
+        with override_settings(ASYNC_VIEWS=False):
+            importlib.reload(urls)
+
+    def test_async_view_is_routed(self):
+        self.assertIs(resolve('/api/auth/otp/send/').func.view_class, AsyncSendOTPView)
+
+    async def test_sends_in_the_background(self):
+        response = await AsyncClient().post(
+            '/api/auth/otp/send/', {'mobile': '919876543210'}, content_type='application/json'
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'message': 'OTP sent successfully', 'mobile': '919876543210'})
+        await asyncio.gather(*aio._background_tasks)
+        outbox = get_sms_gateway().outbox
+        self.assertEqual([message['mobile'] for message in outbox], ['919876543210'])
+        self.assertTrue(await get_otp_store().averify('919876543210', outbox[0]['otp']))
+
+    async def test_invalid_input(self):
+        client = AsyncClient()
+
+        response = await client.post('/api/auth/otp/send/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('mobile', response.json())
+
+        response = await client.post('/api/auth/otp/send/', '{', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(get_sms_gateway().outbox, [])
+
+    async def test_throttled_with_retry_after(self):
+        client = AsyncClient()
+        for _ in range(2):
+            response = await client.post('/api/auth/otp/send/', {'mobile': '9876543210'})
+            self.assertEqual(response.status_code, 200)
+
+        with self.assertLogs('auth_service.auth_app.throttling', 'WARNING'):
+            response = await client.post('/api/auth/otp/send/', {'mobile': '9876543210'})
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        await asyncio.gather(*aio._background_tasks)
+        self.assertEqual(len(get_sms_gateway().outbox), 2)
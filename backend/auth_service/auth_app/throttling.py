@@ -0,0 +1,182 @@
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from rest_framework.throttling import SimpleRateThrottle
+
+from dodo_backend.metrics import sample
+from .gateways import split_mobile
+
+logger = logging.getLogger(__name__)
+
+# Used when the shared throttle cache is unreachable, so auth keeps working
+# with per-process limits instead of failing or going unthrottled.
+fallback_cache = LocMemCache('throttle-fallback', {})
+
+_rejections = Counter()
+_rejections_lock = threading.Lock()
+
+
+def record_rejection(scope):
+    with _rejections_lock:
+        _rejections[scope] += 1
+
+
+def rejection_counts():
+    """Return the number of throttled requests per scope seen by this process."""
+    with _rejections_lock:
+        return dict(_rejections)
+
+
+def collect_throttle_metrics():
+    """Prometheus lines for `/metrics`: requests this process throttled, per scope."""
+    yield from sample(
+        'auth_throttled_requests_total', 'Requests rejected by auth throttles.', 'counter',
+        {(scope,): count for scope, count in rejection_counts().items()},
+        ('scope',),
+    )
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """
+    Sliding-window counter throttle.
+
+    Keeps one counter per fixed window and estimates the rate over the last
+    `duration` seconds by weighting the previous window's count by how much
+    of it still overlaps. That costs two cache reads and one increment per
+    request, instead of the per-request timestamp list `SimpleRateThrottle`
+    reads and rewrites.
+    """
+
+    def get_cache(self):
+        return caches[settings.THROTTLE_CACHE_ALIAS]
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        self.now = self.timer()
+        window = int(self.now // self.duration)
+        self.elapsed = self.now - window * self.duration
+        current_key = f'{self.key}:{window}'
+        previous_key = f'{self.key}:{window - 1}'
+
+        try:
+            allowed = self.hit(self.get_cache(), current_key, previous_key)
+        except Exception:
+            logger.warning('Throttle cache unavailable, using in-process counters', exc_info=True)
+            allowed = self.hit(fallback_cache, current_key, previous_key)
+
+        return self.throttle_success() if allowed else self.throttle_failure()
+
+    def hit(self, cache, current_key, previous_key):
+        """Count the request against the current window unless it is over the limit."""
+        counts = cache.get_many([current_key, previous_key])
+        self.current = counts.get(current_key, 0)
+        self.previous = counts.get(previous_key, 0)
+
+        if self.estimate() >= self.num_requests:
+            return False
+
+        if not cache.add(current_key, 1, timeout=self.duration * 2):
+            cache.incr(current_key)
+        return True
+
+    def estimate(self):
+        overlap = 1 - self.elapsed / self.duration
+        return self.previous * overlap + self.current
+
+    def throttle_success(self):
+        return True
+
+    def throttle_failure(self):
+        record_rejection(self.scope)
+        logger.warning(f"Throttled request for scope {self.scope}")
+        return False
+
+    def wait(self):
+        remaining = self.duration - self.elapsed
+        if self.current >= self.num_requests or not self.previous:
+            return remaining
+
+        # Time until the previous window's weight drops enough to allow one more request
+        overlap_needed = (self.num_requests - self.current) / self.previous
+        wait = (1 - overlap_needed) * self.duration - self.elapsed
+        return max(1, math.ceil(min(wait, remaining)))
+
+
+class AuthRateThrottle(SlidingWindowRateThrottle):
+    """
+    Base for auth endpoint throttles. The rate is looked up per view as
+    `<view.throttle_scope>_<scope_suffix>` in DEFAULT_THROTTLE_RATES;
+    views without a matching rate are not throttled.
+    """
+    scope_suffix = None
+
+    def __init__(self):
+        # The rate depends on the view, so it is resolved in allow_request
+        pass
+
+    def allow_request(self, request, view):
+        throttle_scope = getattr(view, 'throttle_scope', None)
+        if not throttle_scope:
+            return True
+
+        self.scope = f'{throttle_scope}_{self.scope_suffix}'
+        if self.scope not in self.THROTTLE_RATES:
+            return True
+
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return super().allow_request(request, view)
+
+    def get_ident_for(self, request):
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_for(request)
+        if not ident:
+            return None
+        return self.cache_format % {
+            'scope': self.scope,
+            'ident': hashlib.md5(str(ident).encode('utf-8')).hexdigest(),
+        }
+
+
+class MobileRateThrottle(AuthRateThrottle):
+    """Limits requests per mobile number in the request body."""
+    scope_suffix = 'mobile'
+
+    def get_ident_for(self, request):
+        mobile = request.data.get('mobile') if hasattr(request.data, 'get') else None
+        digits = re.sub(r'\D', '', str(mobile)) if mobile else ''
+        if not digits:
+            return None
+        # "98...", "+91 98..." and "9198..." are the same number
+        return ''.join(split_mobile(digits))
+
+
+class IPRateThrottle(AuthRateThrottle):
+    """Limits requests per client IP."""
+    scope_suffix = 'ip'
+
+    def get_ident_for(self, request):
+        return self.get_ident(request)
+
+
+class GlobalRateThrottle(AuthRateThrottle):
+    """Limits the total request rate across all clients."""
+    scope_suffix = 'global'
+
+    def get_ident_for(self, request):
+        return 'global'
@@ -0,0 +1,29 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+# Token claim -> User attribute. These are the fields our views and
+# permission classes read on every request, so they travel in the token.
+USER_CLAIMS = {
+    'user_type': 'user_type',
+    'is_staff': 'is_staff',
+    'is_superuser': 'is_superuser',
+    'is_active': 'is_active',
+}
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """
+    Refresh token that carries the user's authorization claims. Access tokens
+    derived from it inherit the claims, which lets the stateless authentication
+    backend build `request.user` without a database lookup.
+    """
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.set_user_claims(user)
+        return token
+
+    def set_user_claims(self, user):
+        for claim, attr in USER_CLAIMS.items():
+            self[claim] = getattr(user, attr)
@@ -1,8 +1,17 @@
+from django.conf import settings
 from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
+from .async_views import AsyncSendOTPView
 from .views import SendOTPView, VerifyOTPView, AdminLoginView, TokenRefreshView
 
+if settings.ASYNC_VIEWS:
+    send_otp_view = csrf_exempt(AsyncSendOTPView.as_view())
+else:
+    send_otp_view = SendOTPView.as_view()
+
 urlpatterns = [
-    path('otp/send/', SendOTPView.as_view(), name='send-otp'),
+    path('otp/send/', send_otp_view, name='send-otp'),
     path('otp/verify/', VerifyOTPView.as_view(), name='verify-otp'),
     path('admin/login/', AdminLoginView.as_view(), name='admin-login'),
     path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
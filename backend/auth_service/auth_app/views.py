@@ -1,13 +1,15 @@
 from django.conf import settings
 from django.contrib.auth import authenticate
+from django.db import transaction
 from rest_framework import status, views, permissions
 from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
-import requests
-import json
+from rest_framework_simplejwt.settings import api_settings
 import logging
 
-from .models import OTP
+from .otp_store import get_otp_store
+from .tasks import send_otp
+from .throttling import MobileRateThrottle, IPRateThrottle, GlobalRateThrottle
+from .tokens import ClaimsRefreshToken, USER_CLAIMS
 from .serializers import (
     SendOTPSerializer,
     VerifyOTPSerializer,
@@ -22,6 +24,8 @@ logger = logging.getLogger(__name__)
 
 class SendOTPView(views.APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [MobileRateThrottle, IPRateThrottle, GlobalRateThrottle]
+    throttle_scope = 'otp_send'
 
     def post(self, request):
         serializer = SendOTPSerializer(data=request.data)
@@ -29,60 +33,23 @@ class SendOTPView(views.APIView):
             mobile = serializer.validated_data['mobile']
 
             # Generate OTP
-            otp_obj = OTP.generate_otp(mobile)
+            otp = get_otp_store().issue(mobile)
 
-            # Send OTP via MSG91
-            try:
-                self.send_otp_via_msg91(mobile, otp_obj.otp)
-                return Response({
-                    'message': 'OTP sent successfully',
-                    'mobile': mobile
-                }, status=status.HTTP_200_OK)
-            except Exception as e:
-                logger.error(f"Error sending OTP: {str(e)}")
-                return Response({
-                    'error': 'Failed to send OTP',
-                    'details': str(e)
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+            # Deliver in the background once the OTP is stored
+            transaction.on_commit(lambda: send_otp.delay(mobile, otp))
 
-    def send_otp_via_msg91(self, mobile, otp):
-        """Send OTP using MSG91 API"""
-        url = "https://api.msg91.com/api/v5/otp"
+            return Response({
+                'message': 'OTP sent successfully',
+                'mobile': mobile
+            }, status=status.HTTP_200_OK)
 
-        # Remove country code if present
-        if mobile.startswith('+'):
-            mobile = mobile[1:]
-
-        # Extract country code (default to India: 91)
-        country_code = '91'
-        if len(mobile) > 10:
-            country_code = mobile[:-10]
-            mobile = mobile[-10:]
-
-        payload = {
-            "template_id": settings.MSG91_TEMPLATE_ID,
-            "mobile": f"{country_code}{mobile}",
-            "authkey": settings.MSG91_AUTH_KEY,
-            "otp": otp,
-            "sender": settings.MSG91_SENDER_ID
-        }
-
-        headers = {
-            "Content-Type": "application/json"
-        }
-
-        response = requests.post(url, data=json.dumps(payload), headers=headers)
-
-        if response.status_code != 200:
-            raise Exception(f"MSG91 API error: {response.text}")
-
-        return response.json()
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
 class VerifyOTPView(views.APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [MobileRateThrottle, IPRateThrottle, GlobalRateThrottle]
+    throttle_scope = 'otp_verify'
 
     def post(self, request):
         serializer = VerifyOTPSerializer(data=request.data)
@@ -91,12 +58,12 @@ class VerifyOTPView(views.APIView):
             otp = serializer.validated_data['otp']
 
             # Verify OTP
-            if OTP.verify_otp(mobile, otp):
+            if get_otp_store().verify(mobile, otp):
                 # Check if user exists
                 try:
                     user = User.objects.get(mobile=mobile)
                     # User exists, generate tokens
-                    refresh = RefreshToken.for_user(user)
+                    refresh = ClaimsRefreshToken.for_user(user)
 
                     return Response({
                         'refresh': str(refresh),
@@ -121,6 +88,8 @@ class VerifyOTPView(views.APIView):
 
 class AdminLoginView(views.APIView):
     permission_classes = [permissions.AllowAny]
+    throttle_classes = [IPRateThrottle, GlobalRateThrottle]
+    throttle_scope = 'admin_login'
 
     def post(self, request):
         serializer = AdminLoginSerializer(data=request.data)
@@ -131,7 +100,7 @@ class AdminLoginView(views.APIView):
             user = authenticate(email=email, password=password)
 
             if user is not None and user.user_type == 'admin' and user.is_active:
-                refresh = RefreshToken.for_user(user)
+                refresh = ClaimsRefreshToken.for_user(user)
 
                 return Response({
                     'refresh': str(refresh),
@@ -153,7 +122,15 @@ class TokenRefreshView(views.APIView):
         serializer = TokenRefreshSerializer(data=request.data)
         if serializer.is_valid():
             try:
-                refresh = RefreshToken(serializer.validated_data['refresh'])
+                refresh = ClaimsRefreshToken(serializer.validated_data['refresh'])
+
+                # Re-read the claims so role or status changes reach new access tokens
+                user = User.objects.only(*USER_CLAIMS.values()).get(
+                    **{api_settings.USER_ID_FIELD: refresh[api_settings.USER_ID_CLAIM]}
+                )
+                if not user.is_active:
+                    raise ValueError('User is inactive')
+                refresh.set_user_claims(user)
 
                 return Response({
                     'access': str(refresh.access_token),
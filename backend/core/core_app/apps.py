@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class CoreAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core.core_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
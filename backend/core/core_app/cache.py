@@ -0,0 +1,122 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag, urlencode
+
+
+# Catalog cache namespaces and the models whose changes invalidate them.
+# Services embed their category name, so category changes invalidate both.
+CATALOG_NAMESPACES = {
+    'categories': ('ServiceCategory',),
+    'services': ('Service', 'ServiceCategory'),
+    'taxes': ('Tax',),
+    'payment_terms': ('PaymentTerm',),
+}
+
+
+def _version_key(namespace):
+    return f'catalog:{namespace}:version'
+
+
+def get_catalog_version(namespace):
+    """Return the current version of a catalog namespace."""
+    key = _version_key(namespace)
+    cache.add(key, 1, timeout=None)
+    return cache.get(key, 1)
+
+
+def bump_catalog_version(namespace):
+    """Invalidate every cached response of a namespace by moving to a new version."""
+    key = _version_key(namespace)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def invalidate_for_model(model_name):
+    """Bump all namespaces that depend on the given model."""
+    for namespace, model_names in CATALOG_NAMESPACES.items():
+        if model_name in model_names:
+            bump_catalog_version(namespace)
+
+
+def catalog_cache_key(namespace, action, request, pk=None):
+    """
+    Build the cache key for a catalog response. Query params are sorted so
+    equivalent requests (e.g. `?page=2&is_active=true`) share one entry; the
+    host is included because pagination links and image URLs are absolute.
+    """
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    origin = f'{request.scheme}://{request.get_host()}'
+    digest = hashlib.md5(f'{origin}?{query}'.encode('utf-8')).hexdigest()
+    version = get_catalog_version(namespace)
+    return f'catalog:{namespace}:v{version}:{action}:{pk or ""}:{digest}'
+
+
+def etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+class CatalogCacheMixin:
+    """
+    Serves `list` and `retrieve` from fully rendered responses cached per
+    namespace version and query string, with ETag / If-None-Match support.
+
+    Only JSON responses are cached; the browsable API is rendered per user.
+    Writes go through the normal viewset path and invalidate via signals.
+    """
+    cache_namespace = None
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, 'list', super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(request, 'retrieve', super().retrieve, *args, **kwargs)
+
+    def cached_response(self, request, action, handler, *args, **kwargs):
+        if request.accepted_renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+
+        key = catalog_cache_key(self.cache_namespace, action, request, kwargs.get(self.lookup_field))
+        cached = cache.get(key)
+        if cached is None:
+            # Rendered and stored in finalize_response once the renderer has run
+            self._catalog_cache_key = key
+            return handler(request, *args, **kwargs)
+
+        if etag_matches(request, cached['etag']):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(cached['content'], content_type=cached['content_type'])
+        response['ETag'] = cached['etag']
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+
+        key = getattr(self, '_catalog_cache_key', None)
+        if key is None or response.status_code != 200:
+            return response
+
+        response.render()
+        etag = quote_etag(hashlib.md5(response.content).hexdigest())
+        cache.set(key, {
+            'content': response.content,
+            'content_type': response['Content-Type'],
+            'etag': etag,
+        }, timeout=settings.CATALOG_CACHE_TIMEOUT)
+
+        if etag_matches(request, etag):
+            not_modified = HttpResponseNotModified()
+            not_modified['ETag'] = etag
+            return not_modified
+
+        response['ETag'] = etag
+        return response
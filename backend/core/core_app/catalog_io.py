@@ -0,0 +1,302 @@
+"""
+Bulk import and export of the service catalog as CSV or NDJSON.
+
+Imported rows are matched to existing ones by natural key: the name, or the
+category name and name for services. Rows are streamed from the file,
+validated a chunk at a time and written with bulk_create / bulk_update.
+An import commits entirely or, if any row is invalid, not at all.
+"""
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.utils import timezone
+
+from dodo_backend.exports import FORMATS, read_csv_cell, stream_rows
+from . import search
+from .cache import invalidate_for_model
+from .models import ServiceCategory, Service, Tax, PaymentTerm
+from .signals import catalog_changed
+
+# Errors and changes listed in an import report; all of them are counted
+REPORT_LIMIT = 100
+
+TRUE_VALUES = {'true', 't', 'yes', 'y', '1'}
+FALSE_VALUES = {'false', 'f', 'no', 'n', '0'}
+
+
+class CatalogResource:
+    """The columns of one catalog model in import and export files."""
+
+    def __init__(self, model, columns, key_columns=('name',)):
+        self.model = model
+        self.columns = columns
+        self.key_columns = key_columns
+        # The service's category is given by name and stored as category_id
+        self.key_fields = tuple(self.field_name(column) for column in key_columns)
+        self.value_fields = [self.field_name(column) for column in columns]
+        self.export_columns = {column: 'category__name' if column == 'category' else column for column in columns}
+        self.required_fields = [
+            field.name for field in (model._meta.get_field(column) for column in columns if column != 'category')
+            if not (field.has_default() or field.blank or field.null)
+        ]
+
+    @staticmethod
+    def field_name(column):
+        return 'category_id' if column == 'category' else column
+
+    def clean_row(self, row, category_ids):
+        """Return `(values, errors)` for a file row, by model field name."""
+        if not isinstance(row, dict):
+            return {}, {'row': 'Not a JSON object.'}
+
+        values = {}
+        errors = {}
+        for column in self.columns:
+            raw = row.get(column)
+            if isinstance(raw, str):
+                raw = raw.strip()
+
+            if column == 'category':
+                if not raw:
+                    errors[column] = 'This field is required.'
+                elif raw not in category_ids:
+                    errors[column] = f'Unknown category "{raw}".'
+                elif category_ids[raw] is None:
+                    errors[column] = f'Several categories are named "{raw}".'
+                else:
+                    values['category_id'] = category_ids[raw]
+                continue
+
+            field = self.model._meta.get_field(column)
+            # An absent column, or an empty cell for a field that cannot be blank, keeps the current value
+            if raw is None or (raw == '' and not (field.blank and isinstance(field, (models.CharField, models.TextField)))):
+                if column in self.key_columns:
+                    errors[column] = 'This field is required.'
+                continue
+            if isinstance(field, models.BooleanField) and isinstance(raw, str):
+                raw = True if raw.lower() in TRUE_VALUES else False if raw.lower() in FALSE_VALUES else raw
+            try:
+                values[column] = field.clean(raw, None)
+            except ValidationError as e:
+                errors[column] = ' '.join(e.messages)
+        return values, errors
+
+    def find_existing(self, keys):
+        """Return `{key: [current values, ...]}` for the existing rows with these keys."""
+        if not keys:
+            return {}
+        filters = {f'{field}__in': {key[i] for key in keys} for i, field in enumerate(self.key_fields)}
+        existing = {}
+        for row in self.model.objects.filter(**filters).values('id', *self.value_fields):
+            key = tuple(row[field] for field in self.key_fields)
+            # The filter matches the key fields independently, keep exact matches only
+            if key in keys:
+                existing.setdefault(key, []).append(row)
+        return existing
+
+    def index(self, objects, category_names):
+        """Update the search index for bulk-written objects; bulk writes send no signals."""
+        backend = search.get_search_backend()
+        if backend is None:
+            return
+        if self.model is ServiceCategory:
+            # Also refreshes the category name indexed with their services
+            for category in objects:
+                search.index_category(category)
+        elif self.model is Service:
+            backend.index_many(search.SERVICE, [
+                (service.pk, search.service_document(service, category_names[service.category_id]))
+                for service in objects
+            ])
+
+
+RESOURCES = {
+    'categories': CatalogResource(ServiceCategory, ['name', 'description', 'is_active']),
+    'services': CatalogResource(
+        Service,
+        ['category', 'name', 'description', 'price', 'duration_minutes', 'is_active'],
+        key_columns=('category', 'name'),
+    ),
+    'taxes': CatalogResource(Tax, ['name', 'rate', 'is_active']),
+    'payment_terms': CatalogResource(PaymentTerm, ['name', 'days', 'description', 'is_active']),
+}
+
+
+def get_resource(kind):
+    """Return the CatalogResource for a kind, or raise ValueError."""
+    try:
+        return RESOURCES[kind]
+    except KeyError:
+        raise ValueError(f"Unknown catalog '{kind}', expected one of: {', '.join(RESOURCES)}")
+
+
+# Reading and writing files ----------------------------------------------------------
+
+def read_rows(stream, file_format):
+    """Yield `(line number, row)` from a text stream; NDJSON lines that fail to parse yield None."""
+    if file_format == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, {
+                column: read_csv_cell(value) if isinstance(value, str) else value for column, value in row.items()
+            }
+    elif file_format == 'ndjson':
+        for number, line in enumerate(stream, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield number, json.loads(line)
+            except ValueError:
+                yield number, None
+    else:
+        raise ValueError(f"Unknown format '{file_format}', expected one of: {', '.join(FORMATS)}")
+
+
+def export_catalog(kind, file_format, chunk_size=None):
+    """Return an iterator of a catalog as CSV or NDJSON text, in the columns import_catalog reads."""
+    resource = get_resource(kind)
+    return stream_rows(resource.model.objects.all(), resource.export_columns, file_format, chunk_size)
+
+
+# Importing --------------------------------------------------------------------------
+
+def _json_value(value):
+    return str(value) if not isinstance(value, (bool, int, str, type(None))) else value
+
+
+class ImportReport:
+    def __init__(self, dry_run):
+        self.dry_run = dry_run
+        self.counts = {'created': 0, 'updated': 0, 'unchanged': 0, 'invalid': 0}
+        self.changes = []
+        self.errors = []
+
+    def error(self, line, errors):
+        self.counts['invalid'] += 1
+        if len(self.errors) < REPORT_LIMIT:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def change(self, action, line, key, fields):
+        self.counts[action] += 1
+        if len(self.changes) < REPORT_LIMIT:
+            self.changes.append({'action': action, 'line': line, 'key': key, 'fields': fields})
+
+    def as_dict(self):
+        return {
+            'dry_run': self.dry_run,
+            'committed': not self.dry_run and not self.counts['invalid'],
+            **self.counts,
+            'changes': self.changes,
+            'errors': self.errors,
+        }
+
+
+def import_catalog(kind, rows, dry_run=False, chunk_size=500):
+    """
+    Create and update catalog rows from `(line number, row)` pairs, such as
+    those from read_rows. Rows are never deleted.
+
+    Args:
+        kind: 'categories', 'services', 'taxes' or 'payment_terms'
+        rows: Iterable of `(line number, dict of column values)`
+        dry_run: Validate and report the changes without writing them
+        chunk_size: Rows validated, looked up and written together
+
+    Returns:
+        dict: Counts of created, updated, unchanged and invalid rows, with the
+        first changes (old and new values) and errors. Nothing is written if
+        any row is invalid.
+    """
+    resource = get_resource(kind)
+    report = ImportReport(dry_run)
+
+    category_ids = {}
+    if resource.model is Service:
+        # Categories by name, with None for names that are not unique
+        for category_id, name in ServiceCategory.objects.values_list('id', 'name'):
+            category_ids[name] = None if name in category_ids else category_id
+    category_names = {category_id: name for name, category_id in category_ids.items() if category_id}
+
+    seen = {}
+    rows = iter(rows)
+    with transaction.atomic():
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            _import_chunk(resource, chunk, category_ids, category_names, seen, report)
+
+        if report.counts['invalid']:
+            # Undo the chunks written before the first invalid row
+            transaction.set_rollback(True)
+        elif not dry_run and (report.counts['created'] or report.counts['updated']):
+            transaction.on_commit(lambda: _catalog_imported(resource.model))
+
+    return report.as_dict()
+
+
+def _catalog_imported(model):
+    invalidate_for_model(model.__name__)
+    catalog_changed.send(sender=model)
+
+
+def _import_chunk(resource, chunk, category_ids, category_names, seen, report):
+    cleaned = []
+    for line, row in chunk:
+        values, errors = resource.clean_row(row, category_ids)
+        if not errors:
+            key = tuple(values[field] for field in resource.key_fields)
+            if key in seen:
+                errors = {'row': f'Same key as line {seen[key]}.'}
+            else:
+                seen[key] = line
+        if errors:
+            report.error(line, errors)
+            continue
+        cleaned.append((line, key, ' / '.join(str(row[column]).strip() for column in resource.key_columns), values))
+
+    existing = resource.find_existing({key for _, key, _, _ in cleaned})
+    to_create = []
+    to_update = []
+    update_fields = set()
+    for line, key, label, values in cleaned:
+        matches = existing.get(key, [])
+        if len(matches) > 1:
+            report.error(line, {'row': f'Matches {len(matches)} existing rows.'})
+            continue
+
+        if not matches:
+            missing = [field for field in resource.required_fields if field not in values]
+            if missing:
+                report.error(line, {field: 'This field is required for new rows.' for field in missing})
+                continue
+            report.change('created', line, label, {field: _json_value(value) for field, value in values.items()})
+            to_create.append(resource.model(**values))
+            continue
+
+        current = matches[0]
+        changed = {field: value for field, value in values.items() if current[field] != value}
+        if not changed:
+            report.counts['unchanged'] += 1
+            continue
+        report.change('updated', line, label, {
+            field: [_json_value(current[field]), _json_value(value)] for field, value in changed.items()
+        })
+        to_update.append(resource.model(**{**current, **values}))
+        update_fields.update(changed)
+
+    if report.dry_run or report.counts['invalid']:
+        return
+
+    resource.model.objects.bulk_create(to_create)
+    if to_update:
+        # bulk_update does not run auto_now
+        now = timezone.now()
+        for obj in to_update:
+            obj.updated_at = now
+        resource.model.objects.bulk_update(to_update, [*update_fields, 'updated_at'])
+    resource.index(to_create + to_update, category_names)
@@ -0,0 +1,10 @@
+from core.core_app.catalog_io import RESOURCES
+from dodo_backend.exports import ExportCommand
+
+
+class Command(ExportCommand):
+    help = 'Write a catalog as CSV or NDJSON, in the format import_catalog reads'
+    exports = {
+        kind: (resource.model.objects.all, resource.export_columns, {})
+        for kind, resource in RESOURCES.items()
+    }
@@ -0,0 +1,52 @@
+import json
+import os
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.core_app.catalog_io import FORMATS, RESOURCES, import_catalog, read_rows
+
+
+class Command(BaseCommand):
+    help = 'Create and update catalog rows from a CSV or NDJSON file, matched by name'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=list(RESOURCES))
+        parser.add_argument('path', help='File to import, or - for stdin')
+        parser.add_argument('--format', dest='file_format', choices=FORMATS,
+                            help='File format, by default from the file extension')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without writing them')
+        parser.add_argument('--chunk-size', type=int, default=settings.CATALOG_IMPORT_CHUNK_SIZE,
+                            help='Rows validated and written together')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['file_format'] or os.path.splitext(path)[1][1:].lower()
+        if file_format not in FORMATS:
+            raise CommandError(f"Pass --format, the format of {path} is not one of: {', '.join(FORMATS)}")
+
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8-sig', newline='')
+        try:
+            report = import_catalog(
+                options['kind'],
+                read_rows(stream, file_format),
+                dry_run=options['dry_run'],
+                chunk_size=options['chunk_size'],
+            )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        for change in report['changes']:
+            self.stdout.write(f"line {change['line']}: {change['action']} {change['key']} {json.dumps(change['fields'])}")
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {json.dumps(error['errors'])}")
+
+        summary = f"{report['created']} created, {report['updated']} updated, {report['unchanged']} unchanged"
+        if report['invalid']:
+            raise CommandError(f"{report['invalid']} invalid rows, nothing was imported ({summary} otherwise)")
+        if report['dry_run']:
+            self.stdout.write(self.style.WARNING(f'Dry run, nothing was imported: {summary}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Imported {options["kind"]}: {summary}'))
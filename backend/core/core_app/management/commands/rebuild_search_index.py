@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.core_app.models import Service, ServiceCategory
+from core.core_app.search import get_search_backend, rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for services and categories'
+
+    def handle(self, *args, **options):
+        if get_search_backend() is None:
+            self.stdout.write(self.style.WARNING('Database has no full-text index, nothing to rebuild'))
+            return
+
+        with transaction.atomic():
+            count = rebuild_index(Service, ServiceCategory)
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {count} catalog documents'))
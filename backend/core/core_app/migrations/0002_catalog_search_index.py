@@ -0,0 +1,33 @@
+from django.db import migrations
+
+from core.core_app.search import get_search_backend, rebuild_index
+
+
+def create_search_index(apps, schema_editor):
+    backend = get_search_backend(schema_editor.connection)
+    if backend is None:
+        return
+
+    backend.create_index(schema_editor)
+    rebuild_index(
+        apps.get_model('core_app', 'Service'),
+        apps.get_model('core_app', 'ServiceCategory'),
+        connection=schema_editor.connection,
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    backend = get_search_backend(schema_editor.connection)
+    if backend is not None:
+        backend.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
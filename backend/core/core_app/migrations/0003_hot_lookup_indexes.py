@@ -0,0 +1,33 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core_app', '0002_catalog_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='paymentterm',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='payment_term_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(fields=['category', 'is_active'], name='service_category_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='service',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='service_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='servicecategory',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='category_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tax',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['id'], name='tax_active_idx'),
+        ),
+    ]
@@ -26,6 +26,9 @@ class ServiceCategory(models.Model):
 
     class Meta:
         verbose_name_plural = "Service Categories"
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='category_active_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -45,6 +48,13 @@ class Service(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'is_active'], name='service_category_active_idx'),
+            # Active services only, in id order for keyset pagination
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='service_active_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.category.name})"
 
@@ -59,6 +69,11 @@ class Tax(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='tax_active_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.rate}%)"
 
@@ -74,5 +89,10 @@ class PaymentTerm(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_active=True), name='payment_term_active_idx'),
+        ]
+
     def __str__(self):
         return f"{self.name} ({self.days} days)"
@@ -0,0 +1,89 @@
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .cache import get_catalog_version
+from .models import Service, Tax
+
+CENT = Decimal('0.01')
+HUNDRED = Decimal('100')
+
+
+def to_money(amount):
+    return amount.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def get_tax_table():
+    """
+    Return the active taxes as `(id, name, rate)` tuples. The table is cached
+    under the taxes catalog version, so any Tax change loads it again.
+    """
+    key = f'catalog:taxes:v{get_catalog_version("taxes")}:table'
+    table = cache.get(key)
+    if table is None:
+        table = tuple(Tax.objects.filter(is_active=True).order_by('id').values_list('id', 'name', 'rate'))
+        cache.set(key, table, timeout=settings.CATALOG_CACHE_TIMEOUT)
+    return table
+
+
+def quote_carts(carts):
+    """
+    Price many carts at once: one query for every service in them and one
+    cached tax table for all.
+
+    Each active tax applies to the cart subtotal and is rounded to the cent
+    once, so a cart's tax does not depend on how its lines are split.
+
+    Args:
+        carts: A list of carts, each a list of `{'service_id', 'quantity'}` items
+
+    Returns:
+        list: One quote per cart, in order. A cart referring to unknown or
+        inactive services gets an `error` and the ids instead of totals.
+    """
+    service_ids = {item['service_id'] for items in carts for item in items}
+    prices = {
+        service_id: (name, price)
+        for service_id, name, price in Service.objects.filter(
+            id__in=service_ids, is_active=True
+        ).values_list('id', 'name', 'price')
+    }
+    taxes = get_tax_table()
+
+    quotes = []
+    for items in carts:
+        missing = sorted({item['service_id'] for item in items} - prices.keys())
+        if missing:
+            quotes.append({'error': 'Unknown or inactive services', 'service_ids': missing})
+            continue
+
+        lines = []
+        subtotal = Decimal('0.00')
+        for item in items:
+            name, price = prices[item['service_id']]
+            total = price * item['quantity']
+            subtotal += total
+            lines.append({
+                'service_id': item['service_id'],
+                'name': name,
+                'quantity': item['quantity'],
+                'unit_price': str(price),
+                'total': str(total),
+            })
+
+        tax_lines = []
+        tax_total = Decimal('0.00')
+        for tax_id, name, rate in taxes:
+            amount = to_money(subtotal * rate / HUNDRED)
+            tax_total += amount
+            tax_lines.append({'tax_id': tax_id, 'name': name, 'rate': str(rate), 'amount': str(amount)})
+
+        quotes.append({
+            'lines': lines,
+            'subtotal': str(subtotal),
+            'taxes': tax_lines,
+            'tax_total': str(tax_total),
+            'total': str(subtotal + tax_total),
+        })
+    return quotes
@@ -0,0 +1,316 @@
+"""
+Full-text search index for the service catalog.
+
+Services and categories are indexed into a dedicated table, maintained by
+signals on save/delete:
+
+* SQLite: an FTS5 virtual table ranked with bm25().
+* PostgreSQL: a weighted tsvector column with a GIN index, ranked with ts_rank().
+
+Other database vendors fall back to DRF's icontains search.
+"""
+import re
+
+from django.db import connection as default_connection
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
+
+SERVICE = 'service'
+CATEGORY = 'category'
+
+INDEX_TABLE = 'core_app_search_document'
+
+# Upper bound on terms taken from a query, keeps MATCH expressions small
+MAX_TERMS = 8
+
+# Documents per statement when indexing in bulk, below SQLite's bound variable limit
+BULK_BATCH_SIZE = 500
+
+
+def query_terms(query):
+    """Split a user query into lowercase word tokens usable for prefix matching."""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+def service_document(service, category_name=None):
+    if category_name is None:
+        category_name = service.category.name
+    return service.name, category_name, service.description
+
+
+def category_document(category):
+    return category.name, '', category.description
+
+
+class SQLiteSearchBackend:
+    """FTS5 index with prefix indexes for 2 and 3 character type-ahead."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def create_index(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE {INDEX_TABLE} USING fts5("
+            "doc_type UNINDEXED, object_id UNINDEXED, name, category_name, description, "
+            "tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+
+    def drop_index(self, schema_editor):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+    def index(self, doc_type, object_id, document):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {INDEX_TABLE} WHERE doc_type = %s AND object_id = %s",
+                [doc_type, object_id]
+            )
+            cursor.execute(
+                f"INSERT INTO {INDEX_TABLE} (doc_type, object_id, name, category_name, description) "
+                "VALUES (%s, %s, %s, %s, %s)",
+                [doc_type, object_id, *document]
+            )
+
+    def index_many(self, doc_type, documents):
+        """Index `(object_id, document)` pairs; one scan of the table per batch instead of per document."""
+        for start in range(0, len(documents), BULK_BATCH_SIZE):
+            batch = documents[start:start + BULK_BATCH_SIZE]
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {INDEX_TABLE} WHERE doc_type = %s AND object_id IN ({', '.join(['%s'] * len(batch))})",
+                    [doc_type, *(object_id for object_id, _ in batch)]
+                )
+                cursor.executemany(
+                    f"INSERT INTO {INDEX_TABLE} (doc_type, object_id, name, category_name, description) "
+                    "VALUES (%s, %s, %s, %s, %s)",
+                    [[doc_type, object_id, *document] for object_id, document in batch]
+                )
+
+    def remove(self, doc_type, object_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {INDEX_TABLE} WHERE doc_type = %s AND object_id = %s",
+                [doc_type, object_id]
+            )
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {INDEX_TABLE}")
+
+    def build_query(self, terms):
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def match_sql(self, doc_type, terms):
+        return (
+            f"SELECT object_id FROM {INDEX_TABLE} WHERE {INDEX_TABLE} MATCH %s AND doc_type = %s",
+            [self.build_query(terms), doc_type]
+        )
+
+    def search(self, doc_type, terms, limit):
+        with self.connection.cursor() as cursor:
+            # Columns weighted name > category_name > description
+            cursor.execute(
+                f"SELECT object_id FROM {INDEX_TABLE} "
+                f"WHERE {INDEX_TABLE} MATCH %s AND doc_type = %s "
+                f"ORDER BY bm25({INDEX_TABLE}, 0, 0, 10.0, 5.0, 1.0) LIMIT %s",
+                [self.build_query(terms), doc_type, limit]
+            )
+            return [int(row[0]) for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """Weighted tsvector documents with a GIN index."""
+
+    config = 'simple'
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def create_index(self, schema_editor):
+        schema_editor.execute(
+            f"CREATE TABLE {INDEX_TABLE} ("
+            "doc_type varchar(20) NOT NULL, "
+            "object_id bigint NOT NULL, "
+            "document tsvector NOT NULL, "
+            "PRIMARY KEY (doc_type, object_id))"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {INDEX_TABLE}_document_gin ON {INDEX_TABLE} USING GIN (document)"
+        )
+
+    def drop_index(self, schema_editor):
+        schema_editor.execute(f"DROP TABLE IF EXISTS {INDEX_TABLE}")
+
+    def index(self, doc_type, object_id, document):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {INDEX_TABLE} (doc_type, object_id, document) VALUES (%s, %s, "
+                f"setweight(to_tsvector('{self.config}', %s), 'A') || "
+                f"setweight(to_tsvector('{self.config}', %s), 'B') || "
+                f"setweight(to_tsvector('{self.config}', %s), 'C')) "
+                "ON CONFLICT (doc_type, object_id) DO UPDATE SET document = EXCLUDED.document",
+                [doc_type, object_id, *document]
+            )
+
+    def index_many(self, doc_type, documents):
+        """Index `(object_id, document)` pairs."""
+        with self.connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {INDEX_TABLE} (doc_type, object_id, document) VALUES (%s, %s, "
+                f"setweight(to_tsvector('{self.config}', %s), 'A') || "
+                f"setweight(to_tsvector('{self.config}', %s), 'B') || "
+                f"setweight(to_tsvector('{self.config}', %s), 'C')) "
+                "ON CONFLICT (doc_type, object_id) DO UPDATE SET document = EXCLUDED.document",
+                [[doc_type, object_id, *document] for object_id, document in documents]
+            )
+
+    def remove(self, doc_type, object_id):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"DELETE FROM {INDEX_TABLE} WHERE doc_type = %s AND object_id = %s",
+                [doc_type, object_id]
+            )
+
+    def clear(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {INDEX_TABLE}")
+
+    def build_query(self, terms):
+        return ' & '.join(f'{term}:*' for term in terms)
+
+    def match_sql(self, doc_type, terms):
+        return (
+            f"SELECT object_id FROM {INDEX_TABLE} "
+            f"WHERE document @@ to_tsquery('{self.config}', %s) AND doc_type = %s",
+            [self.build_query(terms), doc_type]
+        )
+
+    def search(self, doc_type, terms, limit):
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT object_id FROM {INDEX_TABLE}, to_tsquery('{self.config}', %s) query "
+                "WHERE document @@ query AND doc_type = %s "
+                "ORDER BY ts_rank(document, query) DESC LIMIT %s",
+                [self.build_query(terms), doc_type, limit]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+SEARCH_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(connection=None):
+    """Return the search backend for a connection, or None if the vendor is unsupported."""
+    connection = connection or default_connection
+    backend_class = SEARCH_BACKENDS.get(connection.vendor)
+    return backend_class(connection) if backend_class else None
+
+
+def index_service(service):
+    backend = get_search_backend()
+    if backend:
+        backend.index(SERVICE, service.pk, service_document(service))
+
+
+def index_category(category):
+    """Index a category and refresh the category name on its services."""
+    backend = get_search_backend()
+    if not backend:
+        return
+
+    backend.index(CATEGORY, category.pk, category_document(category))
+    services = category.services.only('id', 'category_id', 'name', 'description')
+    backend.index_many(SERVICE, [(service.pk, service_document(service, category.name)) for service in services])
+
+
+def remove_from_index(doc_type, object_id):
+    backend = get_search_backend()
+    if backend:
+        backend.remove(doc_type, object_id)
+
+
+def rebuild_index(Service, ServiceCategory, connection=None):
+    """Re-index every service and category. Model classes are passed in so migrations can use it."""
+    backend = get_search_backend(connection)
+    if not backend:
+        return 0
+
+    backend.clear()
+    count = 0
+    for category in ServiceCategory.objects.iterator():
+        backend.index(CATEGORY, category.pk, category_document(category))
+        count += 1
+    for service in Service.objects.select_related('category').iterator():
+        backend.index(SERVICE, service.pk, service_document(service))
+        count += 1
+    return count
+
+
+def search_ids(doc_type, query, limit):
+    """Return up to `limit` object ids matching `query`, best match first."""
+    terms = query_terms(query)
+    backend = get_search_backend()
+    if not terms or not backend:
+        return []
+    return backend.search(doc_type, terms, limit)
+
+
+class CatalogSearchFilter(filters.SearchFilter):
+    """
+    `?search=` filter backed by the full-text index. Views declare which
+    documents they search with `search_doc_type`; `search_fields` is still
+    used on databases without an index.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        backend = get_search_backend()
+        doc_type = getattr(view, 'search_doc_type', None)
+        if not backend or not doc_type:
+            return super().filter_queryset(request, queryset, view)
+
+        terms = query_terms(' '.join(self.get_search_terms(request)))
+        if not terms:
+            return queryset
+
+        sql, params = backend.match_sql(doc_type, terms)
+        return queryset.filter(pk__in=RawSQL(sql, params))
+
+
+class CatalogSearchMixin:
+    """
+    Adds a ranked `search/` endpoint for type-ahead: `?q=` is matched by
+    prefix against the index and at most `?limit=` results are returned,
+    best match first. Other query params filter as on the list endpoint.
+    """
+    search_default_limit = 10
+    search_max_limit = 50
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        return self.cached_response(request, 'search', self.ranked_search)
+
+    def ranked_search(self, request):
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', self.search_default_limit))
+        except ValueError:
+            limit = self.search_default_limit
+        limit = max(1, min(limit, self.search_max_limit))
+
+        queryset = self.get_queryset()
+        if get_search_backend() is None:
+            for term in query_terms(query):
+                queryset = queryset.filter(name__icontains=term)
+            results = list(queryset[:limit]) if query_terms(query) else []
+        else:
+            ids = search_ids(self.search_doc_type, query, limit)
+            objects = queryset.in_bulk(ids)
+            results = [objects[pk] for pk in ids if pk in objects]
+
+        serializer = self.get_serializer(results, many=True)
+        return Response({'query': query, 'results': serializer.data})
@@ -1,3 +1,4 @@
+from django.conf import settings
 from rest_framework import serializers
 from .models import ServiceCategory, Service, Tax, PaymentTerm
 
@@ -31,3 +32,26 @@ class PaymentTermSerializer(serializers.ModelSerializer):
         model = PaymentTerm
         fields = ['id', 'name', 'days', 'description', 'is_active', 'created_at', 'updated_at']
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+
+class QuoteItemSerializer(serializers.Serializer):
+    service_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1, max_value=1000, default=1)
+
+
+class QuoteCartSerializer(serializers.Serializer):
+    items = serializers.ListField(child=QuoteItemSerializer(), min_length=1)
+
+    def validate_items(self, items):
+        if len(items) > settings.QUOTE_MAX_ITEMS:
+            raise serializers.ValidationError(f'At most {settings.QUOTE_MAX_ITEMS} items per cart.')
+        return items
+
+
+class QuoteRequestSerializer(serializers.Serializer):
+    carts = serializers.ListField(child=QuoteCartSerializer(), min_length=1)
+
+    def validate_carts(self, carts):
+        if len(carts) > settings.QUOTE_MAX_CARTS:
+            raise serializers.ValidationError(f'At most {settings.QUOTE_MAX_CARTS} carts per request.')
+        return carts
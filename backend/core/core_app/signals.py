@@ -0,0 +1,41 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import Signal, receiver
+
+from . import search
+from .cache import invalidate_for_model
+from .models import ServiceCategory, Service, Tax, PaymentTerm
+
+# Sent with the model class as sender when catalog rows change, including
+# bulk imports, which send no model signals. Other apps use it to refresh
+# what they derive from the catalog.
+catalog_changed = Signal()
+
+
+@receiver([post_save, post_delete], sender=ServiceCategory)
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender=Tax)
+@receiver([post_save, post_delete], sender=PaymentTerm)
+def invalidate_catalog_cache(sender, **kwargs):
+    """Drop cached catalog responses that depend on the changed model."""
+    invalidate_for_model(sender.__name__)
+    catalog_changed.send(sender=sender)
+
+
+@receiver(post_save, sender=Service)
+def index_service_on_save(sender, instance, **kwargs):
+    search.index_service(instance)
+
+
+@receiver(post_delete, sender=Service)
+def remove_service_from_index(sender, instance, **kwargs):
+    search.remove_from_index(search.SERVICE, instance.pk)
+
+
+@receiver(post_save, sender=ServiceCategory)
+def index_category_on_save(sender, instance, **kwargs):
+    search.index_category(instance)
+
+
+@receiver(post_delete, sender=ServiceCategory)
+def remove_category_from_index(sender, instance, **kwargs):
+    search.remove_from_index(search.CATEGORY, instance.pk)
@@ -1,3 +1,391 @@
-from django.test import TestCase
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import skipUnless
+from urllib.parse import urlencode
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from dodo_backend.testing import QueryPlanAssertions
+from user_service.user_app.models import User
+from . import search
+from .models import ServiceCategory, Service, Tax, PaymentTerm
+
+
+class ServiceListQueryCountTests(TestCase):
+    """The services listing must not issue a query per row."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def create_services(self, count):
+        for i in range(count):
+            category = ServiceCategory.objects.create(name=f'Category {i}')
+            Service.objects.create(category=category, name=f'Service {i}', description='', price='100.00')
+
+    def test_query_count_is_constant_per_page(self):
+        # COUNT + SELECT joined with category
+        self.create_services(1)
+        with self.assertNumQueries(2):
+            self.client.get('/api/core/services/')
+
+        cache.clear()
+        self.create_services(9)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/core/services/')
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_list_reads_only_the_category_name(self):
+        self.create_services(1)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/core/services/')
+
+        self.assertEqual(response.json()['results'][0]['category_name'], 'Category 0')
+        select = queries.captured_queries[-1]['sql']
+        self.assertIn('"core_app_servicecategory"."name"', select)
+        self.assertNotIn('"core_app_servicecategory"."description"', select)
+
+
+class CatalogCacheTests(TestCase):
+    """Catalog reads are served from the cache until a catalog row changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.cleaning = ServiceCategory.objects.create(name='Cleaning')
+        self.sofa = Service.objects.create(category=self.cleaning, name='Sofa cleaning', description='', price='300.00')
+
+    def test_repeated_reads_are_cached(self):
+        first = self.client.get('/api/core/services/', {'is_active': 'true', 'ordering': 'name'})
+        self.assertEqual(first.status_code, 200)
+
+        # Same query in another order
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/core/services/', {'ordering': 'name', 'is_active': 'true'})
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+
+        self.client.get(f'/api/core/services/{self.sofa.pk}/')
+        with self.assertNumQueries(0):
+            detail = self.client.get(f'/api/core/services/{self.sofa.pk}/')
+        self.assertEqual(detail.json()['name'], 'Sofa cleaning')
+
+        # Other query params have their own entry
+        self.assertEqual(self.client.get('/api/core/services/', {'is_active': 'false'}).json()['count'], 0)
+
+    def test_etag_answers_not_modified(self):
+        etag = self.client.get('/api/core/categories/')['ETag']
+
+        response = self.client.get('/api/core/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(response.content, b'')
+
+        # Also when the response was not cached yet
+        cache.clear()
+        response = self.client.get('/api/core/categories/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.assertEqual(self.client.get('/api/core/categories/', HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_saves_invalidate(self):
+        etag = self.client.get('/api/core/services/')['ETag']
+
+        self.sofa.price = '350.00'
+        self.sofa.save()
+        response = self.client.get('/api/core/services/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['price'], '350.00')
+
+        # Services embed their category's name
+        self.cleaning.name = 'Home cleaning'
+        self.cleaning.save()
+        self.assertEqual(self.client.get('/api/core/services/').json()['results'][0]['category_name'], 'Home cleaning')
+
+    def test_deletes_invalidate(self):
+        self.assertEqual(self.client.get('/api/core/services/').json()['count'], 1)
+        self.client.get(f'/api/core/services/{self.sofa.pk}/')
+
+        self.sofa.delete()
+        self.assertEqual(self.client.get('/api/core/services/').json()['count'], 0)
+        self.assertEqual(self.client.get(f'/api/core/services/{self.sofa.pk}/').status_code, 404)
+
+    def test_other_namespaces_stay_cached(self):
+        self.client.get('/api/core/taxes/')
+
+        Service.objects.create(category=self.cleaning, name='Kitchen cleaning', description='', price='500.00')
+        with self.assertNumQueries(0):
+            self.client.get('/api/core/taxes/')
+
+
+@skipUnless(connection.vendor in search.SEARCH_BACKENDS, 'Database has no full-text index')
+class CatalogSearchTests(TestCase):
+    """Catalog search is ranked from the full-text index, which follows catalog changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.cleaning = ServiceCategory.objects.create(name='Cleaning', description='Homes and offices')
+        self.plumbing = ServiceCategory.objects.create(name='Plumbing', description='Taps and pipes')
+        self.deep = Service.objects.create(
+            category=self.cleaning, name='Deep cleaning', description='Every room, including the sofa', price='900.00'
+        )
+        self.sofa = Service.objects.create(
+            category=self.cleaning, name='Sofa shampoo', description='Fabric and leather', price='300.00'
+        )
+        self.tap = Service.objects.create(
+            category=self.plumbing, name='Tap repair', description='Leaking taps', price='200.00'
+        )
+
+    def search(self, q, url='/api/core/services/search/', **params):
+        response = self.client.get(url, {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [result['name'] for result in response.json()['results']]
+
+    def test_ranked_by_field(self):
+        # Name matches rank above description matches
+        self.assertEqual(self.search('sofa'), ['Sofa shampoo', 'Deep cleaning'])
+        # Category names are indexed with their services
+        self.assertEqual(self.search('plumbing'), ['Tap repair'])
+        self.assertEqual(self.search('cleaning', url='/api/core/categories/search/'), ['Cleaning'])
+
+    def test_prefixes_and_limit(self):
+        self.assertEqual(self.search('so'), ['Sofa shampoo', 'Deep cleaning'])
+        self.assertEqual(self.search('so', limit='1'), ['Sofa shampoo'])
+        self.assertEqual(self.search('deep clea'), ['Deep cleaning'])
+        self.assertEqual(self.search('?!'), [])
+
+    def test_list_search_filter(self):
+        response = self.client.get('/api/core/services/', {'search': 'tap', 'ordering': 'name'})
+        self.assertEqual([result['name'] for result in response.json()['results']], ['Tap repair'])
+
+    def test_index_follows_changes(self):
+        self.tap.name = 'Faucet repair'
+        self.tap.save()
+        self.assertEqual(self.search('faucet'), ['Faucet repair'])
+        # Still found by its description
+        self.assertEqual(self.search('tap'), ['Faucet repair'])
+
+        self.plumbing.name = 'Pipework'
+        self.plumbing.save()
+        self.assertEqual(self.search('pipework'), ['Faucet repair'])
+        self.assertEqual(self.search('plumbing'), [])
+
+        self.sofa.delete()
+        self.assertEqual(self.search('sofa'), ['Deep cleaning'])
+
+        self.plumbing.delete()
+        self.assertEqual(self.search('pipework', url='/api/core/categories/search/'), [])
+
+    def test_category_saves_reindex_services_in_bulk(self):
+        def save_queries(category):
+            with CaptureQueriesContext(connection) as queries:
+                category.save()
+            return len(queries)
+
+        few = save_queries(self.plumbing)
+        for i in range(5):
+            Service.objects.create(category=self.plumbing, name=f'Pipe {i}', description='', price='100.00')
+        self.assertEqual(save_queries(self.plumbing), few)
+        self.assertEqual(len(self.search('plumbing')), 6)
+
+    def test_rebuild_command(self):
+        search.get_search_backend().clear()
+        self.assertEqual(search.search_ids(search.SERVICE, 'sofa', 10), [])
+
+        out = StringIO()
+        call_command('rebuild_search_index', stdout=out)
+
+        self.assertIn('Indexed 5 catalog documents', out.getvalue())
+        self.assertEqual(search.search_ids(search.SERVICE, 'sofa', 10), [self.sofa.pk, self.deep.pk])
+        self.assertEqual(search.search_ids(search.CATEGORY, 'plumb', 10), [self.plumbing.pk])
+
+
+class CatalogQueryPlanTests(QueryPlanAssertions, TestCase):
+    """Catalog list filters must not scan the catalog tables."""
+
+    def test_services_by_category_use_index(self):
+        self.assertUsesIndex(Service.objects.filter(category_id=1, is_active=True))
+
+    def test_active_services_use_index(self):
+        self.assertUsesIndex(Service.objects.filter(is_active=True).order_by('-id'))
+
+    def test_active_filters_use_index(self):
+        for model in (ServiceCategory, Tax, PaymentTerm):
+            with self.subTest(model=model.__name__):
+                self.assertUsesIndex(model.objects.filter(is_active=True))
+
+
+class QuoteTests(TestCase):
+    """Carts are priced in one query with the cached tax table."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = ServiceCategory.objects.create(name='Cleaning')
+        self.sofa = Service.objects.create(category=category, name='Sofa cleaning', description='', price='333.33')
+        self.tank = Service.objects.create(category=category, name='Tank cleaning', description='', price='99.99')
+        self.retired = Service.objects.create(
+            category=category, name='Retired', description='', price='10.00', is_active=False
+        )
+        Tax.objects.create(name='CGST', rate='9.00')
+        Tax.objects.create(name='SGST', rate='9.00')
+        Tax.objects.create(name='Old cess', rate='1.00', is_active=False)
+
+    def quote(self, *carts):
+        return self.client.post('/api/core/quotes/', {'carts': [{'items': items} for items in carts]}, format='json')
+
+    def test_totals_are_exact(self):
+        response = self.quote([{'service_id': self.sofa.id, 'quantity': 3}, {'service_id': self.tank.id}])
+
+        self.assertEqual(response.status_code, 200)
+        quote = response.json()['quotes'][0]
+        self.assertEqual([line['total'] for line in quote['lines']], ['999.99', '99.99'])
+        self.assertEqual(quote['subtotal'], '1099.98')
+        # 9% of 1099.98 = 98.9982, rounded once per tax on the subtotal
+        self.assertEqual([tax['amount'] for tax in quote['taxes']], ['99.00', '99.00'])
+        self.assertEqual(quote['tax_total'], '198.00')
+        self.assertEqual(quote['total'], '1297.98')
+
+    def test_many_carts_cost_one_service_query(self):
+        self.quote([{'service_id': self.sofa.id}])  # Caches the tax table
+
+        carts = [[{'service_id': self.sofa.id}], [{'service_id': self.tank.id, 'quantity': 2}]] * 10
+        with self.assertNumQueries(1):
+            response = self.quote(*carts)
+        self.assertEqual(len(response.json()['quotes']), 20)
+
+    def test_tax_changes_apply_to_next_quote(self):
+        self.quote([{'service_id': self.tank.id}])
+        Tax.objects.filter(name='SGST').get().delete()
+
+        quote = self.quote([{'service_id': self.tank.id}]).json()['quotes'][0]
+        self.assertEqual([tax['name'] for tax in quote['taxes']], ['CGST'])
+
+    def test_inactive_services_fail_only_their_cart(self):
+        quotes = self.quote(
+            [{'service_id': self.retired.id}, {'service_id': 999999}],
+            [{'service_id': self.sofa.id}],
+        ).json()['quotes']
+
+        self.assertEqual(quotes[0], {'error': 'Unknown or inactive services', 'service_ids': sorted([self.retired.id, 999999])})
+        self.assertEqual(quotes[1]['total'], '393.33')
+
+    def test_rejects_invalid_carts(self):
+        self.assertEqual(self.quote([]).status_code, 400)
+        self.assertEqual(self.quote([{'service_id': self.sofa.id, 'quantity': 0}]).status_code, 400)
+
+
+class CatalogImportExportTests(TestCase):
+    """Catalog files are imported in bulk by natural key and exported back."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.cleaning = ServiceCategory.objects.create(name='Cleaning')
+        self.sofa = Service.objects.create(category=self.cleaning, name='Sofa cleaning', description='', price='300.00')
+        admin = User.objects.create_user(mobile='9000000001', user_type='admin')
+        self.client.force_authenticate(admin)
+
+    def upload(self, kind, content, name='catalog.csv', **params):
+        query = urlencode(params)
+        return self.client.post(
+            f'/api/core/catalog/{kind}/import/?{query}',
+            {'file': SimpleUploadedFile(name, content.encode())},
+            format='multipart',
+        )
+
+    def test_import_creates_and_updates_by_name(self):
+        content = (
+            'category,name,description,price,duration_minutes,is_active\n'
+            'Cleaning,Sofa cleaning,,350.00,,\n'
+            'Cleaning,Kitchen cleaning,Deep clean,999.00,120,true\n'
+        )
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload('services', content)
+        # One lookup, one insert and one update for the chunk
+        catalog_queries = [query['sql'].split(' ', 1)[0] for query in queries if '"core_app_service"' in query['sql']]
+        self.assertEqual(catalog_queries, ['SELECT', 'INSERT', 'UPDATE'])
+
+        self.assertEqual(response.status_code, 200, response.content)
+        report = response.json()
+        self.assertEqual((report['created'], report['updated'], report['unchanged']), (1, 1, 0))
+        self.assertEqual(report['changes'][0]['fields'], {'price': ['300.00', '350.00']})
+        self.sofa.refresh_from_db()
+        self.assertEqual(str(self.sofa.price), '350.00')
+        self.assertEqual(Service.objects.get(name='Kitchen cleaning').duration_minutes, 120)
+
+    def test_dry_run_writes_nothing(self):
+        response = self.upload('taxes', '{"name": "GST", "rate": "18.00"}\n', name='taxes.ndjson', dry_run='true')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['changes'], [
+            {'action': 'created', 'line': 1, 'key': 'GST', 'fields': {'name': 'GST', 'rate': '18.00'}}
+        ])
+        self.assertFalse(Tax.objects.exists())
+
+    def test_invalid_row_rolls_back_the_import(self):
+        content = (
+            'category,name,description,price\n'
+            'Cleaning,Kitchen cleaning,Deep clean,999.00\n'
+            'Plumbing,Tap repair,Leaks,abc\n'
+            'Cleaning,Kitchen cleaning,Again,1.00\n'
+        )
+        with override_settings(CATALOG_IMPORT_CHUNK_SIZE=1):
+            response = self.upload('services', content)
+
+        self.assertEqual(response.status_code, 400)
+        errors = {error['line']: error['errors'] for error in response.json()['errors']}
+        self.assertEqual(set(errors[3]), {'category', 'price'})
+        self.assertEqual(errors[4], {'row': 'Same key as line 2.'})
+        self.assertFalse(Service.objects.filter(name='Kitchen cleaning').exists())
+
+    def test_export_round_trips(self):
+        response = self.client.get('/api/core/catalog/services/export/', {'file_format': 'ndjson'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(json.loads(content), {
+            'category': 'Cleaning', 'name': 'Sofa cleaning', 'description': '',
+            'price': '300.00', 'duration_minutes': 60, 'is_active': True,
+        })
+
+        # Imported as is, nothing changes
+        report = self.upload('services', content, name='services.ndjson').json()
+        self.assertEqual((report['created'], report['updated'], report['unchanged']), (0, 0, 1))
+
+    def test_csv_export_round_trips_escaped_formulas(self):
+        Service.objects.filter(pk=self.sofa.pk).update(description='=1+2')
+
+        response = self.client.get('/api/core/catalog/services/export/', {'file_format': 'csv'})
+        content = b''.join(response.streaming_content).decode()
+        self.assertIn(",'=1+2,", content)
+
+        report = self.upload('services', content).json()
+        self.assertEqual((report['created'], report['updated'], report['unchanged']), (0, 0, 1))
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(None)
+        self.assertEqual(self.client.get('/api/core/catalog/taxes/export/').status_code, 401)
+
+    def test_commands(self):
+        out = StringIO()
+        call_command('export_catalog', 'categories', stdout=out)
+        self.assertEqual(out.getvalue(), 'name,description,is_active\r\nCleaning,,True\r\n')
+
+        path = os.path.join(tempfile.mkdtemp(), 'categories.csv')
+        with open(path, 'w') as f:
+            f.write('name,description\nCleaning,Homes and offices\nPlumbing,\n')
+        call_command('import_catalog', 'categories', path, stdout=StringIO())
+        self.assertEqual(
+            list(ServiceCategory.objects.order_by('id').values_list('name', 'description')),
+            [('Cleaning', 'Homes and offices'), ('Plumbing', '')],
+        )
@@ -4,7 +4,10 @@ from .views import (
     ServiceCategoryViewSet,
     ServiceViewSet,
     TaxViewSet,
-    PaymentTermViewSet
+    PaymentTermViewSet,
+    QuoteView,
+    CatalogExportView,
+    CatalogImportView
 )
 
 router = DefaultRouter()
@@ -14,5 +17,8 @@ router.register(r'taxes', TaxViewSet)
 router.register(r'payment-terms', PaymentTermViewSet)
 
 urlpatterns = [
+    path('quotes/', QuoteView.as_view(), name='quote'),
+    path('catalog/<str:kind>/export/', CatalogExportView.as_view(), name='catalog-export'),
+    path('catalog/<str:kind>/import/', CatalogImportView.as_view(), name='catalog-import'),
     path('', include(router.urls)),
 ]
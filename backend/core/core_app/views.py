@@ -1,15 +1,28 @@
-from rest_framework import viewsets, permissions, filters
+import csv
+import os
+
+from django.conf import settings
+from rest_framework import viewsets, views, permissions, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from dodo_backend.exports import export_response
+from .cache import CatalogCacheMixin
+from .catalog_io import FORMATS, export_catalog, get_resource, import_catalog, read_rows
 from .models import ServiceCategory, Service, Tax, PaymentTerm
+from .pricing import quote_carts
+from .search import CATEGORY, SERVICE, CatalogSearchFilter, CatalogSearchMixin
 from .serializers import (
     ServiceCategorySerializer,
     ServiceSerializer,
     TaxSerializer,
-    PaymentTermSerializer
+    PaymentTermSerializer,
+    QuoteRequestSerializer
 )
 
+# Service columns read by ServiceSerializer; category_name comes from the joined category
+SERVICE_COLUMNS = [name for name in ServiceSerializer.Meta.fields if name != 'category_name']
+
 
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
@@ -24,11 +37,21 @@ class IsAdminOrReadOnly(permissions.BasePermission):
         return request.user and request.user.is_authenticated and request.user.user_type == 'admin'
 
 
-class ServiceCategoryViewSet(viewsets.ModelViewSet):
+class IsAdminUser(permissions.BasePermission):
+    """
+    Permission to only allow admin users.
+    """
+    def has_permission(self, request, view):
+        return request.user and request.user.is_authenticated and request.user.user_type == 'admin'
+
+
+class ServiceCategoryViewSet(CatalogSearchMixin, CatalogCacheMixin, viewsets.ModelViewSet):
+    cache_namespace = 'categories'
     queryset = ServiceCategory.objects.all()
     serializer_class = ServiceCategorySerializer
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [CatalogSearchFilter, filters.OrderingFilter]
+    search_doc_type = CATEGORY
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'created_at']
 
@@ -44,16 +67,19 @@ class ServiceCategoryViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class ServiceViewSet(viewsets.ModelViewSet):
-    queryset = Service.objects.all()
+class ServiceViewSet(CatalogSearchMixin, CatalogCacheMixin, viewsets.ModelViewSet):
+    cache_namespace = 'services'
+    queryset = Service.objects.select_related('category')
     serializer_class = ServiceSerializer
     permission_classes = [IsAdminOrReadOnly]
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [CatalogSearchFilter, filters.OrderingFilter]
+    search_doc_type = SERVICE
     search_fields = ['name', 'description', 'category__name']
     ordering_fields = ['name', 'price', 'duration_minutes', 'created_at']
 
     def get_queryset(self):
-        queryset = Service.objects.all()
+        # category_name is read from the joined category row
+        queryset = Service.objects.select_related('category')
 
         # Filter by category if specified
         category_id = self.request.query_params.get('category_id', None)
@@ -66,10 +92,15 @@ class ServiceViewSet(viewsets.ModelViewSet):
             is_active = is_active.lower() == 'true'
             queryset = queryset.filter(is_active=is_active)
 
+        if self.action in ('list', 'search'):
+            # Only the name is read from the category
+            queryset = queryset.only(*SERVICE_COLUMNS, 'category__name')
+
         return queryset
 
 
-class TaxViewSet(viewsets.ModelViewSet):
+class TaxViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
+    cache_namespace = 'taxes'
     queryset = Tax.objects.all()
     serializer_class = TaxSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -89,7 +120,8 @@ class TaxViewSet(viewsets.ModelViewSet):
         return queryset
 
 
-class PaymentTermViewSet(viewsets.ModelViewSet):
+class PaymentTermViewSet(CatalogCacheMixin, viewsets.ModelViewSet):
+    cache_namespace = 'payment_terms'
     queryset = PaymentTerm.objects.all()
     serializer_class = PaymentTermSerializer
     permission_classes = [IsAdminOrReadOnly]
@@ -107,3 +139,77 @@ class PaymentTermViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(is_active=is_active)
 
         return queryset
+
+
+class QuoteView(views.APIView):
+    """
+    Price carts of services with the active taxes, many carts per request:
+    `{"carts": [{"items": [{"service_id": 1, "quantity": 2}]}]}`.
+    Amounts are decimal strings; quotes are returned in the order of the carts.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = QuoteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        quotes = quote_carts([cart['items'] for cart in serializer.validated_data['carts']])
+        return Response({'quotes': quotes})
+
+
+class CatalogExportView(views.APIView):
+    """
+    Stream a catalog (categories, services, taxes or payment_terms) as CSV or
+    NDJSON: `GET /api/core/catalog/services/export/?file_format=ndjson`.
+    The file can be imported again as is.
+    """
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, kind):
+        file_format = request.query_params.get('file_format', 'csv')
+        try:
+            lines = export_catalog(kind, file_format)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return export_response(lines, kind, file_format)
+
+
+class CatalogImportView(views.APIView):
+    """
+    Create and update catalog rows from an uploaded CSV or NDJSON `file`,
+    matching existing rows by name (category and name for services).
+    The format is taken from `?file_format=` or the file extension.
+    With `?dry_run=true` the changes are reported and not written.
+    Nothing is written if any row is invalid; the response lists the errors.
+    """
+    permission_classes = [IsAdminUser]
+
+    def post(self, request, kind):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'A file is required'}, status=status.HTTP_400_BAD_REQUEST)
+
+        file_format = request.query_params.get('file_format') or os.path.splitext(upload.name)[1][1:].lower()
+        if file_format not in FORMATS:
+            return Response(
+                {'error': f"Unknown format '{file_format}', expected one of: {', '.join(FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            get_resource(kind)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Large uploads are on disk; rows are read from the file as they are imported
+        lines = (line.decode('utf-8-sig') for line in upload)
+        try:
+            report = import_catalog(
+                kind,
+                read_rows(lines, file_format),
+                dry_run=request.query_params.get('dry_run', '').lower() == 'true',
+                chunk_size=settings.CATALOG_IMPORT_CHUNK_SIZE,
+            )
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': f'Could not read the file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(report, status=status.HTTP_400_BAD_REQUEST if report['invalid'] else status.HTTP_200_OK)
@@ -0,0 +1,42 @@
+import asyncio
+import weakref
+
+import aiohttp
+
+# event loop -> {name: ClientSession}. A session is bound to the loop it was
+# created on, so each loop (normally the one loop of an ASGI worker) gets its own.
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_client_session(name, limit=100, headers=None):
+    """
+    Return a pooled aiohttp session for the running event loop, creating it
+    on first use. `name` separates pools for different upstreams.
+    """
+    loop = asyncio.get_running_loop()
+    sessions = _sessions.setdefault(loop, {})
+
+    session = sessions.get(name)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=limit),
+            headers=headers,
+        )
+        sessions[name] = session
+    return session
+
+
+_background_tasks = set()
+
+
+def run_in_background(coroutine):
+    """
+    Schedule a coroutine on the running loop without awaiting it. Only use
+    this under an ASGI server: the loop outlives the request there, whereas
+    async views served over WSGI get a loop that ends with the request.
+    """
+    task = asyncio.get_running_loop().create_task(coroutine)
+    # The loop only keeps weak references to tasks
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
@@ -0,0 +1,110 @@
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.models.signals import post_delete, post_save
+
+# Per-request memo of the models whose reads may use a replica. Only set by
+# ReplicaRoutingMiddleware for GET/HEAD requests; None means "use the primary".
+_replica_reads = ContextVar('replica_reads', default=None)
+
+
+def _pin_key(label):
+    return f'db:primary-pin:{label}'
+
+
+def pin_to_primary(model):
+    """
+    Serve reads of a model from the primary for REPLICA_PIN_SECONDS. Called
+    after every write so neither the writer nor caches refilled right after
+    an invalidation read rows a lagging replica does not have yet. Bulk
+    writes, which send no signals, must call it themselves.
+    """
+    if settings.DATABASE_REPLICAS:
+        caches[settings.REPLICA_PIN_CACHE_ALIAS].set(
+            _pin_key(model._meta.label_lower), True, timeout=settings.REPLICA_PIN_SECONDS
+        )
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends reads of REPLICA_READ_MODELS to a random replica during GET/HEAD
+    requests, unless the model was written recently or the read happens in
+    a transaction. Every other read, and every write, uses the primary.
+    """
+
+    def __init__(self):
+        if settings.DATABASE_REPLICAS:
+            post_save.connect(self.on_write, weak=False, dispatch_uid='primary_replica_router_save')
+            post_delete.connect(self.on_write, weak=False, dispatch_uid='primary_replica_router_delete')
+
+    def on_write(self, sender, **kwargs):
+        if sender._meta.label_lower in settings.REPLICA_READ_MODELS:
+            pin_to_primary(sender)
+
+    def db_for_read(self, model, **hints):
+        allowed = _replica_reads.get()
+        if allowed is None or not settings.DATABASE_REPLICAS:
+            return 'default'
+
+        label = model._meta.label_lower
+        if label not in settings.REPLICA_READ_MODELS:
+            return 'default'
+        if connections['default'].in_atomic_block:
+            # Reads inside a transaction must see its own writes
+            return 'default'
+
+        if label not in allowed:
+            allowed[label] = not caches[settings.REPLICA_PIN_CACHE_ALIAS].get(_pin_key(label))
+        if not allowed[label]:
+            return 'default'
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == 'default'
+
+
+class ReplicaRoutingMiddleware:
+    """Lets the router use replicas while handling GET and HEAD requests."""
+    replica_methods = ('GET', 'HEAD')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if request.method not in self.replica_methods or not settings.DATABASE_REPLICAS:
+            return self.get_response(request)
+
+        token = _replica_reads.set({})
+        try:
+            return self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+
+    async def __acall__(self, request):
+        if request.method not in self.replica_methods or not settings.DATABASE_REPLICAS:
+            return await self.get_response(request)
+
+        # Context variables are copied into the threads running sync code
+        token = _replica_reads.set({})
+        try:
+            return await self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
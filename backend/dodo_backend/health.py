@@ -0,0 +1,154 @@
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+# Probes -------------------------------------------------------------------------
+# A probe takes no arguments and raises if its dependency is not usable.
+
+def check_database():
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT 1')
+        cursor.fetchone()
+
+
+def check_cache():
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        key = f'health:{os.getpid()}'
+        cache.set(key, 1, timeout=60)
+        if cache.get(key) != 1:
+            raise RuntimeError(f'Cache {alias} did not return the value just stored')
+
+
+_migrations_applied = False
+
+
+def check_migrations():
+    """Fails while the database lacks migrations this code expects."""
+    global _migrations_applied
+    # Once applied, migrations stay applied; skip loading the migration graph again
+    if _migrations_applied:
+        return
+
+    executor = MigrationExecutor(connection)
+    plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+    if plan:
+        raise RuntimeError(f'{len(plan)} unapplied migrations')
+    _migrations_applied = True
+
+
+# Monitor --------------------------------------------------------------------------
+
+def is_draining():
+    """Whether this server is shutting down: the HEALTH_DRAIN_FILE exists."""
+    return bool(settings.HEALTH_DRAIN_FILE) and os.path.exists(settings.HEALTH_DRAIN_FILE)
+
+
+class HealthMonitor:
+    """
+    Runs the readiness probes every `interval` seconds in a background
+    thread and keeps the last result, so that serving readiness costs the
+    same whatever the probes do, however often it is polled.
+    """
+
+    def __init__(self, probes, interval):
+        self.probes = probes
+        self.interval = interval
+        self.checks = None
+        self.checked_at = None
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def ensure_started(self):
+        # Threads do not survive a fork, so a forked worker starts its own
+        if self._thread is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='health-monitor', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Health checks failed to run")
+            finally:
+                close_old_connections()
+            time.sleep(self.interval)
+
+    def check(self):
+        """Run every probe now and keep the result."""
+        checks = {}
+        for name, probe in self.probes.items():
+            start = time.perf_counter()
+            try:
+                probe()
+                ok = True
+            except Exception as e:
+                logger.warning(f"Health check {name} failed: {str(e)}")
+                ok = False
+            checks[name] = {'ok': ok, 'duration_ms': round((time.perf_counter() - start) * 1000, 1)}
+
+        self.checks = checks
+        self.checked_at = time.time()
+
+    def readiness(self):
+        """
+        Return `(ready, status)` from the last probe run. A result older than
+        three intervals counts as failing, as the probes are stuck.
+        """
+        if is_draining():
+            return False, 'draining'
+        self.ensure_started()
+        if self.checked_at is None:
+            return False, 'starting'
+        if time.time() - self.checked_at > 3 * self.interval:
+            return False, 'stale'
+        if not all(check['ok'] for check in self.checks.values()):
+            return False, 'unavailable'
+        return True, 'ready'
+
+    def report(self):
+        """Readiness with the result of each probe, for the readiness endpoint."""
+        ready, status = self.readiness()
+        return ready, {
+            'status': status,
+            'checks': self.checks or {},
+            'checked_at': (
+                datetime.fromtimestamp(self.checked_at, tz=dt_timezone.utc).isoformat()
+                if self.checked_at else None
+            ),
+        }
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_monitor():
+    """Return the process' monitor of the HEALTH_CHECK_PROBES."""
+    global _monitor
+    if _monitor is None:
+        with _monitor_lock:
+            if _monitor is None:
+                probes = {}
+                for path in settings.HEALTH_CHECK_PROBES:
+                    name = path.rsplit('.', 1)[-1]
+                    probes[name[len('check_'):] if name.startswith('check_') else name] = import_string(path)
+                _monitor = HealthMonitor(probes, settings.HEALTH_CHECK_INTERVAL)
+    return _monitor
@@ -0,0 +1,296 @@
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
+
+# Prometheus' default latency buckets, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_metrics = []
+_collectors = []
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+class Histogram:
+    """A Prometheus histogram with a fixed set of labels, kept in this process."""
+
+    def __init__(self, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._values = {}  # label values -> [count per bucket..., sum, count]
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, labels, value):
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [0] * len(self.buckets) + [0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def collect(self):
+        with self._lock:
+            values = sorted((labels, list(entry)) for labels, entry in self._values.items())
+
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} histogram'
+        for labels, entry in values:
+            for bound, count in zip(self.buckets, entry):
+                yield f'{self.name}_bucket{_format_labels(self.labelnames, labels, [("le", _format_bound(bound))])} {count}'
+            yield f'{self.name}_bucket{_format_labels(self.labelnames, labels, [("le", "+Inf")])} {entry[-1]}'
+            yield f'{self.name}_sum{_format_labels(self.labelnames, labels)} {entry[-2]}'
+            yield f'{self.name}_count{_format_labels(self.labelnames, labels)} {entry[-1]}'
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+def sample(name, documentation, metric_type, values, labelnames=()):
+    """
+    Format `{label values: number}` as Prometheus text, for collectors that
+    read their numbers from elsewhere at scrape time.
+    """
+    yield f'# HELP {name} {documentation}'
+    yield f'# TYPE {name} {metric_type}'
+    for labels, value in sorted(values.items()):
+        yield f'{name}{_format_labels(labelnames, labels)} {value}'
+
+
+def register_collector(collector):
+    """
+    Add a function that yields Prometheus text lines to the `/metrics`
+    output, e.g. from an app's `ready()`.
+    """
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def render_metrics():
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.collect())
+    for collector in _collectors:
+        lines.extend(collector())
+    return '\n'.join(lines) + '\n'
+
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds', 'Time to produce a response.', ('method', 'route', 'status')
+)
+REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL queries run per request.', ('route',), QUERY_COUNT_BUCKETS
+)
+REQUEST_DB_DURATION = Histogram(
+    'http_request_db_duration_seconds', 'Time spent in SQL queries per request.', ('route',)
+)
+REQUEST_SERIALIZER_DURATION = Histogram(
+    'http_request_serializer_duration_seconds',
+    'Time spent validating and rendering DRF serializers per request, including the queries they run.',
+    ('route',),
+)
+EXTERNAL_CALL_DURATION = Histogram(
+    'external_call_duration_seconds', 'Time spent calling external services.', ('service',)
+)
+
+
+# Request metrics -----------------------------------------------------------------
+
+# Timings of the request being handled; None outside RequestMetricsMiddleware
+_request_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    """Time spent by one request in SQL, serializers and external calls."""
+
+    def __init__(self):
+        self.db = 0.0
+        self.db_queries = 0
+        self.serializer = 0.0
+        self.external = 0.0
+        self.in_serializer = False
+
+    def record_query(self, execute, sql, params, many, context):
+        """Database execute wrapper, see `connection.execute_wrapper`."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - start
+            self.db_queries += 1
+
+    def server_timing(self, total):
+        """Return the value of a `Server-Timing` header, durations in milliseconds."""
+        return ', '.join([
+            f'db;dur={self.db * 1000:.1f};desc="{self.db_queries} queries"',
+            f'serializer;dur={self.serializer * 1000:.1f}',
+            f'external;dur={self.external * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+
+@contextmanager
+def track_external(service):
+    """Time a call to an external service, e.g. `with track_external('msg91'):`."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        EXTERNAL_CALL_DURATION.observe((service,), elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.external += elapsed
+
+
+def _timed_serializer(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timings = _request_timings.get()
+        # Nested serializers are timed as part of the outermost one
+        if timings is None or timings.in_serializer:
+            return func(*args, **kwargs)
+
+        timings.in_serializer = True
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings.serializer += time.perf_counter() - start
+            timings.in_serializer = False
+
+    wrapper._timed = True
+    return wrapper
+
+
+def instrument_serializers():
+    """Time DRF serializer validation (`is_valid`) and rendering (`data`)."""
+    from rest_framework.serializers import BaseSerializer
+
+    if getattr(BaseSerializer.is_valid, '_timed', False):
+        return
+    BaseSerializer.is_valid = _timed_serializer(BaseSerializer.is_valid)
+    BaseSerializer.data = property(_timed_serializer(BaseSerializer.data.fget))
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route
+
+
+def _record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding queries to the current request's timings."""
+    timings = _request_timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    return timings.record_query(execute, sql, params, many, context)
+
+
+def instrument_connection(connection, **kwargs):
+    """
+    Time the connection's queries. Connections are per thread, and async
+    views run their queries in other threads than the middleware, so every
+    connection is wrapped as it opens and the wrapper finds the request
+    through the `_request_timings` context variable.
+    """
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+connection_created.connect(instrument_connection, dispatch_uid='metrics_instrument_connection')
+
+
+class RequestMetricsMiddleware:
+    """
+    Records per-route latency, SQL query count and time, serializer time
+    and external call time for `/metrics`. With SERVER_TIMING enabled, also
+    reports the request's numbers in a `Server-Timing` header. Keep it
+    first in MIDDLEWARE so it times the whole stack.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        instrument_serializers()
+        for connection in connections.all(initialized_only=True):
+            instrument_connection(connection)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_timings.reset(token)
+        return self.record(request, response, timings, time.perf_counter() - start)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _request_timings.set(timings)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_timings.reset(token)
+        return self.record(request, response, timings, time.perf_counter() - start)
+
+    def record(self, request, response, timings, total):
+        route = _route(request)
+        REQUEST_DURATION.observe((request.method, route, str(response.status_code)), total)
+        REQUEST_DB_QUERIES.observe((route,), timings.db_queries)
+        REQUEST_DB_DURATION.observe((route,), timings.db)
+        REQUEST_SERIALIZER_DURATION.observe((route,), timings.serializer)
+
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = timings.server_timing(total)
+        return response
+
+
+@require_GET
+def metrics_view(request):
+    """Prometheus scrape endpoint. Requires `Authorization: Bearer <METRICS_TOKEN>` if that is set."""
+    if settings.METRICS_TOKEN:
+        authorization = request.headers.get('Authorization', '')
+        if not constant_time_compare(authorization, f'Bearer {settings.METRICS_TOKEN}'):
+            return HttpResponse(status=401)
+
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
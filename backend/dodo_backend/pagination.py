@@ -0,0 +1,154 @@
+from collections import OrderedDict
+
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination: each page filters on the last seen key
+    instead of using OFFSET, and never runs COUNT(*), so deep pages cost the
+    same as the first one.
+
+    The key is the view's `cursor_ordering`. Only indexed keys keep pages
+    cheap, so `?ordering=` may only pick one of the view's `cursor_orderings`
+    (by default just `cursor_ordering`). `id` is added as a tiebreaker, so
+    rows with equal keys keep a stable order.
+    """
+    ordering = '-id'
+    tiebreaker = 'id'
+
+    def get_ordering(self, request, queryset, view):
+        default = self._as_tuple(getattr(view, 'cursor_ordering', None) or self.ordering)
+        ordering = default
+
+        for backend in getattr(view, 'filter_backends', []):
+            param = getattr(backend, 'ordering_param', None)
+            if param is None or param not in request.query_params:
+                continue
+            requested = backend().get_ordering(request, queryset, view)
+            if requested:
+                allowed = [self._as_tuple(o) for o in getattr(view, 'cursor_orderings', [default])]
+                if self._as_tuple(requested) not in allowed:
+                    raise ValidationError({param: 'Cursor pagination can only order by: {}'.format(
+                        '; '.join(','.join(o) for o in allowed)
+                    )})
+                ordering = self._as_tuple(requested)
+            break
+
+        if not any(field.lstrip('-') in (self.tiebreaker, 'pk') for field in ordering):
+            direction = '-' if ordering[0].startswith('-') else ''
+            ordering += (direction + self.tiebreaker,)
+        return ordering
+
+    @staticmethod
+    def _as_tuple(ordering):
+        return (ordering,) if isinstance(ordering, str) else tuple(ordering)
+
+
+class UncountedPageNumberPagination(PageNumberPagination):
+    """
+    Page number pagination without the COUNT(*) query. One extra row is
+    fetched to know whether a next page exists; `count` is omitted.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+            if self.page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message)
+
+        offset = (self.page_number - 1) * page_size
+        results = list(queryset[offset:offset + page_size + 1])
+        if not results and self.page_number > 1:
+            raise NotFound(self.invalid_page_message)
+
+        self.has_next = len(results) > page_size
+        self.request = request
+        return results[:page_size]
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return self._replace_page(url, self.page_number + 1)
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        return self._replace_page(url, self.page_number - 1)
+
+    def _replace_page(self, url, page_number):
+        if page_number == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, page_number)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        response_schema = super().get_paginated_response_schema(schema)
+        response_schema['properties'].pop('count', None)
+        return response_schema
+
+    def to_html(self):
+        return ''
+
+
+class DynamicPagination(BasePagination):
+    """
+    Default pagination for the API. Picks a strategy per request:
+
+    * `?pagination=cursor` (or a `?cursor=` param) -> `KeysetPagination`
+    * `?count=false` -> `UncountedPageNumberPagination`
+    * otherwise -> `PageNumberPagination`, as before
+
+    A viewset can make cursor mode its default with `pagination_mode = 'cursor'`;
+    `?pagination=page` then asks for numbered pages.
+    """
+    mode_query_param = 'pagination'
+    count_query_param = 'count'
+
+    def get_paginator(self, request, view):
+        mode = request.query_params.get(self.mode_query_param) or getattr(view, 'pagination_mode', 'page')
+        if mode == 'cursor' or KeysetPagination.cursor_query_param in request.query_params:
+            return KeysetPagination()
+        if request.query_params.get(self.count_query_param, '').lower() == 'false':
+            return UncountedPageNumberPagination()
+        return PageNumberPagination()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.paginator = self.get_paginator(request, view)
+        return self.paginator.paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return self.paginator.get_paginated_response(data)
+
+    def get_paginated_response_schema(self, schema):
+        return PageNumberPagination().get_paginated_response_schema(schema)
+
+    @property
+    def display_page_controls(self):
+        return getattr(getattr(self, 'paginator', None), 'display_page_controls', False)
+
+    def to_html(self):
+        return self.paginator.to_html()
+
+    def get_schema_fields(self, view):
+        return PageNumberPagination().get_schema_fields(view)
+
+    def get_schema_operation_parameters(self, view):
+        return PageNumberPagination().get_schema_operation_parameters(view)
@@ -53,18 +53,30 @@ INSTALLED_APPS = [
     'core.core_app',
     'roles.roles_app',
     'pwa_seo',
+    'task_queue',
 ]
 
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'auth_service.auth_app.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'dodo_backend.pagination.DynamicPagination',
     'PAGE_SIZE': 10,
+    # Auth endpoint rates, see auth_service.auth_app.throttling
+    'DEFAULT_THROTTLE_RATES': {
+        'otp_send_mobile': config('THROTTLE_OTP_SEND_MOBILE', default='5/hour'),
+        'otp_send_ip': config('THROTTLE_OTP_SEND_IP', default='30/hour'),
+        'otp_send_global': config('THROTTLE_OTP_SEND_GLOBAL', default='600/min'),
+        'otp_verify_mobile': config('THROTTLE_OTP_VERIFY_MOBILE', default='10/hour'),
+        'otp_verify_ip': config('THROTTLE_OTP_VERIFY_IP', default='60/hour'),
+        'otp_verify_global': config('THROTTLE_OTP_VERIFY_GLOBAL', default='1200/min'),
+        'admin_login_ip': config('THROTTLE_ADMIN_LOGIN_IP', default='20/hour'),
+        'admin_login_global': config('THROTTLE_ADMIN_LOGIN_GLOBAL', default='300/min'),
+    },
 }
 
 # JWT settings
@@ -82,14 +94,34 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'AUTH_TOKEN_CLASSES': ('rest_framework_simplejwt.tokens.AccessToken',),
     'TOKEN_TYPE_CLAIM': 'token_type',
+    'TOKEN_USER_CLASS': 'auth_service.auth_app.authentication.LazyTokenUser',
 }
 
 # MSG91 settings
 MSG91_AUTH_KEY = config('MSG91_AUTH_KEY')
 MSG91_TEMPLATE_ID = config('MSG91_TEMPLATE_ID')
 MSG91_SENDER_ID = config('MSG91_SENDER_ID')
+MSG91_API_URL = config('MSG91_API_URL', default='https://api.msg91.com/api/v5/otp')
+MSG91_CONNECT_TIMEOUT = config('MSG91_CONNECT_TIMEOUT', default=3.05, cast=float)
+MSG91_READ_TIMEOUT = config('MSG91_READ_TIMEOUT', default=10, cast=float)
+
+# OTP storage
+# CacheOTPStore keeps OTPs out of the database but needs a cache shared by all
+# workers; DatabaseOTPStore is the safe default for a per-process cache.
+OTP_STORE = config('OTP_STORE', default='auth_service.auth_app.otp_store.DatabaseOTPStore')
+OTP_CACHE_ALIAS = config('OTP_CACHE_ALIAS', default='default')
+OTP_TTL = config('OTP_TTL', default=10 * 60, cast=int)  # Seconds
+OTP_MAX_VERIFY_ATTEMPTS = config('OTP_MAX_VERIFY_ATTEMPTS', default=5, cast=int)
+
+# OTP delivery, by the auth_app.tasks.send_otp task on the `otp` queue. Failures the
+# gateway reports as transient are retried with exponential backoff.
+OTP_SMS_GATEWAY = config('OTP_SMS_GATEWAY', default='auth_service.auth_app.gateways.MSG91Gateway')
+OTP_DELIVERY_WORKERS = config('OTP_DELIVERY_WORKERS', default=4, cast=int)  # Pooled gateway connections
+OTP_DELIVERY_MAX_RETRIES = config('OTP_DELIVERY_MAX_RETRIES', default=3, cast=int)
+OTP_DELIVERY_BACKOFF = config('OTP_DELIVERY_BACKOFF', default=0.5, cast=float)  # Seconds, doubled per retry
 
 MIDDLEWARE = [
+    'dodo_backend.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -98,7 +130,28 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'dodo_backend.db_routers.ReplicaRoutingMiddleware',
+]
+
+# Request metrics (dodo_backend.metrics) are served in Prometheus format on /metrics.
+# Every process keeps its own, so scrape each worker. Set METRICS_TOKEN to require
+# `Authorization: Bearer <token>`.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+# Report each request's SQL, serializer and external call time in a Server-Timing header
+SERVER_TIMING = config('SERVER_TIMING', default=DEBUG, cast=bool)
+
+# Readiness probes (dodo_backend.health), run every HEALTH_CHECK_INTERVAL seconds in a
+# background thread of each process; /api/health/ready serves the last result
+HEALTH_CHECK_PROBES = [
+    'dodo_backend.health.check_database',
+    'dodo_backend.health.check_cache',
+    'dodo_backend.health.check_migrations',
+    'task_queue.health.check_broker',
 ]
+HEALTH_CHECK_INTERVAL = config('HEALTH_CHECK_INTERVAL', default=10, cast=int)
+# Readiness fails while this file exists: create it (`manage.py drain`) before a graceful
+# shutdown so load balancers stop routing here while in-flight requests finish
+HEALTH_DRAIN_FILE = config('HEALTH_DRAIN_FILE', default='/tmp/dodo-backend.drain')
 
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = True  # For development only, set to False in production
@@ -123,18 +176,126 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'dodo_backend.wsgi.application'
+ASGI_APPLICATION = 'dodo_backend.asgi.application'
+
+# Route I/O-bound endpoints to their async views. Only enable this when serving
+# dodo_backend.asgi:application with an ASGI server (e.g. uvicorn); under WSGI each
+# async view gets a fresh event loop and cannot keep background work running.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
 
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
+# SQLite by default; set DB_ENGINE=django.db.backends.postgresql (and the DB_* connection
+# settings) for PostgreSQL. Connections are kept open for DB_CONN_MAX_AGE seconds and
+# health-checked before reuse. Behind PgBouncer in transaction pooling mode, also set
+# DB_DISABLE_SERVER_SIDE_CURSORS=True.
+DB_ENGINE = config('DB_ENGINE', default='django.db.backends.sqlite3')
+
+if DB_ENGINE == 'django.db.backends.sqlite3':
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': config('DB_NAME', default=str(BASE_DIR / 'db.sqlite3')),
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': DB_ENGINE,
+            'NAME': config('DB_NAME', default='dodo'),
+            'USER': config('DB_USER', default='dodo'),
+            'PASSWORD': config('DB_PASSWORD', default=''),
+            'HOST': config('DB_HOST', default='localhost'),
+            'PORT': config('DB_PORT', default='5432'),
+            'CONN_MAX_AGE': config('DB_CONN_MAX_AGE', default=60, cast=int),
+            'CONN_HEALTH_CHECKS': config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool),
+            'DISABLE_SERVER_SIDE_CURSORS': config('DB_DISABLE_SERVER_SIDE_CURSORS', default=False, cast=bool),
+            'OPTIONS': {
+                'connect_timeout': config('DB_CONNECT_TIMEOUT', default=5, cast=int),
+            },
+        }
+    }
+
+    # Read replicas, as a comma separated list of hosts sharing the primary's credentials
+    for index, host in enumerate(config('DB_REPLICA_HOSTS', default='', cast=Csv())):
+        DATABASES[f'replica_{index}'] = {
+            **DATABASES['default'],
+            'HOST': host,
+            'TEST': {'MIRROR': 'default'},
+        }
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias.startswith('replica_')]
+DATABASE_ROUTERS = ['dodo_backend.db_routers.PrimaryReplicaRouter']
+
+# Models whose reads may be served by a replica during GET/HEAD requests:
+# the catalog, SEO metadata and sitemaps
+REPLICA_READ_MODELS = [
+    'core_app.servicecategory',
+    'core_app.service',
+    'core_app.tax',
+    'core_app.paymentterm',
+    'pwa_seo.seometadata',
+    'pwa_seo.sitemap',
+]
+
+# After a write, reads of the model stay on the primary this long; keep it above the
+# replication lag. The pin lives in a cache that must be shared by all workers.
+REPLICA_PIN_SECONDS = config('REPLICA_PIN_SECONDS', default=10, cast=int)
+REPLICA_PIN_CACHE_ALIAS = config('REPLICA_PIN_CACHE_ALIAS', default='default')
+
+
+# Cache
+# Use a shared backend (e.g. django.core.cache.backends.redis.RedisCache) when
+# running more than one worker so cache invalidations reach every process.
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='dodo-default'),
     }
 }
 
+# Cache holding throttle counters; must be shared by all workers for global limits
+THROTTLE_CACHE_ALIAS = config('THROTTLE_CACHE_ALIAS', default='default')
+
+# Admin permission sets (roles_app.rbac): shared cache entries are checked against the
+# role version; per-process entries are trusted for RBAC_LOCAL_CACHE_TTL seconds
+RBAC_CACHE_ALIAS = config('RBAC_CACHE_ALIAS', default='default')
+RBAC_CACHE_TIMEOUT = config('RBAC_CACHE_TIMEOUT', default=60 * 60, cast=int)
+RBAC_LOCAL_CACHE_SIZE = config('RBAC_LOCAL_CACHE_SIZE', default=4096, cast=int)
+RBAC_LOCAL_CACHE_TTL = config('RBAC_LOCAL_CACHE_TTL', default=5, cast=int)
+
+# Background tasks (task_queue). LocalBroker runs tasks on a thread pool in the process
+# that queued them and loses them if it exits; DatabaseBroker and RedisBroker keep them
+# until a `manage.py run_worker` process runs them. ImmediateBroker runs them inline.
+TASK_BROKER = config('TASK_BROKER', default='task_queue.brokers.LocalBroker')
+TASK_LOCAL_WORKERS = config('TASK_LOCAL_WORKERS', default=4, cast=int)
+TASK_REDIS_URL = config('TASK_REDIS_URL', default='redis://localhost:6379/0')
+TASK_REDIS_PREFIX = config('TASK_REDIS_PREFIX', default='tasks')
+TASK_WORKER_QUEUES = config('TASK_WORKER_QUEUES', default='otp,default', cast=Csv())  # Highest priority first
+TASK_WORKER_CONCURRENCY = config('TASK_WORKER_CONCURRENCY', default=4, cast=int)
+TASK_POLL_INTERVAL = config('TASK_POLL_INTERVAL', default=1.0, cast=float)  # Seconds
+# A claimed task not settled within this many seconds is handed to another worker,
+# so it must be longer than any task runs
+TASK_VISIBILITY_TIMEOUT = config('TASK_VISIBILITY_TIMEOUT', default=300, cast=int)
+# Periodic task intervals are claimed here; must be shared by all workers
+TASK_SCHEDULE_CACHE_ALIAS = config('TASK_SCHEDULE_CACHE_ALIAS', default='default')
+
+# Rendered catalog responses are invalidated on write, this only bounds their lifetime
+CATALOG_CACHE_TIMEOUT = config('CATALOG_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+# Limits of one price quote request (POST /api/core/quotes/)
+QUOTE_MAX_CARTS = config('QUOTE_MAX_CARTS', default=50, cast=int)
+QUOTE_MAX_ITEMS = config('QUOTE_MAX_ITEMS', default=100, cast=int)  # Per cart
+
+# Rows validated and written together by catalog imports
+CATALOG_IMPORT_CHUNK_SIZE = config('CATALOG_IMPORT_CHUNK_SIZE', default=500, cast=int)
+
+# Rows fetched per round trip by CSV / NDJSON exports
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -254,17 +415,52 @@ PWA_APP_SPLASH_SCREEN = [
 ]
 PWA_APP_DIR = 'ltr'
 PWA_APP_LANG = 'en-US'
+# Browser cache lifetime for manifest, service worker config and robots.txt (revalidated via ETag)
+PWA_CACHE_MAX_AGE = config('PWA_CACHE_MAX_AGE', default=300, cast=int)
 
 # Push notifications settings
 WEBPUSH_SETTINGS = {
     'VAPID_PUBLIC_KEY': config('VAPID_PUBLIC_KEY', default=''),
     'VAPID_PRIVATE_KEY': config('VAPID_PRIVATE_KEY', default=''),
-    'VAPID_ADMIN_EMAIL': config('VAPID_ADMIN_EMAIL', default='admin@example.com')
+    'VAPID_ADMIN_EMAIL': config('VAPID_ADMIN_EMAIL', default='admin@example.com'),
+    'TTL': config('WEBPUSH_TTL', default=0, cast=int),
+    'TIMEOUT': config('WEBPUSH_TIMEOUT', default=10, cast=float),
+    'MAX_WORKERS': config('WEBPUSH_MAX_WORKERS', default=16, cast=int),
+    'CHUNK_SIZE': config('WEBPUSH_CHUNK_SIZE', default=500, cast=int),
 }
 
+# Sitemaps are split into sections of at most SITEMAP_MAX_URLS entries (protocol limit: 50,000)
+SITEMAP_MAX_URLS = config('SITEMAP_MAX_URLS', default=50000, cast=int)
+SITEMAP_CACHE_ALIAS = config('SITEMAP_CACHE_ALIAS', default='default')
+SITEMAP_CACHE_TIMEOUT = config('SITEMAP_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+SITEMAP_MAX_AGE = config('SITEMAP_MAX_AGE', default=60 * 60, cast=int)
+# Seconds between a catalog change and the sitemap update it queues; edits in between share it
+SITEMAP_UPDATE_DELAY = config('SITEMAP_UPDATE_DELAY', default=60, cast=int)
+
+# Public site the sitemap links to, and the sources of its entries (see pwa_seo.sitemap_builder)
+SITE_URL = config('SITE_URL', default='https://dodoservices.com')
+SITEMAP_URL_PROVIDERS = [
+    'pwa_seo.sitemap_builder.StaticPagesProvider',
+    'pwa_seo.sitemap_builder.CategoryURLProvider',
+    'pwa_seo.sitemap_builder.ServiceURLProvider',
+    'pwa_seo.sitemap_builder.SEOMetadataURLProvider',
+]
+
+# Offline action sync
+OFFLINE_SYNC_BATCH_SIZE = config('OFFLINE_SYNC_BATCH_SIZE', default=100, cast=int)
+OFFLINE_BATCH_MAX_ACTIONS = config('OFFLINE_BATCH_MAX_ACTIONS', default=500, cast=int)
+
 # SEO settings
 SEO_SITE_NAME = 'Dodo Services'
 SEO_SITE_DESCRIPTION = 'Book home services like cleaning, plumbing, electrical, and more'
 SEO_TWITTER_CREATOR = '@dodoservices'
 SEO_TWITTER_SITE = '@dodoservices'
 SEO_DEFAULT_IMAGE = '/static/images/og-default.jpg'
+
+# Resolved SEO metadata: per-process LRU (not invalidated across processes, hence the short TTL)
+# in front of a shared cache that is invalidated on save
+SEO_CACHE_ALIAS = config('SEO_CACHE_ALIAS', default='default')
+SEO_CACHE_TIMEOUT = config('SEO_CACHE_TIMEOUT', default=60 * 60 * 24, cast=int)
+SEO_LOCAL_CACHE_SIZE = config('SEO_LOCAL_CACHE_SIZE', default=1024, cast=int)
+SEO_LOCAL_CACHE_TTL = config('SEO_LOCAL_CACHE_TTL', default=30, cast=int)
+SEO_MAX_BATCH_PAGES = 50
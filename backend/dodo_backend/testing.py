@@ -0,0 +1,24 @@
+from django.db import connection
+
+
+class QueryPlanAssertions:
+    """TestCase mixin for checking that hot queries are served by an index."""
+
+    def assertUsesIndex(self, queryset):
+        """Fail if the query plan of `queryset` reads any table with a full scan."""
+        if connection.vendor == 'postgresql':
+            # Tiny test tables make a sequential scan the cheapest plan; rule it
+            # out so the plan shows whether a usable index exists at all
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+            try:
+                plan = queryset.explain()
+            finally:
+                with connection.cursor() as cursor:
+                    cursor.execute('RESET enable_seqscan')
+            scans = [line for line in plan.splitlines() if 'Seq Scan' in line]
+        else:
+            plan = queryset.explain()
+            scans = [line for line in plan.splitlines() if ' SCAN ' in f' {line} ' and 'INDEX' not in line]
+
+        self.assertFalse(scans, f'Query falls back to a table scan:\n{plan}\n\n{queryset.query}')
@@ -0,0 +1,234 @@
+import os
+import tempfile
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from core.core_app.models import ServiceCategory, Service
+from pwa_seo.models import OfflineAction
+from user_service.user_app.models import User
+from .db_routers import ReplicaRoutingMiddleware, _replica_reads
+from .health import HealthMonitor, get_monitor
+from .testing import QueryPlanAssertions
+from .metrics import REQUEST_DB_QUERIES, REQUEST_DURATION, RequestMetricsMiddleware, render_metrics, track_external
+
+
+class RequestMetricsTests(TestCase):
+    """Requests are timed per route, with their SQL queries counted."""
+
+    def setUp(self):
+        cache.clear()
+        REQUEST_DURATION.clear()
+        REQUEST_DB_QUERIES.clear()
+        self.client = APIClient()
+        category = ServiceCategory.objects.create(name='Cleaning')
+        Service.objects.create(category=category, name='Deep cleaning', description='', price='100.00')
+
+    def test_records_latency_and_queries_per_route(self):
+        self.client.get('/api/core/services/')
+
+        metrics = render_metrics()
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="service-list",status="200"} 1', metrics)
+        # COUNT + SELECT
+        self.assertIn('http_request_db_queries_sum{route="service-list"} 2', metrics)
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        response = self.client.get('/api/core/services/')
+
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^db;dur=[\d.]+;desc="2 queries", serializer;dur=[\d.]+, external;dur=[\d.]+, total;dur=[\d.]+$',
+        )
+
+    @override_settings(SERVER_TIMING=False)
+    def test_no_server_timing_header_by_default(self):
+        response = self.client.get('/api/core/services/')
+
+        self.assertNotIn('Server-Timing', response)
+
+    def test_external_calls_are_timed(self):
+        with track_external('msg91'):
+            pass
+
+        self.assertIn('external_call_duration_seconds_count{service="msg91"}', render_metrics())
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_requires_token(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE http_request_duration_seconds histogram', response.content.decode())
+
+
+class AsyncMiddlewareTests(TestCase):
+    """Under ASGI the middleware run as coroutines, without thread hops of their own."""
+
+    def setUp(self):
+        cache.clear()
+        REQUEST_DURATION.clear()
+        REQUEST_DB_QUERIES.clear()
+
+    def test_middleware_are_coroutines_in_async_chains(self):
+        async def get_response(request):
+            return HttpResponse()
+
+        for middleware in (RequestMetricsMiddleware, ReplicaRoutingMiddleware):
+            self.assertTrue(iscoroutinefunction(middleware(get_response)))
+            self.assertFalse(iscoroutinefunction(middleware(lambda request: HttpResponse())))
+
+    async def test_async_requests_are_measured(self):
+        category = await ServiceCategory.objects.acreate(name='Cleaning')
+        await Service.objects.acreate(category=category, name='Deep cleaning', description='', price='100.00')
+
+        await AsyncClient().get('/api/core/services/')
+        await AsyncClient().get('/api/health/live')
+
+        metrics = render_metrics()
+        # The sync view's queries run in another thread and still count
+        self.assertIn('http_request_db_queries_sum{route="service-list"} 2', metrics)
+        self.assertIn('http_request_duration_seconds_count{method="GET",route="health-live",status="200"} 1', metrics)
+
+    @override_settings(DATABASE_REPLICAS=['replica_0'])
+    async def test_replica_reads_allowed_in_async_get(self):
+        seen = []
+
+        async def get_response(request):
+            seen.append(_replica_reads.get())
+            return HttpResponse()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        await middleware(RequestFactory().get('/'))
+        await middleware(RequestFactory().post('/'))
+
+        self.assertEqual(seen, [{}, None])
+        self.assertIsNone(_replica_reads.get())
+
+
+class PaginationTests(QueryPlanAssertions, TestCase):
+    """Lists are paged by number, by number without a count, or by keyset cursor."""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        category = ServiceCategory.objects.create(name='Cleaning')
+        self.services = [
+            Service.objects.create(category=category, name=f'Service {i}', description='', price='100.00')
+            for i in range(15)
+        ]
+
+    def walk(self, url):
+        """Return the ids of every page's results, following `next` links."""
+        ids = []
+        while url:
+            body = self.client.get(url).json()
+            self.assertNotIn('count', body)
+            ids.extend(row['id'] for row in body['results'])
+            url = body['next']
+        return ids
+
+    def test_page_mode(self):
+        body = self.client.get('/api/core/services/').json()
+        self.assertEqual(body['count'], 15)
+        self.assertEqual(len(body['results']), 10)
+        self.assertIn('page=2', body['next'])
+
+    def test_uncounted_mode(self):
+        with self.assertNumQueries(1):
+            body = self.client.get('/api/core/services/?count=false').json()
+        self.assertNotIn('count', body)
+
+        body = self.client.get(body['next']).json()
+        self.assertEqual((len(body['results']), body['next']), (5, None))
+
+    def test_cursor_mode(self):
+        ids = self.walk('/api/core/services/?pagination=cursor')
+        self.assertEqual(ids, sorted((service.id for service in self.services), reverse=True))
+
+    def test_cursor_mode_rejects_unindexed_ordering(self):
+        response = self.client.get('/api/core/services/?pagination=cursor&ordering=price')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json())
+
+    def test_offline_actions_and_users_page_by_number_unless_asked(self):
+        user = User.objects.create(mobile='9000000001', is_staff=True)
+        OfflineAction.objects.bulk_create(
+            OfflineAction(user=user, action_type='create', resource_type='note', data={}) for _ in range(15)
+        )
+        # Equal keys are paged by id
+        OfflineAction.objects.update(created_at=user.date_joined)
+        self.client.force_authenticate(user=user)
+        User.objects.bulk_create(User(mobile=f'91000000{i:02d}') for i in range(12))
+
+        # Clients count pending actions from the default listing
+        self.assertEqual(self.client.get('/api/offline-actions/?synced=false').json()['count'], 15)
+        self.assertEqual(self.client.get('/api/users/users/').json()['count'], 13)
+
+        ids = self.walk('/api/offline-actions/?pagination=cursor')
+        self.assertEqual(ids, list(OfflineAction.objects.order_by('-id').values_list('id', flat=True)))
+
+        ids = self.walk('/api/users/users/?pagination=cursor')
+        self.assertEqual(ids, list(User.objects.order_by('-date_joined', '-id').values_list('id', flat=True)))
+
+    def test_cursor_keys_are_indexed(self):
+        self.assertUsesIndex(User.objects.order_by('-date_joined', '-id'))
+        self.assertUsesIndex(OfflineAction.objects.filter(user_id=1).order_by('-created_at', '-id'))
+
+
+def failing_probe():
+    raise RuntimeError('down')
+
+
+class HealthMonitorTests(TestCase):
+    """Readiness is served from the last background probe run."""
+
+    def setUp(self):
+        self.drain_file = os.path.join(tempfile.mkdtemp(), 'drain')
+        self.addCleanup(lambda: os.path.exists(self.drain_file) and os.remove(self.drain_file))
+        # Probes run synchronously in these tests
+        patcher = mock.patch.object(HealthMonitor, 'ensure_started')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_not_ready_before_first_check(self):
+        with override_settings(HEALTH_DRAIN_FILE=self.drain_file):
+            self.assertEqual(HealthMonitor({}, 10).readiness(), (False, 'starting'))
+
+    def test_failing_probe_makes_it_unavailable(self):
+        monitor = HealthMonitor({'ok': lambda: None, 'broken': failing_probe}, 10)
+        with self.assertLogs('dodo_backend.health', 'WARNING'):
+            monitor.check()
+
+        with override_settings(HEALTH_DRAIN_FILE=self.drain_file):
+            ready, report = monitor.report()
+        self.assertEqual((ready, report['status']), (False, 'unavailable'))
+        self.assertEqual({name: check['ok'] for name, check in report['checks'].items()}, {'ok': True, 'broken': False})
+
+    def test_stale_result_is_not_ready(self):
+        monitor = HealthMonitor({}, 10)
+        monitor.check()
+        monitor.checked_at -= 31
+
+        with override_settings(HEALTH_DRAIN_FILE=self.drain_file):
+            self.assertEqual(monitor.readiness(), (False, 'stale'))
+
+    def test_readiness_endpoint(self):
+        get_monitor().check()
+
+        with override_settings(HEALTH_DRAIN_FILE=self.drain_file):
+            response = self.client.get('/api/health/ready')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(set(response.json()['checks']), {'database', 'cache', 'migrations', 'broker'})
+
+            open(self.drain_file, 'w').close()
+            response = self.client.get('/api/health/ready')
+            self.assertEqual((response.status_code, response.json()['status']), (503, 'draining'))
+
+            # Liveness is unaffected by draining
+            self.assertEqual(self.client.get('/api/health/live').status_code, 200)
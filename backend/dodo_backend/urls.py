@@ -20,6 +20,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from rest_framework.documentation import include_docs_urls
 
+from .metrics import metrics_view
+
 API_TITLE = 'Dodo Home Services API'
 API_DESCRIPTION = 'API for Dodo Home Services Platform'
 
@@ -41,6 +43,9 @@ urlpatterns = [
     # Core
     path('api/core/', include('core.core_app.urls')),
 
+    # Prometheus metrics
+    path('metrics', metrics_view, name='metrics'),
+
     # PWA and SEO
     path('', include('pwa_seo.urls')),
 ]
@@ -0,0 +1,239 @@
+"""
+Load test the backend end to end: OTP login, catalog browsing and offline
+action sync, driven at a fixed rate against a server that talks to local
+MSG91 and web push stubs. Run from the backend directory:
+
+    python -m loadtest --rate 20 --duration 60 --output report.json
+
+See `python -m loadtest --help` for the options.
+"""
+import argparse
+import base64
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from .runner import parse_mix, run_load, run_push_broadcast
+from .scenarios import SCENARIOS, Context
+from .stubs import FakeMSG91, FakePushService
+
+
+def b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def generate_p256_keys():
+    """Return `(private, public)` base64url keys, as VAPID and browsers use them."""
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    key = ec.generate_private_key(ec.SECP256R1())
+    private = key.private_numbers().private_value.to_bytes(32, 'big')
+    public = key.public_key().public_bytes(
+        serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+    )
+    return b64url(private), b64url(public)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m loadtest', description=__doc__.split('\n\n')[0])
+    parser.add_argument('--target', help='URL of a server already running with this run\'s database and stubs, instead of spawning one')
+    parser.add_argument('--server-cmd', default=f'{sys.executable} manage.py runserver --noreload {{addr}}',
+                        help='Command that starts the server; {addr} is replaced with host:port')
+    parser.add_argument('--addr', default='127.0.0.1:8765', help='Address the spawned server listens on')
+    parser.add_argument('--server-log', help='Append the spawned server\'s output to this file')
+    parser.add_argument('--rate', type=float, default=10, help='Scenario iterations started per second')
+    parser.add_argument('--duration', type=float, default=30, help='Seconds to generate load for')
+    parser.add_argument('--concurrency', type=int, default=50, help='Most iterations in flight at once')
+    parser.add_argument('--mix', default='login=1,catalog=5,offline=2', help='Scenario weights')
+    parser.add_argument('--users', type=int, default=200, help='Seeded customers')
+    parser.add_argument('--services', type=int, default=100, help='Seeded catalog services')
+    parser.add_argument('--msg91-latency', type=float, default=0.05, help='Seconds the MSG91 stub takes to answer')
+    parser.add_argument('--msg91-error-rate', type=float, default=0.0, help='Share of MSG91 requests failing with 500')
+    parser.add_argument('--push-latency', type=float, default=0.02, help='Seconds the push stub takes to answer')
+    parser.add_argument('--push-error-rate', type=float, default=0.0, help='Share of pushes failing with 500')
+    parser.add_argument('--push-rounds', type=int, default=3, help='Broadcasts to all subscriptions to time; 0 skips')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--max-error-rate', type=float, help='Exit 1 if the overall error rate is higher')
+    parser.add_argument('--max-p95-ms', type=float, help='Exit 1 if any endpoint has a higher p95')
+    args = parser.parse_args(argv)
+
+    args.mix = parse_mix(args.mix)
+    unknown = set(args.mix) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def configure_environment(msg91, workdir):
+    """Settings for this run; the spawned server inherits them, explicit ones win."""
+    private_key, public_key = generate_p256_keys()
+    defaults = {
+        'DJANGO_SETTINGS_MODULE': 'dodo_backend.settings',
+        'SECRET_KEY': 'loadtest-secret-key',
+        'ALLOWED_HOSTS': '127.0.0.1,localhost',
+        'DB_NAME': os.path.join(workdir, 'loadtest.sqlite3'),
+        'MSG91_AUTH_KEY': 'loadtest',
+        'MSG91_TEMPLATE_ID': 'loadtest',
+        'MSG91_SENDER_ID': 'LOADTS',
+        'VAPID_PRIVATE_KEY': private_key,
+        'VAPID_PUBLIC_KEY': public_key,
+        'HEALTH_DRAIN_FILE': os.path.join(workdir, 'drain'),
+        # Many logins come from one address and reuse the seeded numbers
+        'THROTTLE_OTP_SEND_MOBILE': '100000/min',
+        'THROTTLE_OTP_SEND_IP': '100000/min',
+        'THROTTLE_OTP_SEND_GLOBAL': '100000/min',
+        'THROTTLE_OTP_VERIFY_MOBILE': '100000/min',
+        'THROTTLE_OTP_VERIFY_IP': '100000/min',
+        'THROTTLE_OTP_VERIFY_GLOBAL': '100000/min',
+    }
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+    # Always the stub: a load test must never send real SMS
+    os.environ['MSG91_API_URL'] = msg91.url + '/api/v5/otp'
+
+
+def seed(args, msg91, push):
+    """Create the database and the users, catalog and push subscriptions the scenarios use."""
+    from django.core.management import call_command
+    from django.db import transaction
+
+    from auth_service.auth_app.tokens import ClaimsRefreshToken
+    from core.core_app.models import Service, ServiceCategory
+    from pwa_seo.models import PushSubscription
+    from user_service.user_app.models import User
+
+    call_command('migrate', verbosity=0, interactive=False)
+
+    with transaction.atomic():
+        categories = ServiceCategory.objects.bulk_create(
+            ServiceCategory(name=f'Category {i}', description='') for i in range(10)
+        )
+        services = Service.objects.bulk_create(
+            Service(
+                category=categories[i % len(categories)],
+                name=f'{"Deep cleaning" if i % 2 else "Plumbing"} {i}',
+                description='Seeded by the load test',
+                price='499.00',
+            )
+            for i in range(args.services)
+        )
+        users = User.objects.bulk_create(
+            User(mobile=f'9{i:09d}', user_type='customer') for i in range(args.users)
+        )
+        _, p256dh = generate_p256_keys()
+        PushSubscription.objects.bulk_create(
+            PushSubscription(
+                user=user, endpoint=f'{push.url}/push/{user.mobile}', p256dh=p256dh, auth=b64url(os.urandom(16)),
+            )
+            for user in users
+        )
+
+    return Context(
+        mobiles=[user.mobile for user in users],
+        access_tokens=[str(ClaimsRefreshToken.for_user(user).access_token) for user in users],
+        category_ids=[category.id for category in categories],
+        service_ids=[service.id for service in services],
+        msg91=msg91,
+    )
+
+
+def start_server(args):
+    """Spawn the server and wait until it answers its liveness probe."""
+    command = shlex.split(args.server_cmd.format(addr=args.addr))
+    log = open(args.server_log, 'ab') if args.server_log else subprocess.DEVNULL
+    server = subprocess.Popen(command, env=os.environ.copy(), stdout=log, stderr=subprocess.STDOUT)
+    base_url = f'http://{args.addr}'
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(f'Server exited with status {server.returncode}: {" ".join(command)}')
+        try:
+            if requests.get(base_url + '/api/health/live', timeout=1).status_code == 200:
+                return server, base_url
+        except requests.RequestException:
+            pass
+        time.sleep(0.25)
+    server.terminate()
+    raise SystemExit('Server did not become live within 60 seconds')
+
+
+def check_thresholds(args, report):
+    """Return the list of thresholds the run broke."""
+    broken = []
+    if args.max_error_rate is not None and report['load']['error_rate'] > args.max_error_rate:
+        broken.append(f"error rate {report['load']['error_rate']} > {args.max_error_rate}")
+    if args.max_p95_ms is not None:
+        for name, stats in report['load']['endpoints'].items():
+            if stats['p95_ms'] > args.max_p95_ms:
+                broken.append(f"{name} p95 {stats['p95_ms']}ms > {args.max_p95_ms}ms")
+    return broken
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    msg91 = FakeMSG91(latency=args.msg91_latency, error_rate=args.msg91_error_rate).start()
+    push = FakePushService(latency=args.push_latency, error_rate=args.push_error_rate).start()
+    workdir = tempfile.mkdtemp(prefix='dodo-loadtest-')
+    configure_environment(msg91, workdir)
+
+    import django
+    django.setup()
+
+    context = seed(args, msg91, push)
+
+    server = None
+    try:
+        if args.target:
+            base_url = args.target.rstrip('/')
+        else:
+            server, base_url = start_server(args)
+
+        report = {
+            'config': {
+                'target': base_url,
+                'rate': args.rate,
+                'duration': args.duration,
+                'concurrency': args.concurrency,
+                'mix': args.mix,
+                'msg91_latency': args.msg91_latency,
+                'msg91_error_rate': args.msg91_error_rate,
+            },
+            'load': run_load(base_url, SCENARIOS, args.mix, context, args.rate, args.duration, args.concurrency),
+            'stubs': {'msg91_requests': msg91.requests},
+        }
+        if args.push_rounds:
+            report['push_broadcast'] = run_push_broadcast(args.push_rounds)
+            report['stubs']['push_requests'] = push.requests
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+        msg91.stop()
+        push.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    broken = check_thresholds(args, report)
+    report['thresholds_broken'] = broken
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    for message in broken:
+        print(f'Threshold broken: {message}', file=sys.stderr)
+    return 1 if broken else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,155 @@
+import math
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from .scenarios import Client, ScenarioError
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list, or None if it is empty."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+class Recorder:
+    """Collects the duration and outcome of every request, per endpoint name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._durations = defaultdict(list)
+        self._errors = defaultdict(int)
+
+    def add(self, name, duration, ok=True):
+        with self._lock:
+            self._durations[name].append(duration)
+            if not ok:
+                self._errors[name] += 1
+
+    def summary(self, elapsed):
+        """Return `{endpoint: stats}` with throughput, latency percentiles in ms and error rate."""
+        with self._lock:
+            durations = {name: sorted(values) for name, values in self._durations.items()}
+            errors = dict(self._errors)
+
+        result = {}
+        for name, values in sorted(durations.items()):
+            count = len(values)
+            result[name] = {
+                'requests': count,
+                'errors': errors.get(name, 0),
+                'error_rate': round(errors.get(name, 0) / count, 4),
+                'throughput_rps': round(count / elapsed, 2) if elapsed else None,
+                'mean_ms': round(sum(values) / count * 1000, 1),
+                'p50_ms': round(percentile(values, 50) * 1000, 1),
+                'p95_ms': round(percentile(values, 95) * 1000, 1),
+                'p99_ms': round(percentile(values, 99) * 1000, 1),
+                'max_ms': round(values[-1] * 1000, 1),
+            }
+        return result
+
+
+def parse_mix(value):
+    """Parse `login=1,catalog=5` into `{'login': 1.0, 'catalog': 5.0}`."""
+    mix = {}
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+def run_load(base_url, scenarios, mix, context, rate, duration, concurrency):
+    """
+    Start scenario iterations at `rate` per second for `duration` seconds,
+    picking each scenario by its weight in `mix`, on up to `concurrency`
+    threads.
+
+    New iterations start on schedule whether or not earlier ones finished,
+    so a slow server shows up as growing latency rather than as a lower
+    request rate. Iterations that find every thread busy are dropped and
+    counted, since they would have measured the client instead.
+
+    Returns:
+        dict: Per-endpoint and per-scenario statistics, and run totals
+    """
+    recorder = Recorder()
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    outcomes = defaultdict(lambda: {'completed': 0, 'failed': 0})
+    failures = defaultdict(int)
+    state = {'in_flight': 0, 'dropped': 0}
+    lock = threading.Lock()
+
+    def iteration(name):
+        client = Client(base_url, recorder)
+        try:
+            scenarios[name](client, context)
+            outcome = 'completed'
+        except ScenarioError as e:
+            outcome = 'failed'
+            with lock:
+                failures[str(e)] += 1
+        finally:
+            client.close()
+        with lock:
+            outcomes[name][outcome] += 1
+            state['in_flight'] -= 1
+
+    start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='loadtest') as executor:
+        started = 0
+        while True:
+            due = start + started / rate
+            if due - start >= duration:
+                break
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            started += 1
+
+            with lock:
+                if state['in_flight'] >= concurrency:
+                    state['dropped'] += 1
+                    continue
+                state['in_flight'] += 1
+            executor.submit(iteration, random.choices(names, weights)[0])
+    elapsed = time.monotonic() - start
+
+    endpoints = recorder.summary(elapsed)
+    total_requests = sum(stats['requests'] for stats in endpoints.values())
+    total_errors = sum(stats['errors'] for stats in endpoints.values())
+    return {
+        'elapsed_s': round(elapsed, 2),
+        'requests': total_requests,
+        'errors': total_errors,
+        'error_rate': round(total_errors / total_requests, 4) if total_requests else 0.0,
+        'throughput_rps': round(total_requests / elapsed, 2),
+        'dropped_iterations': state['dropped'],
+        'scenarios': {name: dict(counts) for name, counts in sorted(outcomes.items())},
+        'failures': dict(sorted(failures.items(), key=lambda item: -item[1])[:20]),
+        'endpoints': endpoints,
+    }
+
+
+def run_push_broadcast(rounds):
+    """
+    Time `rounds` broadcasts to every seeded push subscription, in this
+    process, against the push service stub the subscriptions point at.
+    """
+    from pwa_seo.services import broadcast_web_push
+
+    recorder = Recorder()
+    start = time.monotonic()
+    result = {}
+    for _ in range(rounds):
+        began = time.perf_counter()
+        result = broadcast_web_push('Load test', 'Broadcast from the load test')
+        recorder.add('broadcast_web_push', time.perf_counter() - began, ok=result.get('failed') == 0)
+    stats = recorder.summary(time.monotonic() - start)['broadcast_web_push']
+    stats['sent_per_round'] = result.get('sent', 0)
+    stats['failed_per_round'] = result.get('failed', 0)
+    return stats
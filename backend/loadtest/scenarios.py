@@ -0,0 +1,116 @@
+import random
+import threading
+import time
+import uuid
+
+import requests
+
+
+class ScenarioError(Exception):
+    """A step of a scenario got an unexpected response; the iteration stops."""
+
+
+class Client:
+    """
+    The HTTP session of one virtual user. Every request is timed and
+    recorded under a name that does not depend on IDs in the URL.
+    """
+
+    def __init__(self, base_url, recorder, timeout=30):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def close(self):
+        self.session.close()
+
+    def request(self, method, path, name=None, expect=(200,), **kwargs):
+        name = name or f'{method} {path}'
+        start = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=self.timeout, **kwargs)
+        except requests.RequestException as e:
+            self.recorder.add(name, time.perf_counter() - start, ok=False)
+            raise ScenarioError(f'{name}: {e}')
+
+        ok = response.status_code in expect
+        self.recorder.add(name, time.perf_counter() - start, ok=ok)
+        if not ok:
+            raise ScenarioError(f'{name}: HTTP {response.status_code}')
+        return response
+
+    def authenticate(self, access_token):
+        self.session.headers['Authorization'] = f'Bearer {access_token}'
+
+
+class Context:
+    """Data shared by the scenarios: seeded users, catalog and the MSG91 stub."""
+
+    def __init__(self, mobiles, access_tokens, category_ids, service_ids, msg91):
+        self.mobiles = mobiles
+        self.access_tokens = access_tokens
+        self.category_ids = category_ids
+        self.service_ids = service_ids
+        self.msg91 = msg91
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def next_mobile(self):
+        # Round robin, so concurrent logins do not replace each other's OTPs
+        with self._lock:
+            mobile = self.mobiles[self._next % len(self.mobiles)]
+            self._next += 1
+        return mobile
+
+
+def login(client, context):
+    """OTP login: send OTP, read it from the MSG91 stub, verify it, refresh the token."""
+    mobile = context.next_mobile()
+    client.request('POST', '/api/auth/otp/send/', json={'mobile': mobile})
+
+    otp = context.msg91.pop_otp(mobile)
+    if otp is None:
+        raise ScenarioError(f'No OTP delivered to {mobile}')
+
+    tokens = client.request('POST', '/api/auth/otp/verify/', json={'mobile': mobile, 'otp': otp}).json()
+    client.request('POST', '/api/auth/token/refresh/', json={'refresh': tokens['refresh']})
+
+
+def browse_catalog(client, context):
+    """Anonymous catalog browsing: categories, a category's services, a search and a service."""
+    client.request('GET', '/api/core/categories/')
+    client.request(
+        'GET', f'/api/core/services/?category_id={random.choice(context.category_ids)}',
+        name='GET /api/core/services/?category_id={id}',
+    )
+    client.request('GET', '/api/core/services/?search=cleaning', name='GET /api/core/services/?search={term}')
+    client.request(
+        'GET', f'/api/core/services/{random.choice(context.service_ids)}/',
+        name='GET /api/core/services/{id}/',
+    )
+
+
+def offline_sync(client, context):
+    """A signed-in user uploads a batch of offline actions, retries it, then syncs."""
+    client.authenticate(random.choice(context.access_tokens))
+    actions = [
+        {
+            'action_type': 'create',
+            'resource_type': 'booking',
+            'data': {'service_id': random.choice(context.service_ids), 'note': 'load test'},
+            'idempotency_key': uuid.uuid4().hex,
+        }
+        for _ in range(5)
+    ]
+    client.request('POST', '/api/offline-actions/batch/', json=actions, expect=(201,))
+    # Flaky connections make clients upload the same batch again
+    client.request('POST', '/api/offline-actions/batch/', json=actions, expect=(201,), name='POST /api/offline-actions/batch/ (retry)')
+    client.request('POST', '/api/offline-actions/sync/')
+
+
+SCENARIOS = {
+    'login': login,
+    'catalog': browse_catalog,
+    'offline': offline_sync,
+}
@@ -0,0 +1,104 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def respond(self, status, body=b''):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self.read_body()
+        if stub.latency:
+            time.sleep(stub.latency)
+        if stub.error_rate and random.random() < stub.error_rate:
+            self.respond(500, b'{"type":"error","message":"stub failure"}')
+            return
+        self.respond(*stub.handle(self.path, body))
+
+
+class StubServer:
+    """
+    An HTTP service on a free local port, answering POSTs from a background
+    thread after `latency` seconds, failing `error_rate` of them with a 500.
+    """
+
+    def __init__(self, latency=0.0, error_rate=0.0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.stub = self
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address
+        return f'http://{host}:{port}'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def handle(self, path, body):
+        """Return `(status, body)` for an accepted request."""
+        raise NotImplementedError
+
+
+class FakeMSG91(StubServer):
+    """Accepts MSG91 OTP requests and remembers the last OTP sent to each number."""
+
+    def __init__(self, **options):
+        super().__init__(**options)
+        self.otps = {}
+        self._sent = threading.Condition(self._lock)
+
+    def handle(self, path, body):
+        payload = json.loads(body)
+        with self._sent:
+            self.requests += 1
+            # Keyed without the country code, as the app's users enter them
+            self.otps[payload['mobile'][-10:]] = payload['otp']
+            self._sent.notify_all()
+        return 200, b'{"type":"success","request_id":"stub"}'
+
+    def pop_otp(self, mobile, timeout=10):
+        """Wait for an OTP to reach `mobile` and return it, or None on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._sent:
+            while mobile[-10:] not in self.otps:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._sent.wait(remaining)
+            return self.otps.pop(mobile[-10:])
+
+
+class FakePushService(StubServer):
+    """Accepts web push messages on any path, like a browser vendor's push service."""
+
+    def handle(self, path, body):
+        with self._lock:
+            self.requests += 1
+        return 201, b''
@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class PwaSeoConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'pwa_seo'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,16 @@
+from dodo_backend.exports import parse_bool, parse_moment
+
+# Query params of the offline action list, its export and `export_offline_actions`: {param: (lookup, parse)}
+OFFLINE_ACTION_FILTERS = {
+    'synced': ('synced', parse_bool),
+    'action_type': ('action_type', str),
+    'resource_type': ('resource_type', str),
+    'created_after': ('created_at__gte', parse_moment),
+    'created_before': ('created_at__lt', parse_moment),
+}
+
+OFFLINE_ACTION_EXPORT_COLUMNS = {
+    name: name for name in
+    ['id', 'user_id', 'action_type', 'resource_type', 'resource_id', 'data', 'idempotency_key',
+     'created_at', 'synced', 'synced_at']
+}
@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Fail readiness checks on this host ahead of a graceful shutdown, or stop doing so with --undo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--undo', action='store_true', help='Pass readiness checks again')
+
+    def handle(self, *args, **options):
+        if not settings.HEALTH_DRAIN_FILE:
+            raise CommandError('HEALTH_DRAIN_FILE is not set')
+
+        drain_file = Path(settings.HEALTH_DRAIN_FILE)
+        if options['undo']:
+            drain_file.unlink(missing_ok=True)
+            self.stdout.write(self.style.SUCCESS('Readiness restored'))
+        else:
+            drain_file.touch()
+            self.stdout.write(self.style.SUCCESS(f'Draining: readiness fails while {drain_file} exists'))
@@ -0,0 +1,14 @@
+from dodo_backend.exports import ExportCommand
+from pwa_seo.filters import OFFLINE_ACTION_EXPORT_COLUMNS, OFFLINE_ACTION_FILTERS
+from pwa_seo.models import OfflineAction
+
+
+class Command(ExportCommand):
+    help = "Write every user's offline actions as CSV or NDJSON"
+    exports = {
+        'offline_actions': (
+            OfflineAction.objects.all,
+            OFFLINE_ACTION_EXPORT_COLUMNS,
+            {**OFFLINE_ACTION_FILTERS, 'user': ('user_id', int)},
+        ),
+    }
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from pwa_seo.sitemaps import warm_sitemaps
+
+
+class Command(BaseCommand):
+    help = 'Render every sitemap section into the cache'
+
+    def handle(self, *args, **options):
+        count = warm_sitemaps()
+        self.stdout.write(self.style.SUCCESS(f'Cached {count} sitemap sections'))
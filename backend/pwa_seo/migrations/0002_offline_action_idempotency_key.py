@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-18 17:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pwa_seo', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offlineaction',
+            name='idempotency_key',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+        migrations.AddConstraint(
+            model_name='offlineaction',
+            constraint=models.UniqueConstraint(condition=models.Q(('idempotency_key__isnull', False)), fields=('user', 'idempotency_key'), name='unique_offline_action_idempotency_key'),
+        ),
+    ]
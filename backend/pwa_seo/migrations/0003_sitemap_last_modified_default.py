@@ -0,0 +1,19 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:00
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pwa_seo', '0002_offline_action_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sitemap',
+            name='last_modified',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-18 18:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pwa_seo', '0003_sitemap_last_modified_default'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='offlineaction',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='offline_action_user_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='offlineaction',
+            index=models.Index(condition=models.Q(('synced', False)), fields=['user', 'id'], name='offline_action_pending_idx'),
+        ),
+    ]
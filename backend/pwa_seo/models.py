@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -35,6 +36,7 @@ class OfflineAction(models.Model):
     resource_type = models.CharField(max_length=50)  # e.g., 'booking', 'service', etc.
     resource_id = models.CharField(max_length=50, null=True, blank=True)  # Null for create actions
     data = models.JSONField()  # The data to be synced
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True)  # Client-generated, dedupes retries
     created_at = models.DateTimeField(auto_now_add=True)
     synced = models.BooleanField(default=False)
     synced_at = models.DateTimeField(null=True, blank=True)
@@ -43,6 +45,18 @@ class OfflineAction(models.Model):
         verbose_name = 'Offline Action'
         verbose_name_plural = 'Offline Actions'
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', '-created_at', '-id'], name='offline_action_user_recent_idx'),
+            # Pending actions only; sync walks them per user in id order
+            models.Index(fields=['user', 'id'], condition=models.Q(synced=False), name='offline_action_pending_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='unique_offline_action_idempotency_key',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.action_type} {self.resource_type} by {self.user.email or self.user.mobile}"
@@ -108,7 +122,8 @@ class Sitemap(models.Model):
         ),
         default='monthly'
     )
-    last_modified = models.DateTimeField(auto_now=True)
+    # Set from the source page's updated_at by the sitemap builder
+    last_modified = models.DateTimeField(default=timezone.now)
 
     class Meta:
         verbose_name = 'Sitemap Entry'
@@ -0,0 +1,222 @@
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.http import HttpResponse, JsonResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from rest_framework.exceptions import ValidationError
+
+from .serializers import ManifestSerializer, ServiceWorkerSerializer, WebPushSerializer
+
+APP_TYPES = ('customer', 'vendor', 'admin')
+
+
+def normalize_app_type(app_type):
+    if app_type not in APP_TYPES:
+        return 'customer'  # Default to customer app
+    return app_type
+
+
+# Document builders -------------------------------------------------------------
+#
+# These only depend on settings and the app type (robots.txt also on the
+# date), so each document is built and validated once per process, or once
+# a day, and then served as pre-encoded bytes.
+
+def build_manifest(app_type):
+    manifest_data = {
+        'name': settings.PWA_APP_NAME,
+        'short_name': f"Dodo {app_type.capitalize()}",
+        'description': settings.PWA_APP_DESCRIPTION,
+        'start_url': settings.PWA_APP_START_URL,
+        'display': settings.PWA_APP_DISPLAY,
+        'background_color': settings.PWA_APP_BACKGROUND_COLOR,
+        'theme_color': settings.PWA_APP_THEME_COLOR,
+        'orientation': settings.PWA_APP_ORIENTATION,
+        'icons': settings.PWA_APP_ICONS,
+        'scope': settings.PWA_APP_SCOPE,
+        'dir': settings.PWA_APP_DIR,
+        'lang': settings.PWA_APP_LANG,
+    }
+
+    # App-specific customizations
+    if app_type == 'vendor':
+        manifest_data['name'] = 'Dodo Services - Vendor Portal'
+        manifest_data['short_name'] = 'Dodo Vendor'
+    elif app_type == 'admin':
+        manifest_data['name'] = 'Dodo Services - Admin Panel'
+        manifest_data['short_name'] = 'Dodo Admin'
+
+    serializer = ManifestSerializer(data=manifest_data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+
+SERVICE_WORKER_URLS = [
+    '/',
+    '/offline',
+    '/static/css/main.css',
+    '/static/js/main.js',
+    '/static/images/logo.png',
+]
+
+APP_SERVICE_WORKER_URLS = {
+    'customer': ['/services', '/blog', '/contact', '/about'],
+    'vendor': ['/dashboard', '/bookings', '/services', '/earnings'],
+    'admin': ['/dashboard', '/users', '/services', '/bookings'],
+}
+
+
+def static_assets_hash(urls):
+    """
+    Hash the contents of the static files among `urls`, so the service
+    worker cache version changes whenever a cached asset changes.
+    """
+    static_url = '/' + settings.STATIC_URL.lstrip('/')
+    digest = hashlib.sha256()
+    for url in sorted(urls):
+        digest.update(url.encode('utf-8'))
+        if not url.startswith(static_url):
+            continue
+        path = finders.find(url[len(static_url):])
+        if path:
+            with open(path, 'rb') as f:
+                for block in iter(lambda: f.read(64 * 1024), b''):
+                    digest.update(block)
+    return digest.hexdigest()
+
+
+def build_service_worker_config(app_type):
+    urls_to_cache = SERVICE_WORKER_URLS + APP_SERVICE_WORKER_URLS[app_type]
+    assets_hash = static_assets_hash(urls_to_cache)
+
+    sw_data = {
+        'cache_name': f'dodo-{app_type}-cache-{assets_hash[:8]}',
+        'urls_to_cache': urls_to_cache,
+        'offline_page': '/offline',
+        'cache_version': int(assets_hash[:8], 16),
+    }
+
+    serializer = ServiceWorkerSerializer(data=sw_data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+
+def build_webpush_config():
+    data = {
+        'public_key': settings.WEBPUSH_SETTINGS.get('VAPID_PUBLIC_KEY', '')
+    }
+
+    serializer = WebPushSerializer(data=data)
+    serializer.is_valid(raise_exception=True)
+    return serializer.data
+
+
+def build_robots_txt(app_type):
+    if app_type == 'customer':
+        lines = [
+            "# Dodo Services Customer App Robots.txt",
+            "# Last updated: " + timezone.localdate().strftime('%Y-%m-%d'),
+            "",
+            "# Allow all crawlers",
+            "User-agent: *",
+            "Allow: /",
+            "Disallow: /api/",
+            "Disallow: /account/",
+            "Disallow: /login",
+            "Disallow: /register",
+            "Disallow: /offline",
+            "Disallow: /_next/",
+            "",
+            "# Sitemap locations",
+            "Sitemap: https://dodoservices.com/sitemap-index.xml",
+            "Sitemap: https://dodoservices.com/sitemap.xml",
+            "",
+            "# Crawl delay for bots",
+            "Crawl-delay: 10",
+        ]
+    else:
+        # For vendor and admin apps, disallow all crawling
+        lines = [
+            f"# Dodo Services {app_type.capitalize()} App Robots.txt",
+            "# Last updated: " + timezone.localdate().strftime('%Y-%m-%d'),
+            "",
+            "# Disallow all crawlers - This is a private portal",
+            "User-agent: *",
+            "Disallow: /",
+        ]
+
+    return "\n".join(lines)
+
+
+# Precomputed responses ----------------------------------------------------------
+
+class PrecomputedDocument:
+    """An encoded response body with its content type and strong ETag."""
+
+    def __init__(self, body, content_type):
+        self.body = body
+        self.content_type = content_type
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    @classmethod
+    def json(cls, data):
+        return cls(json.dumps(data, separators=(',', ':')).encode('utf-8'), 'application/json')
+
+    @classmethod
+    def text(cls, content):
+        return cls(content.encode('utf-8'), 'text/plain')
+
+
+BUILDERS = {
+    'manifest': lambda app_type: PrecomputedDocument.json(build_manifest(app_type)),
+    'sw-config': lambda app_type: PrecomputedDocument.json(build_service_worker_config(app_type)),
+    'webpush-config': lambda app_type: PrecomputedDocument.json(build_webpush_config()),
+    'robots': lambda app_type: PrecomputedDocument.text(build_robots_txt(app_type)),
+}
+
+# Documents stamped with the current date, rebuilt when the date changes
+DATED_DOCUMENTS = {'robots'}
+
+# (name, app_type) -> (document, date it was built on or None)
+_documents = {}
+_documents_lock = threading.Lock()
+
+
+def get_document(name, app_type='customer'):
+    """Return the precomputed document, building it on first use."""
+    key = (name, app_type)
+    built_on = timezone.localdate() if name in DATED_DOCUMENTS else None
+    entry = _documents.get(key)
+    if entry is None or entry[1] != built_on:
+        with _documents_lock:
+            entry = _documents.get(key)
+            if entry is None or entry[1] != built_on:
+                entry = _documents[key] = (BUILDERS[name](app_type), built_on)
+    return entry[0]
+
+
+def clear_documents():
+    """Forget all precomputed documents, e.g. after a settings change."""
+    with _documents_lock:
+        _documents.clear()
+
+
+def document_response(request, name, app_type='customer'):
+    """Serve a precomputed document with ETag / If-None-Match support."""
+    try:
+        document = get_document(name, app_type)
+    except ValidationError as e:
+        # Invalid settings, e.g. a missing VAPID key; not cached so a fix is picked up
+        return JsonResponse(e.detail, status=400)
+
+    response = get_conditional_response(request, etag=document.etag)
+    if response is None:
+        response = HttpResponse(document.body, content_type=document.content_type)
+
+    response['ETag'] = document.etag
+    patch_cache_control(response, public=True, max_age=settings.PWA_CACHE_MAX_AGE)
+    return response
@@ -0,0 +1,177 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+from dodo_backend.local_cache import LocalLRUCache
+from .models import SEOMetadata
+
+
+_local = LocalLRUCache(settings.SEO_LOCAL_CACHE_SIZE, settings.SEO_LOCAL_CACHE_TTL)
+
+
+def get_cache():
+    return caches[settings.SEO_CACHE_ALIAS]
+
+
+def parse_page_key(page_key):
+    """Split `'service:deep-cleaning'` into `('service', 'deep-cleaning')`; `'home'` into `('home', None)`."""
+    page_type, _, page_identifier = page_key.partition(':')
+    return page_type, page_identifier or None
+
+
+def format_page_key(page_type, page_identifier=None):
+    return f'{page_type}:{page_identifier}' if page_identifier else page_type
+
+
+def _version_key(page_type):
+    return f'seo:{page_type}:version'
+
+
+def _shared_key(page_type, page_identifier, version):
+    return f'seo:{page_type}:v{version}:{page_identifier or ""}'
+
+
+def invalidate_seo(page_type):
+    """Drop every cached page of a page type, including pages that fell back to its generic entry."""
+    cache = get_cache()
+    try:
+        cache.incr(_version_key(page_type))
+    except ValueError:
+        cache.set(_version_key(page_type), 2, timeout=None)
+    _local.discard_if(lambda key: key[0] == page_type)
+
+
+def _image_url(image):
+    return image.url if image else None
+
+
+def build_seo(metadata, page_type, page_identifier=None):
+    """
+    Return the resolved metadata for a page: the `SEOMetadata` row's
+    values, with Open Graph / Twitter fields falling back to the page's
+    title and description, and those to the site defaults.
+    """
+    title = metadata.title if metadata else settings.SEO_SITE_NAME
+    description = metadata.description if metadata else settings.SEO_SITE_DESCRIPTION
+    og_image = _image_url(metadata.og_image) if metadata else None
+    twitter_image = _image_url(metadata.twitter_image) if metadata else None
+
+    return {
+        'page_type': page_type,
+        'page_identifier': page_identifier,
+        'is_default': metadata is None,
+        'title': title,
+        'description': description,
+        'keywords': metadata.keywords if metadata else None,
+        'canonical_url': metadata.canonical_url if metadata else None,
+        'og_title': (metadata and metadata.og_title) or title,
+        'og_description': (metadata and metadata.og_description) or description,
+        'og_image': og_image or settings.SEO_DEFAULT_IMAGE,
+        'og_site_name': settings.SEO_SITE_NAME,
+        'twitter_title': (metadata and metadata.twitter_title) or title,
+        'twitter_description': (metadata and metadata.twitter_description) or description,
+        'twitter_image': twitter_image or og_image or settings.SEO_DEFAULT_IMAGE,
+        'twitter_site': settings.SEO_TWITTER_SITE,
+        'twitter_creator': settings.SEO_TWITTER_CREATOR,
+        'structured_data': metadata.structured_data if metadata else None,
+        'updated_at': metadata.updated_at.isoformat() if metadata else None,
+    }
+
+
+def _load(pages):
+    """
+    Resolve pages from the database in one query. A page without its own
+    row uses its page type's generic row (no identifier), then the defaults.
+    """
+    condition = Q()
+    for page_type, page_identifier in pages:
+        condition |= Q(page_type=page_type, page_identifier__isnull=True)
+        if page_identifier:
+            condition |= Q(page_type=page_type, page_identifier=page_identifier)
+
+    rows = {
+        (row.page_type, row.page_identifier): row
+        for row in SEOMetadata.objects.filter(condition)
+    }
+
+    return {
+        (page_type, page_identifier): build_seo(
+            rows.get((page_type, page_identifier)) or rows.get((page_type, None)),
+            page_type,
+            page_identifier,
+        )
+        for page_type, page_identifier in pages
+    }
+
+
+def resolve_seo_many(pages):
+    """
+    Resolve SEO metadata for several pages.
+
+    Lookups go through an in-process LRU, then the shared cache, and only
+    the remaining pages are loaded from the database, in a single query.
+
+    Args:
+        pages: Iterable of `(page_type, page_identifier)` tuples
+
+    Returns:
+        dict: Resolved metadata keyed by `(page_type, page_identifier)`
+    """
+    pages = list(dict.fromkeys((page_type, page_identifier or None) for page_type, page_identifier in pages))
+    results = {}
+
+    missing = []
+    for page in pages:
+        value = _local.get(page)
+        if value is None:
+            missing.append(page)
+        else:
+            results[page] = value
+    if not missing:
+        return results
+
+    cache = get_cache()
+    page_types = {page_type for page_type, _ in missing}
+    version_keys = [_version_key(page_type) for page_type in page_types]
+    versions = cache.get_many(version_keys)
+    shared_keys = {
+        page: _shared_key(page[0], page[1], versions.get(_version_key(page[0]), 1))
+        for page in missing
+    }
+
+    cached = cache.get_many(list(shared_keys.values()))
+    to_load = []
+    for page in missing:
+        value = cached.get(shared_keys[page])
+        if value is None:
+            to_load.append(page)
+        else:
+            results[page] = value
+            _local.set(page, value)
+
+    if to_load:
+        loaded = _load(to_load)
+        cache.set_many(
+            {shared_keys[page]: value for page, value in loaded.items()},
+            timeout=settings.SEO_CACHE_TIMEOUT,
+        )
+        for page, value in loaded.items():
+            results[page] = value
+            _local.set(page, value)
+
+    return results
+
+
+def resolve_seo(page_type, page_identifier=None):
+    """
+    Resolve SEO metadata for one page.
+
+    Args:
+        page_type: One of `SEOMetadata.PAGE_TYPES`
+        page_identifier: Optional identifier of a specific page, e.g. a service slug
+
+    Returns:
+        dict: The resolved metadata, see `build_seo`
+    """
+    page_identifier = page_identifier or None
+    return resolve_seo_many([(page_type, page_identifier)])[(page_type, page_identifier)]
@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
 from .models import PushSubscription, OfflineAction, SEOMetadata, Sitemap
 
@@ -10,22 +12,74 @@ class PushSubscriptionSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         user = self.context['request'].user
-        validated_data['user'] = user
+        validated_data['user_id'] = user.id
         return super().create(validated_data)
 
 
 class OfflineActionSerializer(serializers.ModelSerializer):
     class Meta:
         model = OfflineAction
-        fields = ['id', 'action_type', 'resource_type', 'resource_id', 'data', 'created_at', 'synced', 'synced_at']
+        fields = ['id', 'action_type', 'resource_type', 'resource_id', 'data', 'idempotency_key',
+                  'created_at', 'synced', 'synced_at']
         read_only_fields = ['id', 'created_at', 'synced', 'synced_at']
 
     def create(self, validated_data):
         user = self.context['request'].user
-        validated_data['user'] = user
+        validated_data['user_id'] = user.id
+
+        key = validated_data.get('idempotency_key')
+        if key:
+            existing = OfflineAction.objects.filter(user_id=user.id, idempotency_key=key).first()
+            if existing is not None:
+                return existing
+            try:
+                with transaction.atomic():
+                    return super().create(validated_data)
+            except IntegrityError:
+                # A concurrent retry created it first
+                return OfflineAction.objects.get(user_id=user.id, idempotency_key=key)
+
         return super().create(validated_data)
 
 
+class OfflineActionBatchSerializer(serializers.ListSerializer):
+    """Creates a batch of offline actions with one bulk insert, skipping retried ones."""
+    child = OfflineActionSerializer()
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_length', settings.OFFLINE_BATCH_MAX_ACTIONS)
+        super().__init__(*args, **kwargs)
+
+    def create(self, validated_data):
+        user = self.context['request'].user
+
+        keyed = {}
+        unkeyed = []
+        for item in validated_data:
+            key = item.get('idempotency_key')
+            if not key:
+                unkeyed.append(OfflineAction(user_id=user.id, **item))
+            elif key not in keyed:
+                # The first action with a key wins, later ones in the batch are retries
+                keyed[key] = OfflineAction(user_id=user.id, **item)
+
+        OfflineAction.objects.bulk_create(unkeyed)
+        if keyed:
+            # Actions already received, or created by a concurrent retry of this
+            # batch, conflict on the idempotency key and are read back instead
+            OfflineAction.objects.bulk_create(keyed.values(), ignore_conflicts=True)
+            keyed = {
+                action.idempotency_key: action
+                for action in OfflineAction.objects.filter(user_id=user.id, idempotency_key__in=keyed)
+            }
+
+        unkeyed = iter(unkeyed)
+        return [
+            keyed[item['idempotency_key']] if item.get('idempotency_key') else next(unkeyed)
+            for item in validated_data
+        ]
+
+
 class SEOMetadataSerializer(serializers.ModelSerializer):
     class Meta:
         model = SEOMetadata
@@ -1,13 +1,171 @@
 import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from urllib.parse import urlparse
+
+import requests
 from django.conf import settings
-from pywebpush import webpush, WebPushException
+from django.db import transaction
+from django.utils import timezone
+from pywebpush import Vapid, WebPusher, WebPushException
+from requests.adapters import HTTPAdapter
+
+from dodo_backend.metrics import track_external
+from .models import PushSubscription, OfflineAction
+
+
+class VapidHeaderCache:
+    """
+    Signs VAPID headers once per push service origin (the JWT `aud` claim)
+    and reuses them until shortly before they expire, instead of signing a
+    new JWT for every subscription.
+    """
+    lifetime = 12 * 60 * 60
+    refresh_margin = 5 * 60
+
+    def __init__(self, private_key, admin_email):
+        self.vapid = Vapid.from_string(private_key=private_key)
+        self.sub = f"mailto:{admin_email}"
+        self._headers = {}
+        self._lock = threading.Lock()
+
+    def headers_for(self, endpoint):
+        url = urlparse(endpoint)
+        aud = f"{url.scheme}://{url.netloc}"
+        now = int(time.time())
+
+        with self._lock:
+            cached = self._headers.get(aud)
+            if cached is None or cached[0] - now < self.refresh_margin:
+                exp = now + self.lifetime
+                headers = self.vapid.sign({'sub': self.sub, 'aud': aud, 'exp': exp})
+                cached = (exp, headers)
+                self._headers[aud] = cached
 
-from .models import PushSubscription
+        return dict(cached[1])
+
+
+_vapid_cache = None
+_push_session = None
+_push_lock = threading.Lock()
+
+
+def get_vapid_cache():
+    global _vapid_cache
+    with _push_lock:
+        if _vapid_cache is None:
+            _vapid_cache = VapidHeaderCache(
+                settings.WEBPUSH_SETTINGS.get('VAPID_PRIVATE_KEY'),
+                settings.WEBPUSH_SETTINGS.get('VAPID_ADMIN_EMAIL'),
+            )
+    return _vapid_cache
+
+
+def get_push_session():
+    """Shared HTTP session so connections to each push service are reused."""
+    global _push_session
+    with _push_lock:
+        if _push_session is None:
+            _push_session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=10,
+                pool_maxsize=settings.WEBPUSH_SETTINGS.get('MAX_WORKERS', 16),
+            )
+            _push_session.mount('https://', adapter)
+    return _push_session
+
+
+def build_push_payload(title, message, url=None, icon=None, badge=None, image=None, tag=None, actions=None):
+    payload = {
+        'title': title,
+        'body': message,
+    }
+
+    if url:
+        payload['url'] = url
+    if icon:
+        payload['icon'] = icon
+    if badge:
+        payload['badge'] = badge
+    if image:
+        payload['image'] = image
+    if tag:
+        payload['tag'] = tag
+    if actions:
+        payload['actions'] = actions
+
+    return payload
+
+
+def _push_one(row, data):
+    subscription_id, endpoint, p256dh, auth = row
+    subscription_info = {
+        'endpoint': endpoint,
+        'keys': {
+            'p256dh': p256dh,
+            'auth': auth
+        }
+    }
+
+    try:
+        with track_external('webpush'):
+            response = WebPusher(subscription_info, requests_session=get_push_session()).send(
+                data,
+                get_vapid_cache().headers_for(endpoint),
+                ttl=settings.WEBPUSH_SETTINGS.get('TTL', 0),
+                timeout=settings.WEBPUSH_SETTINGS.get('TIMEOUT', 10),
+            )
+        if response.status_code > 202:
+            raise WebPushException(
+                f"Push failed: {response.status_code} {response.reason}", response=response
+            )
+        return {'subscription_id': subscription_id, 'status': 'success'}
+    except WebPushException as e:
+        # If the subscription is expired or invalid, it should be deleted
+        gone = e.response is not None and e.response.status_code in [404, 410]
+        return {'subscription_id': subscription_id, 'status': 'error', 'message': str(e), 'gone': gone}
+    except Exception as e:
+        return {'subscription_id': subscription_id, 'status': 'error', 'message': str(e), 'gone': False}
+
+
+def fan_out_push(subscriptions, payload, chunk_size=None):
+    """
+    Send `payload` to every subscription in a queryset.
+
+    Subscriptions are streamed from the database in chunks and each chunk is
+    sent concurrently on a bounded thread pool. Yields one result dict per
+    subscription; results for expired subscriptions carry `gone=True`.
+    """
+    chunk_size = chunk_size or settings.WEBPUSH_SETTINGS.get('CHUNK_SIZE', 500)
+    data = json.dumps(payload)
+    rows = subscriptions.order_by().values_list('id', 'endpoint', 'p256dh', 'auth').iterator(
+        chunk_size=chunk_size
+    )
+
+    with ThreadPoolExecutor(
+        max_workers=settings.WEBPUSH_SETTINGS.get('MAX_WORKERS', 16),
+        thread_name_prefix='web-push',
+    ) as pool:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            yield from pool.map(lambda row: _push_one(row, data), chunk)
+
+
+def delete_gone_subscriptions(subscription_ids):
+    """Remove expired subscriptions in a single query."""
+    if subscription_ids:
+        PushSubscription.objects.filter(id__in=subscription_ids).delete()
 
 
 def send_web_push(user, title, message, url=None, icon=None, badge=None, image=None, tag=None, actions=None):
     """
-    Send a web push notification to a user.
+    Send a web push notification to a user. Blocks until every subscription
+    was tried; queue the `pwa_seo.tasks.send_web_push` task to send from a
+    worker instead.
     
     Args:
         user: The user to send the notification to
@@ -30,58 +188,17 @@ def send_web_push(user, title, message, url=None, icon=None, badge=None, image=N
     if not subscriptions.exists():
         return {'status': 'error', 'message': 'No subscriptions found for user'}
     
-    payload = {
-        'title': title,
-        'body': message,
-    }
-    
-    if url:
-        payload['url'] = url
-    if icon:
-        payload['icon'] = icon
-    if badge:
-        payload['badge'] = badge
-    if image:
-        payload['image'] = image
-    if tag:
-        payload['tag'] = tag
-    if actions:
-        payload['actions'] = actions
-    
+    payload = build_push_payload(title, message, url, icon, badge, image, tag, actions)
+
     results = []
-    
-    for subscription in subscriptions:
-        subscription_info = {
-            'endpoint': subscription.endpoint,
-            'keys': {
-                'p256dh': subscription.p256dh,
-                'auth': subscription.auth
-            }
-        }
-        
-        try:
-            webpush(
-                subscription_info=subscription_info,
-                data=json.dumps(payload),
-                vapid_private_key=settings.WEBPUSH_SETTINGS.get('VAPID_PRIVATE_KEY'),
-                vapid_claims={
-                    'sub': f"mailto:{settings.WEBPUSH_SETTINGS.get('VAPID_ADMIN_EMAIL')}"
-                }
-            )
-            results.append({
-                'subscription_id': subscription.id,
-                'status': 'success'
-            })
-        except WebPushException as e:
-            # If the subscription is expired or invalid, delete it
-            if e.response and e.response.status_code in [404, 410]:
-                subscription.delete()
-            
-            results.append({
-                'subscription_id': subscription.id,
-                'status': 'error',
-                'message': str(e)
-            })
+    gone = []
+
+    for result in fan_out_push(subscriptions, payload):
+        if result.pop('gone', False):
+            gone.append(result['subscription_id'])
+        results.append(result)
+
+    delete_gone_subscriptions(gone)
     
     return {
         'status': 'success',
@@ -89,34 +206,92 @@ def send_web_push(user, title, message, url=None, icon=None, badge=None, image=N
     }
 
 
-def process_offline_actions(user):
+def broadcast_web_push(title, message, users=None, user_type=None, chunk_size=None, **options):
     """
-    Process all pending offline actions for a user.
+    Send a web push notification to many users at once. Queue the
+    `pwa_seo.tasks.broadcast_web_push` task to send from a worker instead.
     
     Args:
-        user: The user whose offline actions to process
+        title: The title of the notification
+        message: The message body of the notification
+        users: A User queryset (or list of users/ids) to send to; all users if omitted
+        user_type: Optionally restrict to a segment ('customer', 'vendor', 'admin')
+        chunk_size: Number of subscriptions loaded and sent per batch
+        **options: url, icon, badge, image, tag and actions as for send_web_push
     
     Returns:
-        dict: A dictionary with the status of the processing
+        dict: Counts of sent, failed and removed subscriptions
     """
-    from .models import OfflineAction
-    from django.utils import timezone
-    
-    actions = OfflineAction.objects.filter(user=user, synced=False)
-    
+    if not settings.WEBPUSH_SETTINGS.get('VAPID_PRIVATE_KEY'):
+        return {'status': 'error', 'message': 'VAPID keys not configured'}
+
+    subscriptions = PushSubscription.objects.all()
+    if users is not None:
+        subscriptions = subscriptions.filter(user__in=users)
+    if user_type:
+        subscriptions = subscriptions.filter(user__user_type=user_type)
+
+    payload = build_push_payload(title, message, **options)
+
+    sent = 0
+    failed = 0
+    gone = []
+
+    for result in fan_out_push(subscriptions, payload, chunk_size=chunk_size):
+        if result['status'] == 'success':
+            sent += 1
+        else:
+            failed += 1
+            if result.get('gone'):
+                gone.append(result['subscription_id'])
+
+    delete_gone_subscriptions(gone)
+
+    return {
+        'status': 'success',
+        'sent': sent,
+        'failed': failed,
+        'removed': len(gone)
+    }
+
+
+# resource_type -> handler(action). See register_offline_handler.
+OFFLINE_ACTION_HANDLERS = {}
+
+
+def register_offline_handler(resource_type):
+    """
+    Register the function that applies offline actions for a resource type.
+
+    The handler receives the `OfflineAction` and runs inside a transaction
+    savepoint; raising an exception rolls back its changes and leaves the
+    action unsynced so it is retried on the next sync. Actions whose
+    resource type has no handler are simply marked as synced.
+
+        @register_offline_handler('booking')
+        def apply_booking_action(action):
+            ...
+    """
+    def decorator(handler):
+        OFFLINE_ACTION_HANDLERS[resource_type] = handler
+        return handler
+    return decorator
+
+
+def _process_offline_batch(actions, now):
+    synced = []
     results = []
-    
+
     for action in actions:
+        handler = OFFLINE_ACTION_HANDLERS.get(action.resource_type)
         try:
-            # Here you would implement the logic to process each action type
-            # For example, if action.action_type == 'create' and action.resource_type == 'booking'
-            # you would create a new booking using action.data
-            
-            # For now, we'll just mark them as synced
+            if handler is not None:
+                with transaction.atomic():
+                    handler(action)
+
             action.synced = True
-            action.synced_at = timezone.now()
-            action.save()
-            
+            action.synced_at = now
+            synced.append(action)
             results.append({
                 'action_id': action.id,
                 'status': 'success'
@@ -127,9 +302,47 @@ def process_offline_actions(user):
                 'status': 'error',
                 'message': str(e)
             })
+
+    OfflineAction.objects.bulk_update(synced, ['synced', 'synced_at'])
+    return results
+
+
+def process_offline_actions(user_id, batch_size=None):
+    """
+    Process all pending offline actions for a user.
+
+    Actions are applied in the order they were recorded, in batches that
+    each commit in one transaction with a single bulk update. Queue the
+    `pwa_seo.tasks.process_offline_actions` task to run this in the background.
+    
+    Args:
+        user_id: ID of the user whose offline actions to process
+        batch_size: Number of actions loaded and committed together
     
+    Returns:
+        dict: A dictionary with the status of the processing
+    """
+    batch_size = batch_size or settings.OFFLINE_SYNC_BATCH_SIZE
+    pending = OfflineAction.objects.filter(user_id=user_id, synced=False).order_by('id')
+
+    results = []
+    last_id = 0
+
+    while True:
+        with transaction.atomic():
+            # Lock the batch so a concurrent sync cannot apply the same actions
+            batch = list(pending.filter(id__gt=last_id).select_for_update()[:batch_size])
+            if not batch:
+                break
+            results.extend(_process_offline_batch(batch, timezone.now()))
+        last_id = batch[-1].id
+
+    synced_count = sum(1 for result in results if result['status'] == 'success')
+
     return {
         'status': 'success',
         'processed_count': len(results),
+        'synced_count': synced_count,
+        'failed_count': len(results) - synced_count,
         'results': results
     }
@@ -0,0 +1,39 @@
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.core_app.models import ServiceCategory, Service
+from core.core_app.signals import catalog_changed
+from . import tasks
+from .models import SEOMetadata, Sitemap
+from .precomputed import clear_documents
+from .seo import invalidate_seo
+from .sitemaps import invalidate_sitemap
+
+
+@receiver([post_save, post_delete], sender=Sitemap)
+def invalidate_sitemap_section(sender, instance, **kwargs):
+    """Drop the cached sitemap section containing the changed entry."""
+    invalidate_sitemap([instance.pk])
+
+
+@receiver(catalog_changed)
+def update_sitemap_for_catalog(sender, **kwargs):
+    """Categories and services have sitemap pages; update it soon rather than at the hourly rebuild."""
+    if sender in (ServiceCategory, Service):
+        transaction.on_commit(tasks.schedule_sitemap_update)
+
+
+@receiver([post_save, post_delete], sender=SEOMetadata)
+def invalidate_seo_metadata(sender, instance, **kwargs):
+    """Drop resolved metadata of the changed page's type; canonical URLs are sitemap pages."""
+    invalidate_seo(instance.page_type)
+    transaction.on_commit(tasks.schedule_sitemap_update)
+
+
+@receiver(setting_changed)
+def clear_precomputed_documents(sender, setting, **kwargs):
+    """Rebuild manifest, service worker and robots documents from the new settings."""
+    if setting.startswith(('PWA_', 'WEBPUSH_', 'STATIC')):
+        clear_documents()
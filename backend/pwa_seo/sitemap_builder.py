@@ -0,0 +1,192 @@
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from django.utils.text import slugify
+
+from core.core_app.models import ServiceCategory, Service
+from dodo_backend.db_routers import pin_to_primary
+from .models import SEOMetadata, Sitemap
+from .sitemaps import invalidate_sitemap
+
+
+class SitemapEntry(NamedTuple):
+    url: str
+    priority: float = 0.5
+    changefreq: str = 'monthly'
+    # None keeps the stored value (or uses the current time for new entries)
+    last_modified: Optional[object] = None
+
+
+class BaseURLProvider:
+    """
+    Source of sitemap entries. Providers are listed in SITEMAP_URL_PROVIDERS
+    and each yields `SitemapEntry` objects; when two providers yield the
+    same URL the first one wins.
+    """
+
+    def entries(self):
+        raise NotImplementedError
+
+    def absolute(self, path):
+        return settings.SITE_URL.rstrip('/') + path
+
+
+class StaticPagesProvider(BaseURLProvider):
+    """Fixed pages of the customer site."""
+    pages = [
+        # Home page
+        ('/', 1.0, 'daily'),
+
+        # Authentication pages
+        ('/login', 0.8, 'monthly'),
+        ('/register', 0.8, 'monthly'),
+
+        # Information pages
+        ('/about', 0.6, 'monthly'),
+        ('/contact', 0.6, 'monthly'),
+        ('/faq', 0.6, 'monthly'),
+        ('/terms', 0.5, 'monthly'),
+        ('/privacy', 0.5, 'monthly'),
+
+        # Blog pages
+        ('/blog', 0.8, 'weekly'),
+        ('/blog/home-cleaning-tips', 0.7, 'monthly'),
+        ('/blog/plumbing-maintenance', 0.7, 'monthly'),
+    ]
+
+    def entries(self):
+        for path, priority, changefreq in self.pages:
+            yield SitemapEntry(self.absolute(path), priority, changefreq)
+
+
+def category_path(category_name):
+    return f'/services/{slugify(category_name)}'
+
+
+class CategoryURLProvider(BaseURLProvider):
+    """One page per active service category."""
+
+    def entries(self):
+        categories = ServiceCategory.objects.filter(is_active=True).values_list('name', 'updated_at')
+        for name, updated_at in categories.iterator():
+            yield SitemapEntry(self.absolute(category_path(name)), 0.9, 'weekly', updated_at)
+
+
+class ServiceURLProvider(BaseURLProvider):
+    """One page per active service in an active category."""
+
+    def entries(self):
+        services = (
+            Service.objects.filter(is_active=True, category__is_active=True)
+            .values_list('name', 'category__name', 'updated_at')
+        )
+        for name, category_name, updated_at in services.iterator():
+            path = f'{category_path(category_name)}/{slugify(name)}'
+            yield SitemapEntry(self.absolute(path), 0.8, 'weekly', updated_at)
+
+
+class SEOMetadataURLProvider(BaseURLProvider):
+    """Pages with SEO metadata that declare a canonical URL."""
+
+    def entries(self):
+        pages = (
+            SEOMetadata.objects.exclude(canonical_url__isnull=True).exclude(canonical_url='')
+            .values_list('canonical_url', 'updated_at')
+        )
+        for url, updated_at in pages.iterator():
+            yield SitemapEntry(url, 0.7, 'monthly', updated_at)
+
+
+def get_url_providers():
+    return [import_string(path)() for path in settings.SITEMAP_URL_PROVIDERS]
+
+
+def collect_entries(providers):
+    """Return `{url: SitemapEntry}` for all providers, keeping the first entry per URL."""
+    entries = {}
+    for provider in providers:
+        for entry in provider.entries():
+            entries.setdefault(entry.url, entry)
+    return entries
+
+
+def _priority(value):
+    return Decimal(str(value)).quantize(Decimal('0.1'))
+
+
+def sync_sitemap(providers=None, batch_size=1000):
+    """
+    Bring the `Sitemap` table in line with the URL providers.
+
+    Only rows that changed are written: new URLs are bulk created, rows
+    whose priority, change frequency or source timestamp differ are bulk
+    updated and URLs no provider yields any more are deleted, all in one
+    transaction so readers never see a partially built sitemap.
+
+    Args:
+        providers: URL providers to use, defaults to SITEMAP_URL_PROVIDERS
+        batch_size: Number of rows per bulk query
+
+    Returns:
+        dict: Counts of created, updated, deleted and unchanged entries
+    """
+    if providers is None:
+        providers = get_url_providers()
+    wanted = collect_entries(providers)
+    now = timezone.now()
+
+    to_create = []
+    to_update = []
+    to_delete = []
+    unchanged = 0
+
+    existing = Sitemap.objects.values_list('id', 'url', 'priority', 'changefreq', 'last_modified')
+    for pk, url, priority, changefreq, last_modified in existing.iterator():
+        entry = wanted.pop(url, None)
+        if entry is None:
+            to_delete.append(pk)
+            continue
+
+        new_last_modified = entry.last_modified or last_modified
+        if (_priority(entry.priority), entry.changefreq, new_last_modified) == (priority, changefreq, last_modified):
+            unchanged += 1
+            continue
+
+        to_update.append(Sitemap(
+            id=pk,
+            url=url,
+            priority=_priority(entry.priority),
+            changefreq=entry.changefreq,
+            last_modified=new_last_modified,
+        ))
+
+    for entry in wanted.values():
+        to_create.append(Sitemap(
+            url=entry.url,
+            priority=_priority(entry.priority),
+            changefreq=entry.changefreq,
+            last_modified=entry.last_modified or now,
+        ))
+
+    with transaction.atomic():
+        Sitemap.objects.bulk_create(to_create, batch_size=batch_size)
+        Sitemap.objects.bulk_update(to_update, ['priority', 'changefreq', 'last_modified'], batch_size=batch_size)
+        for start in range(0, len(to_delete), batch_size):
+            Sitemap.objects.filter(id__in=to_delete[start:start + batch_size]).delete()
+
+        # Bulk writes send no signals, so invalidate the touched sections here
+        changed = [entry.pk for entry in to_create + to_update if entry.pk] + to_delete
+        if changed:
+            transaction.on_commit(lambda: pin_to_primary(Sitemap))
+            transaction.on_commit(lambda: invalidate_sitemap(changed))
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(to_delete),
+        'unchanged': unchanged,
+    }
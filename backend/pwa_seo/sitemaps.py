@@ -0,0 +1,243 @@
+import gzip
+import hashlib
+import io
+import re
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import ExpressionWrapper, F, IntegerField, Max
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import Sitemap
+
+XML_CONTENT_TYPE = 'application/xml'
+
+URLSET_OPEN = '\n'.join([
+    '<?xml version="1.0" encoding="UTF-8"?>',
+    '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"',
+    '        xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"',
+    '        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1"',
+    '        xmlns:video="http://www.google.com/schemas/sitemap-video/1.1"',
+    '        xmlns:news="http://www.google.com/schemas/sitemap-news/0.9"',
+    '        xmlns:mobile="http://www.google.com/schemas/sitemap-mobile/1.0"',
+    '        xsi:schemaLocation="http://www.sitemaps.org/schemas/sitemap/0.9 http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd">',
+    '',
+])
+URLSET_CLOSE = '</urlset>\n'
+
+SITEMAPINDEX_OPEN = '\n'.join([
+    '<?xml version="1.0" encoding="UTF-8"?>',
+    '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    '',
+])
+SITEMAPINDEX_CLOSE = '</sitemapindex>\n'
+
+# Number of <url> elements joined into one streamed chunk
+CHUNK_ENTRIES = 500
+
+_gzip_re = re.compile(r'\bgzip\b')
+
+
+def get_cache():
+    return caches[settings.SITEMAP_CACHE_ALIAS]
+
+
+def format_lastmod(value):
+    return value.strftime('%Y-%m-%dT%H:%M:%S+00:00')
+
+
+# Sections --------------------------------------------------------------------
+#
+# Entries are split into sections by primary key: section N holds the rows
+# with ids ((N - 1) * SITEMAP_MAX_URLS, N * SITEMAP_MAX_URLS]. A section never
+# exceeds the sitemap protocol limit, and a changed row only invalidates the
+# one section it belongs to.
+
+def section_for(pk):
+    return (pk - 1) // settings.SITEMAP_MAX_URLS + 1
+
+
+def section_bounds(section):
+    size = settings.SITEMAP_MAX_URLS
+    return (section - 1) * size + 1, section * size
+
+
+def _version_key(name):
+    return f'sitemap:{name}:version'
+
+
+def _get_version(name):
+    cache = get_cache()
+    key = _version_key(name)
+    cache.add(key, 1, timeout=None)
+    return cache.get(key, 1)
+
+
+def _bump_version(name):
+    cache = get_cache()
+    key = _version_key(name)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def invalidate_sitemap(pks):
+    """
+    Drop cached output for the sections containing the given Sitemap ids.
+    Call this after bulk writes, which do not send model signals.
+    """
+    for section in {section_for(pk) for pk in pks}:
+        _bump_version(f'section:{section}')
+    _bump_version('index')
+
+
+def get_sections():
+    """
+    Return `[(section, last_modified), ...]` for every non-empty section,
+    cached until a sitemap entry changes.
+    """
+    cache = get_cache()
+    key = f'sitemap:sections:v{_get_version("index")}:{settings.SITEMAP_MAX_URLS}'
+    sections = cache.get(key)
+    if sections is None:
+        section = ExpressionWrapper(
+            (F('id') - 1) / settings.SITEMAP_MAX_URLS + 1,
+            output_field=IntegerField(),
+        )
+        rows = (
+            Sitemap.objects.annotate(section=section)
+            .values('section')
+            .annotate(last_modified=Max('last_modified'))
+            .order_by('section')
+        )
+        sections = [(row['section'], row['last_modified']) for row in rows]
+        cache.set(key, sections, timeout=settings.SITEMAP_CACHE_TIMEOUT)
+    return sections
+
+
+# Rendering -------------------------------------------------------------------
+
+def iter_section_xml(section):
+    """Yield the `<urlset>` document for one section in chunks, reading rows with an iterator."""
+    low, high = section_bounds(section)
+    entries = (
+        Sitemap.objects.filter(id__gte=low, id__lte=high)
+        .order_by('id')
+        .values_list('url', 'last_modified', 'changefreq', 'priority')
+        .iterator(chunk_size=2000)
+    )
+
+    yield URLSET_OPEN
+    chunk = []
+    for url, last_modified, changefreq, priority in entries:
+        chunk.append(
+            '  <url>\n'
+            f'    <loc>{escape(url)}</loc>\n'
+            f'    <lastmod>{format_lastmod(last_modified)}</lastmod>\n'
+            f'    <changefreq>{changefreq}</changefreq>\n'
+            f'    <priority>{priority}</priority>\n'
+            '    <mobile:mobile/>\n'
+            '  </url>\n'
+        )
+        if len(chunk) >= CHUNK_ENTRIES:
+            yield ''.join(chunk)
+            chunk = []
+    if chunk:
+        yield ''.join(chunk)
+    yield URLSET_CLOSE
+
+
+def iter_index_xml(sections, location):
+    """Yield a `<sitemapindex>` document. `location(section)` returns a section's absolute URL."""
+    yield SITEMAPINDEX_OPEN
+    for section, last_modified in sections:
+        yield (
+            '  <sitemap>\n'
+            f'    <loc>{escape(location(section))}</loc>\n'
+            f'    <lastmod>{format_lastmod(last_modified)}</lastmod>\n'
+            '  </sitemap>\n'
+        )
+    yield SITEMAPINDEX_CLOSE
+
+
+def _cache_while_streaming(cache_key, chunks, last_modified):
+    """
+    Pass chunks through to the client while compressing them, and store the
+    gzipped document once the last chunk has been sent.
+    """
+    buffer = io.BytesIO()
+    digest = hashlib.md5()
+    with gzip.GzipFile(fileobj=buffer, mode='wb', mtime=0) as compressed:
+        for chunk in chunks:
+            data = chunk.encode('utf-8')
+            digest.update(data)
+            compressed.write(data)
+            yield data
+
+    get_cache().set(cache_key, {
+        'body': buffer.getvalue(),
+        'etag': f'"{digest.hexdigest()}"',
+        'last_modified': last_modified,
+    }, timeout=settings.SITEMAP_CACHE_TIMEOUT)
+
+
+def render_cached(cache_key, chunks, last_modified=None):
+    """Render a document into the cache without a request, e.g. to warm it up."""
+    for _ in _cache_while_streaming(cache_key, chunks, last_modified):
+        pass
+    return get_cache().get(cache_key)
+
+
+def sitemap_response(request, cache_key, chunks, last_modified=None):
+    """
+    Serve a sitemap document from the gzipped copy in the cache, with
+    ETag/Last-Modified validation. On a miss the document is streamed
+    straight from the database and cached for the next request.
+    """
+    entry = get_cache().get(cache_key)
+    if entry is None:
+        response = StreamingHttpResponse(
+            _cache_while_streaming(cache_key, chunks, last_modified),
+            content_type=XML_CONTENT_TYPE,
+        )
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    last_modified_ts = entry['last_modified'].timestamp() if entry['last_modified'] else None
+    response = get_conditional_response(request, etag=entry['etag'], last_modified=last_modified_ts)
+    if response is None:
+        if _gzip_re.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            response = HttpResponse(entry['body'], content_type=XML_CONTENT_TYPE)
+            response['Content-Encoding'] = 'gzip'
+        else:
+            response = HttpResponse(gzip.decompress(entry['body']), content_type=XML_CONTENT_TYPE)
+
+    response['ETag'] = entry['etag']
+    if last_modified_ts:
+        response['Last-Modified'] = http_date(last_modified_ts)
+    patch_vary_headers(response, ('Accept-Encoding',))
+    patch_cache_control(response, public=True, max_age=settings.SITEMAP_MAX_AGE)
+    return response
+
+
+def section_cache_key(section):
+    version = _get_version(f'section:{section}')
+    return f'sitemap:section:{section}:v{version}:{settings.SITEMAP_MAX_URLS}'
+
+
+def index_cache_key(origin):
+    digest = hashlib.md5(origin.encode('utf-8')).hexdigest()
+    return f'sitemap:index:v{_get_version("index")}:{settings.SITEMAP_MAX_URLS}:{digest}'
+
+
+def warm_sitemaps():
+    """Render every section into the cache. Returns the number of sections rendered."""
+    sections = get_sections()
+    for section, last_modified in sections:
+        render_cached(section_cache_key(section), iter_section_xml(section), last_modified)
+    return len(sections)
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.conf import settings
+
+from task_queue.registry import periodic_task, task
+from . import services
+from .sitemap_builder import sync_sitemap
+from .sitemaps import get_cache, warm_sitemaps
+
+SITEMAP_UPDATE_QUEUED_KEY = 'sitemap:update-queued'
+
+
+@task
+def send_web_push(user_id, title, message, **options):
+    """Send a web push notification to one user, see `services.send_web_push`."""
+    return services.broadcast_web_push(title, message, users=[user_id], **options)
+
+
+@task
+def broadcast_web_push(title, message, user_ids=None, user_type=None, **options):
+    """Send a web push notification to many users, see `services.broadcast_web_push`."""
+    return services.broadcast_web_push(title, message, users=user_ids, user_type=user_type, **options)
+
+
+@task
+def process_offline_actions(user_id):
+    """Apply a user's pending offline actions, see `services.process_offline_actions`."""
+    return services.process_offline_actions(user_id)
+
+
+@periodic_task(every=timedelta(hours=1))
+def rebuild_sitemap():
+    """Update the sitemap from its URL providers and render the changed sections."""
+    sync_sitemap()
+    warm_sitemaps()
+
+
+@task
+def update_sitemap():
+    """Rebuild the sitemap after catalog changes, see `schedule_sitemap_update`."""
+    # Changes from now on queue another update
+    get_cache().delete(SITEMAP_UPDATE_QUEUED_KEY)
+    rebuild_sitemap()
+
+
+def schedule_sitemap_update():
+    """
+    Queue `update_sitemap` to run SITEMAP_UPDATE_DELAY seconds from now,
+    unless it is already queued, so a burst of catalog edits costs one
+    rebuild. The hourly `rebuild_sitemap` catches anything missed.
+    """
+    delay = settings.SITEMAP_UPDATE_DELAY
+    # The flag expires in case the queued update is lost
+    if get_cache().add(SITEMAP_UPDATE_QUEUED_KEY, True, timeout=delay * 10):
+        update_sitemap.apply_async(countdown=delay)
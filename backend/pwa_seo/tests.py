@@ -1,3 +1,434 @@
-from django.test import TestCase
+import csv
+import datetime
+import json
+from io import StringIO
 
-# Create your tests here.
+from unittest import mock
+from urllib.parse import urlparse
+
+from django.core.cache import cache
+from django.core.management import call_command
+import requests
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from pywebpush import WebPushException
+from rest_framework.test import APIClient
+
+from core.core_app.catalog_io import import_catalog
+from core.core_app.models import ServiceCategory, Service, Tax
+from dodo_backend.testing import QueryPlanAssertions
+from user_service.user_app.models import User
+from .models import PushSubscription, OfflineAction, SEOMetadata
+from .precomputed import clear_documents
+from . import seo
+from .services import OFFLINE_ACTION_HANDLERS, broadcast_web_push, send_web_push
+from . import tasks
+
+
+class HotQueryPlanTests(QueryPlanAssertions, TestCase):
+    """Per-user and per-page lookups must not scan their tables."""
+
+    def test_pending_offline_actions_use_index(self):
+        self.assertUsesIndex(
+            OfflineAction.objects.filter(user_id=1, synced=False, id__gt=0).order_by('id')
+        )
+
+    def test_offline_action_list_uses_index(self):
+        self.assertUsesIndex(OfflineAction.objects.filter(user_id=1))
+
+    def test_push_subscriptions_by_user_use_index(self):
+        self.assertUsesIndex(PushSubscription.objects.filter(user_id=1))
+
+    def test_seo_page_lookup_uses_index(self):
+        self.assertUsesIndex(SEOMetadata.objects.filter(page_type='service', page_identifier='deep-cleaning'))
+        self.assertUsesIndex(SEOMetadata.objects.filter(page_type='service', page_identifier__isnull=True))
+
+
+class OfflineActionExportTests(TestCase):
+    """Users export their own offline actions; the command exports everyone's."""
+
+    def setUp(self):
+        self.user = User.objects.create(mobile='9000000001')
+        other = User.objects.create(mobile='9000000002')
+        for user in (self.user, other):
+            for i in range(3):
+                OfflineAction.objects.create(
+                    user=user, action_type='create', resource_type='booking',
+                    data={'note': f'"{i}", quoted'}, synced=i == 0,
+                )
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def test_export_matches_list(self):
+        response = self.client.get('/api/offline-actions/export/', {'synced': 'false'})
+
+        rows = list(csv.DictReader(StringIO(b''.join(response.streaming_content).decode())))
+        self.assertEqual(
+            [int(row['id']) for row in rows],
+            [action['id'] for action in self.client.get('/api/offline-actions/', {'synced': 'false'}).json()['results']],
+        )
+        self.assertEqual({json.loads(row['data'])['note'] for row in rows}, {'"1", quoted', '"2", quoted'})
+
+    def test_command_exports_all_users(self):
+        out = StringIO()
+        call_command('export_offline_actions', '--format', 'ndjson', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 6)
+
+        out = StringIO()
+        call_command('export_offline_actions', '--filter', f'user={self.user.id}', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 1 + 3)
+
+
+class OfflineActionBatchTests(TestCase):
+    """Batches are inserted once per idempotency key, however often the client retries."""
+
+    def setUp(self):
+        self.user = User.objects.create(mobile='9000000001')
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.user)
+
+    def action(self, key=None, **data):
+        return {'action_type': 'create', 'resource_type': 'note', 'data': data, 'idempotency_key': key}
+
+    def post_batch(self, actions, sync=False):
+        url = '/api/offline-actions/batch/' + ('?sync=true' if sync else '')
+        return self.client.post(url, actions, format='json')
+
+    def test_retried_keys_are_not_duplicated(self):
+        first = self.post_batch([self.action('a', n=1), self.action(n=2)])
+        self.assertEqual(first.status_code, 201)
+
+        retry = self.post_batch([self.action('a', n=1), self.action('b', n=3)])
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.json()['actions'][0]['id'], first.json()['actions'][0]['id'])
+        self.assertEqual(OfflineAction.objects.filter(user=self.user).count(), 3)
+
+    def test_duplicate_keys_in_one_batch(self):
+        response = self.post_batch([self.action('a', n=1), self.action('a', n=2), self.action(n=3)])
+
+        ids = [action['id'] for action in response.json()['actions']]
+        self.assertEqual(ids[0], ids[1])
+        self.assertNotEqual(ids[0], ids[2])
+        self.assertEqual(OfflineAction.objects.get(idempotency_key='a').data, {'n': 1})
+
+    def test_concurrent_retry(self):
+        # The same key is inserted by another request between the lookup and the insert
+        bulk_create = OfflineAction.objects.bulk_create
+
+        def racing_bulk_create(objs, **kwargs):
+            objs = list(objs)
+            if any(obj.idempotency_key == 'a' for obj in objs):
+                OfflineAction.objects.create(user=self.user, action_type='create', resource_type='note',
+                                             data={'n': 0}, idempotency_key='a')
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(OfflineAction.objects, 'bulk_create', side_effect=racing_bulk_create):
+            response = self.post_batch([self.action('a', n=1), self.action('b', n=2)])
+
+        self.assertEqual(response.status_code, 201)
+        actions = response.json()['actions']
+        self.assertEqual(actions[0]['data'], {'n': 0})
+        self.assertEqual(OfflineAction.objects.filter(user=self.user).count(), 2)
+
+    def test_keys_are_per_user(self):
+        other = User.objects.create(mobile='9000000002')
+        OfflineAction.objects.create(user=other, action_type='create', resource_type='note', data={},
+                                     idempotency_key='a')
+
+        response = self.post_batch([self.action('a', n=1)])
+        self.assertEqual(response.json()['actions'][0]['data'], {'n': 1})
+        self.assertEqual(OfflineAction.objects.filter(idempotency_key='a').count(), 2)
+
+    @override_settings(OFFLINE_BATCH_MAX_ACTIONS=2)
+    def test_batch_size_is_limited(self):
+        response = self.post_batch([self.action(n=i) for i in range(3)])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(OfflineAction.objects.exists())
+
+    def test_sync_applies_pending_actions(self):
+        def apply(action):
+            if action.data.get('fail'):
+                raise ValueError('Rejected')
+
+        with mock.patch.dict(OFFLINE_ACTION_HANDLERS, {'note': apply}):
+            response = self.post_batch([self.action('a'), self.action('b', fail=True)], sync=True)
+            self.assertEqual(response.json()['synced_count'], 1)
+            self.assertEqual(response.json()['failed_count'], 1)
+
+            # The failed action stays pending and is retried
+            response = self.client.post('/api/offline-actions/sync/')
+            self.assertEqual(response.json()['synced_count'], 0)
+            self.assertEqual(response.json()['failed'][0]['message'], 'Rejected')
+
+        self.assertEqual(
+            set(OfflineAction.objects.values_list('idempotency_key', 'synced')), {('a', True), ('b', False)}
+        )
+
+
+class SitemapUpdateTests(TestCase):
+    """Catalog changes reach the sitemap shortly after they commit."""
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(tasks.update_sitemap, 'apply_async')
+        self.queued = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_catalog_changes_queue_one_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            category = ServiceCategory.objects.create(name='Cleaning')
+            service = Service.objects.create(category=category, name='Deep cleaning', description='', price='100.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            service.delete()
+
+        self.queued.assert_called_once_with(countdown=60)
+
+    def test_unrelated_models_and_rollbacks_queue_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Tax.objects.create(name='GST', rate='18.00')
+        with self.captureOnCommitCallbacks(execute=False):
+            ServiceCategory.objects.create(name='Cleaning')
+
+        self.queued.assert_not_called()
+
+    def test_catalog_import_queues_an_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            import_catalog('categories', [(2, {'name': 'Cleaning'})])
+
+        self.queued.assert_called_once()
+
+    def test_update_publishes_new_pages(self):
+        category = ServiceCategory.objects.create(name='Cleaning')
+        Service.objects.create(category=category, name='Deep cleaning', description='', price='100.00')
+        self.assertNotIn(b'/services/cleaning/deep-cleaning', self.client.get('/sitemap.xml').getvalue())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.update_sitemap()
+
+        response = self.client.get('/sitemap.xml')
+        self.assertIn(b'/services/cleaning/deep-cleaning', response.getvalue())
+        # Crawlers check for changes with HEAD
+        self.assertEqual(self.client.head('/sitemap.xml').status_code, 200)
+        self.assertEqual(self.client.head('/robots.txt').status_code, 200)
+
+
+def push_response(status_code):
+    response = requests.Response()
+    response.status_code = status_code
+    return response
+
+
+@override_settings(WEBPUSH_SETTINGS={'VAPID_PRIVATE_KEY': 'key', 'CHUNK_SIZE': 2, 'MAX_WORKERS': 4})
+class WebPushFanOutTests(TestCase):
+    """Pushes go to every subscription; the ones the push service forgot are removed."""
+
+    # Push service answer per endpoint path, the rest accept the push
+    outcomes = {
+        '/not-found': push_response(404),
+        '/expired': push_response(410),
+        '/unavailable': push_response(503),
+        '/raises-gone': WebPushException('Push failed', response=push_response(410)),
+        '/offline': requests.ConnectionError('Connection refused'),
+    }
+
+    def setUp(self):
+        self.sent = []
+        pusher = mock.patch('pwa_seo.services.WebPusher', side_effect=self.web_pusher)
+        vapid = mock.patch('pwa_seo.services.get_vapid_cache')
+        pusher.start()
+        vapid.start().return_value.headers_for.return_value = {'Authorization': 'vapid t=token'}
+        self.addCleanup(pusher.stop)
+        self.addCleanup(vapid.stop)
+
+        self.customer = User.objects.create(mobile='9000000001')
+        self.vendor = User.objects.create(mobile='9000000002', user_type='vendor')
+        for user, paths in [
+            (self.customer, ['/ok-1', '/not-found', '/unavailable', '/offline']),
+            (self.vendor, ['/ok-2', '/expired', '/raises-gone']),
+        ]:
+            for path in paths:
+                PushSubscription.objects.create(
+                    user=user, endpoint=f'https://push.example.com{path}', p256dh='key', auth='secret'
+                )
+
+    def web_pusher(self, subscription_info, **kwargs):
+        path = urlparse(subscription_info['endpoint']).path
+
+        def send(data, headers, **kwargs):
+            self.sent.append((path, json.loads(data)))
+            outcome = self.outcomes.get(path, push_response(201))
+            if isinstance(outcome, Exception):
+                raise outcome
+            return outcome
+
+        return mock.Mock(send=send)
+
+    def remaining(self):
+        return set(PushSubscription.objects.values_list('endpoint', flat=True))
+
+    def test_broadcast_reaches_every_subscription(self):
+        result = broadcast_web_push('Sale', 'Half price cleaning', url='/offers')
+
+        self.assertEqual(result, {'status': 'success', 'sent': 2, 'failed': 5, 'removed': 3})
+        self.assertEqual(len(self.sent), 7)
+        self.assertEqual(self.sent[0][1], {'title': 'Sale', 'body': 'Half price cleaning', 'url': '/offers'})
+        self.assertEqual(self.remaining(), {
+            'https://push.example.com/ok-1', 'https://push.example.com/unavailable',
+            'https://push.example.com/offline', 'https://push.example.com/ok-2',
+        })
+
+    def test_broadcast_to_a_segment(self):
+        result = broadcast_web_push('Payouts', 'Sent today', user_type='vendor')
+
+        self.assertEqual(result, {'status': 'success', 'sent': 1, 'failed': 2, 'removed': 2})
+        self.assertEqual(sorted(path for path, _ in self.sent), ['/expired', '/ok-2', '/raises-gone'])
+        self.assertEqual(PushSubscription.objects.filter(user=self.customer).count(), 4)
+
+    def test_send_to_one_user(self):
+        result = send_web_push(self.customer, 'Booked', 'See you at 10')
+
+        statuses = {r['subscription_id']: r['status'] for r in result['results']}
+        self.assertEqual(sorted(statuses.values()), ['error', 'error', 'error', 'success'])
+        self.assertTrue(all('gone' not in r for r in result['results']))
+        self.assertNotIn('https://push.example.com/not-found', self.remaining())
+        self.assertEqual(len(self.remaining()), 6)
+
+    def test_requires_vapid_keys(self):
+        with override_settings(WEBPUSH_SETTINGS={}):
+            result = broadcast_web_push('Sale', 'Half price cleaning')
+
+        self.assertEqual(result['status'], 'error')
+        self.assertEqual(self.sent, [])
+
+
+class PrecomputedDocumentTests(TestCase):
+    """Manifest, service worker, web push and robots documents are served with a strong ETag."""
+
+    urls = ['/manifest.json', '/vendor/manifest.json', '/sw-config.json', '/webpush-config.json', '/robots.txt']
+
+    def setUp(self):
+        clear_documents()
+        self.addCleanup(clear_documents)
+
+    @override_settings(WEBPUSH_SETTINGS={'VAPID_PUBLIC_KEY': 'public-key'})
+    def test_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                etag = response['ETag']
+                self.assertRegex(etag, r'^"[0-9a-f]{32}"$')
+                self.assertIn('public', response['Cache-Control'])
+
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response['ETag'], etag)
+                self.assertEqual(response.content, b'')
+
+                response = self.client.get(url, HTTP_IF_NONE_MATCH='W/' + etag)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"stale"').status_code, 200)
+
+    def test_documents_differ_per_app(self):
+        customer = self.client.get('/robots.txt')
+        vendor = self.client.get('/vendor/robots.txt')
+
+        self.assertNotEqual(customer['ETag'], vendor['ETag'])
+        self.assertTrue(vendor.content.endswith(b'Disallow: /'))
+        self.assertEqual(self.client.get('/vendor/robots.txt', HTTP_IF_NONE_MATCH=customer['ETag']).status_code, 200)
+
+    def test_settings_changes_rebuild(self):
+        etag = self.client.get('/manifest.json')['ETag']
+
+        with override_settings(PWA_APP_NAME='Dodo Home Services'):
+            response = self.client.get('/manifest.json', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.json()['name'], 'Dodo Home Services')
+
+    def test_robots_date_follows_the_day(self):
+        today = timezone.localdate()
+        response = self.client.get('/robots.txt')
+        self.assertIn(f'# Last updated: {today:%Y-%m-%d}', response.content.decode())
+
+        tomorrow = timezone.now() + datetime.timedelta(days=1)
+        with mock.patch.object(timezone, 'now', return_value=tomorrow):
+            next_day = self.client.get('/robots.txt', HTTP_IF_NONE_MATCH=response['ETag'])
+
+        self.assertEqual(next_day.status_code, 200)
+        self.assertIn(f'# Last updated: {timezone.localtime(tomorrow):%Y-%m-%d}', next_day.content.decode())
+
+
+class SEOResolutionTests(TestCase):
+    """Resolved metadata comes from the process LRU, then the shared cache, then one query."""
+
+    def setUp(self):
+        seo.get_cache().clear()
+        seo._local.clear()
+        self.home = SEOMetadata.objects.create(page_type='home', title='Dodo', description='Home services')
+        self.service = SEOMetadata.objects.create(page_type='service', title='Services', description='All services')
+        SEOMetadata.objects.create(
+            page_type='service', page_identifier='deep-cleaning', title='Deep cleaning', description='Every room'
+        )
+
+    def test_lookup_order(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(seo.resolve_seo('home')['title'], 'Dodo')
+
+        # Process LRU: the shared cache is not read either
+        with self.assertNumQueries(0), mock.patch.object(seo, 'get_cache', side_effect=AssertionError):
+            self.assertEqual(seo.resolve_seo('home')['title'], 'Dodo')
+
+        # Another process: the shared cache answers
+        seo._local.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(seo.resolve_seo('home')['title'], 'Dodo')
+
+        seo._local.clear()
+        seo.get_cache().clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(seo.resolve_seo('home')['title'], 'Dodo')
+
+    def test_batch_loads_only_missing_pages(self):
+        seo.resolve_seo('home')
+        # Changes without signals stay unseen until invalidated
+        SEOMetadata.objects.filter(pk=self.home.pk).update(title='Changed')
+
+        with self.assertNumQueries(1):
+            resolved = seo.resolve_seo_many([('home', None), ('service', 'deep-cleaning'), ('service', 'tap-repair')])
+
+        self.assertEqual(resolved[('home', None)]['title'], 'Dodo')
+        self.assertEqual(resolved[('service', 'deep-cleaning')]['title'], 'Deep cleaning')
+        # Pages without their own row use their page type's row, then the site defaults
+        self.assertEqual(resolved[('service', 'tap-repair')]['title'], 'Services')
+        self.assertEqual(seo.resolve_seo('faq')['title'], 'Dodo Services')
+        self.assertTrue(seo.resolve_seo('faq')['is_default'])
+
+    def test_changes_invalidate_their_page_type(self):
+        seo.resolve_seo_many([('home', None), ('service', 'deep-cleaning'), ('service', 'tap-repair')])
+
+        self.service.title = 'Home services'
+        self.service.save()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(seo.resolve_seo('home')['title'], 'Dodo')
+        with self.assertNumQueries(1):
+            self.assertEqual(seo.resolve_seo('service', 'tap-repair')['title'], 'Home services')
+        with self.assertNumQueries(1):
+            self.assertEqual(seo.resolve_seo('service', 'deep-cleaning')['title'], 'Deep cleaning')
+
+        # Other processes' LRU entries expire; the shared cache already moved on
+        seo._local.clear()
+        self.home.delete()
+        with self.assertNumQueries(1):
+            self.assertTrue(seo.resolve_seo('home')['is_default'])
+        with self.assertNumQueries(0):
+            self.assertEqual(seo.resolve_seo('service', 'tap-repair')['title'], 'Home services')
+
+    def test_resolve_endpoint(self):
+        response = self.client.get('/api/seo-metadata/resolve/', {'pages': 'home,service:deep-cleaning,faq'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            {key: page['title'] for key, page in response.json().items()},
+            {'home': 'Dodo', 'service:deep-cleaning': 'Deep cleaning', 'faq': 'Dodo Services'},
+        )
@@ -4,9 +4,9 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     PushSubscriptionViewSet, OfflineActionViewSet, SEOMetadataViewSet,
     ManifestView, ServiceWorkerView, WebPushConfigView,
-    robots_txt, sitemap_xml
+    robots_txt, sitemap_xml, sitemap_index, sitemap_section
 )
-from .views_health import health_check
+from .views_health import health_check, liveness, readiness
 
 router = DefaultRouter()
 router.register(r'push-subscriptions', PushSubscriptionViewSet, basename='push-subscription')
@@ -27,7 +27,11 @@ urlpatterns = [
     path('robots.txt', robots_txt, name='robots-txt'),
     path('<str:app_type>/robots.txt', robots_txt, name='app-robots-txt'),
     path('sitemap.xml', sitemap_xml, name='sitemap-xml'),
+    path('sitemap-index.xml', sitemap_index, name='sitemap-index'),
+    path('sitemap-<int:section>.xml', sitemap_section, name='sitemap-section'),
 
-    # Health check endpoint
+    # Health check endpoints
     path('api/health-check', health_check, name='health-check'),
+    path('api/health/live', liveness, name='health-live'),
+    path('api/health/ready', readiness, name='health-ready'),
 ]
@@ -1,16 +1,26 @@
 from django.conf import settings
-from django.http import HttpResponse, JsonResponse
-from django.utils import timezone
-from django.views.decorators.http import require_GET
+from django.db import transaction
+from django.http import Http404
+from django.urls import reverse
+from django.views import View
+from django.views.decorators.http import require_safe
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.response import Response
-from rest_framework.views import APIView
 
-from .models import PushSubscription, OfflineAction, SEOMetadata, Sitemap
+from dodo_backend.exports import ExportMixin, apply_filters
+from .filters import OFFLINE_ACTION_EXPORT_COLUMNS, OFFLINE_ACTION_FILTERS
+from .models import PushSubscription, OfflineAction, SEOMetadata
+from .precomputed import document_response, normalize_app_type
+from .seo import format_page_key, parse_page_key, resolve_seo, resolve_seo_many
+from .services import process_offline_actions
+from . import tasks
+from .sitemaps import (
+    get_sections, index_cache_key, iter_index_xml, iter_section_xml, section_cache_key, sitemap_response
+)
 from .serializers import (
-    PushSubscriptionSerializer, OfflineActionSerializer, SEOMetadataSerializer,
-    SitemapSerializer, ManifestSerializer, ServiceWorkerSerializer, WebPushSerializer
+    PushSubscriptionSerializer, OfflineActionSerializer, OfflineActionBatchSerializer, SEOMetadataSerializer,
+    SitemapSerializer
 )
 
 
@@ -20,7 +30,7 @@ class PushSubscriptionViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return PushSubscription.objects.filter(user=self.request.user)
+        return PushSubscription.objects.filter(user_id=self.request.user.id)
 
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
@@ -28,31 +38,57 @@ class PushSubscriptionViewSet(viewsets.ModelViewSet):
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class OfflineActionViewSet(viewsets.ModelViewSet):
+class OfflineActionViewSet(ExportMixin, viewsets.ModelViewSet):
     """ViewSet for managing offline actions."""
     serializer_class = OfflineActionSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_columns = OFFLINE_ACTION_EXPORT_COLUMNS
+    export_filename = 'offline_actions'
+    cursor_ordering = '-created_at'
 
     def get_queryset(self):
-        return OfflineAction.objects.filter(user=self.request.user)
+        queryset = OfflineAction.objects.filter(user_id=self.request.user.id)
+        if self.action in ('list', 'export'):
+            queryset = apply_filters(queryset, self.request.query_params, OFFLINE_ACTION_FILTERS)
+        return queryset
 
     @action(detail=False, methods=['post'])
     def sync(self, request):
         """Sync all pending offline actions."""
-        actions = OfflineAction.objects.filter(user=request.user, synced=False)
+        result = process_offline_actions(request.user.id)
+
+        return Response({
+            'status': 'success',
+            'synced_count': result['synced_count'],
+            'failed_count': result['failed_count'],
+            'failed': [r for r in result['results'] if r['status'] == 'error'],
+        })
 
-        # Process each action
-        for action in actions:
-            # Here you would implement the logic to process each action type
-            # For example, if action.action_type == 'create' and action.resource_type == 'booking'
-            # you would create a new booking using action.data
+    @action(detail=False, methods=['post'])
+    def batch(self, request):
+        """
+        Upload many offline actions (at most OFFLINE_BATCH_MAX_ACTIONS) in one
+        request. Actions whose idempotency_key was already received are
+        returned, not duplicated.
+        The actions are processed in the background; pass `?sync=true` to
+        process them straight away and get the counts in the response.
+        """
+        serializer = OfflineActionBatchSerializer(
+            data=request.data, context=self.get_serializer_context()
+        )
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
 
-            # For now, we'll just mark them as synced
-            action.synced = True
-            action.synced_at = timezone.now()
-            action.save()
+        response = {'actions': serializer.data}
+        if request.query_params.get('sync', '').lower() == 'true':
+            result = process_offline_actions(request.user.id)
+            response['synced_count'] = result['synced_count']
+            response['failed_count'] = result['failed_count']
+        else:
+            user_id = request.user.id
+            transaction.on_commit(lambda: tasks.process_offline_actions.delay(user_id))
 
-        return Response({'status': 'success', 'synced_count': actions.count()})
+        return Response(response, status=status.HTTP_201_CREATED)
 
 
 class SEOMetadataViewSet(viewsets.ReadOnlyModelViewSet):
@@ -74,185 +110,97 @@ class SEOMetadataViewSet(viewsets.ReadOnlyModelViewSet):
 
         return queryset
 
+    @action(detail=False, methods=['get'])
+    def resolve(self, request):
+        """
+        Resolve the metadata for pages, with site defaults filled in.
 
-class ManifestView(APIView):
-    """View for generating the web app manifest."""
-    permission_classes = [permissions.AllowAny]
+        `?page_type=service&page_identifier=deep-cleaning` returns one page;
+        `?pages=home,service:deep-cleaning` returns several, keyed by page key.
+        """
+        pages = request.query_params.get('pages')
+        if pages:
+            keys = [key.strip() for key in pages.split(',') if key.strip()]
+            if len(keys) > settings.SEO_MAX_BATCH_PAGES:
+                return Response(
+                    {'error': f'At most {settings.SEO_MAX_BATCH_PAGES} pages can be resolved at once'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            resolved = resolve_seo_many(parse_page_key(key) for key in keys)
+            return Response({format_page_key(*page): data for page, data in resolved.items()})
 
-    def get(self, request, app_type=None):
-        """Generate the manifest.json file."""
-        if app_type not in ['customer', 'vendor', 'admin']:
-            app_type = 'customer'  # Default to customer app
-
-        # Base manifest data
-        manifest_data = {
-            'name': settings.PWA_APP_NAME,
-            'short_name': f"Dodo {app_type.capitalize()}",
-            'description': settings.PWA_APP_DESCRIPTION,
-            'start_url': settings.PWA_APP_START_URL,
-            'display': settings.PWA_APP_DISPLAY,
-            'background_color': settings.PWA_APP_BACKGROUND_COLOR,
-            'theme_color': settings.PWA_APP_THEME_COLOR,
-            'orientation': settings.PWA_APP_ORIENTATION,
-            'icons': settings.PWA_APP_ICONS,
-            'scope': settings.PWA_APP_SCOPE,
-            'dir': settings.PWA_APP_DIR,
-            'lang': settings.PWA_APP_LANG,
-        }
-
-        # App-specific customizations
-        if app_type == 'vendor':
-            manifest_data['name'] = 'Dodo Services - Vendor Portal'
-            manifest_data['short_name'] = 'Dodo Vendor'
-        elif app_type == 'admin':
-            manifest_data['name'] = 'Dodo Services - Admin Panel'
-            manifest_data['short_name'] = 'Dodo Admin'
-
-        serializer = ManifestSerializer(data=manifest_data)
-        serializer.is_valid(raise_exception=True)
+        page_type = request.query_params.get('page_type')
+        if not page_type:
+            return Response({'error': 'page_type or pages is required'}, status=status.HTTP_400_BAD_REQUEST)
 
-        return JsonResponse(serializer.data)
+        return Response(resolve_seo(page_type, request.query_params.get('page_identifier')))
 
 
-class ServiceWorkerView(APIView):
-    """View for generating the service worker configuration."""
-    permission_classes = [permissions.AllowAny]
+class ManifestView(View):
+    """View for serving the web app manifest."""
 
     def get(self, request, app_type=None):
-        """Generate the service worker configuration."""
-        if app_type not in ['customer', 'vendor', 'admin']:
-            app_type = 'customer'  # Default to customer app
-
-        # Base service worker data
-        sw_data = {
-            'cache_name': f'dodo-{app_type}-cache-v1',
-            'urls_to_cache': [
-                '/',
-                '/offline',
-                '/static/css/main.css',
-                '/static/js/main.js',
-                '/static/images/logo.png',
-            ],
-            'offline_page': '/offline',
-            'cache_version': 1,
-        }
-
-        # App-specific customizations
-        if app_type == 'customer':
-            sw_data['urls_to_cache'].extend([
-                '/services',
-                '/blog',
-                '/contact',
-                '/about',
-            ])
-        elif app_type == 'vendor':
-            sw_data['urls_to_cache'].extend([
-                '/dashboard',
-                '/bookings',
-                '/services',
-                '/earnings',
-            ])
-        elif app_type == 'admin':
-            sw_data['urls_to_cache'].extend([
-                '/dashboard',
-                '/users',
-                '/services',
-                '/bookings',
-            ])
-
-        serializer = ServiceWorkerSerializer(data=sw_data)
-        serializer.is_valid(raise_exception=True)
+        """Serve the manifest.json file."""
+        return document_response(request, 'manifest', normalize_app_type(app_type))
+
 
-        return JsonResponse(serializer.data)
+class ServiceWorkerView(View):
+    """View for serving the service worker configuration."""
+
+    def get(self, request, app_type=None):
+        """Serve the service worker configuration."""
+        return document_response(request, 'sw-config', normalize_app_type(app_type))
 
 
-class WebPushConfigView(APIView):
+class WebPushConfigView(View):
     """View for retrieving web push configuration."""
-    permission_classes = [permissions.AllowAny]
 
     def get(self, request):
         """Get the VAPID public key for web push."""
-        data = {
-            'public_key': settings.WEBPUSH_SETTINGS.get('VAPID_PUBLIC_KEY', '')
-        }
+        return document_response(request, 'webpush-config')
 
-        serializer = WebPushSerializer(data=data)
-        serializer.is_valid(raise_exception=True)
 
-        return JsonResponse(serializer.data)
+@require_safe
+def robots_txt(request, app_type=None):
+    """Serve the robots.txt file."""
+    return document_response(request, 'robots', normalize_app_type(app_type))
 
 
-@require_GET
-def robots_txt(request, app_type=None):
-    """Generate robots.txt file."""
-    if app_type not in ['customer', 'vendor', 'admin']:
-        app_type = 'customer'  # Default to customer app
-
-    lines = []
-
-    if app_type == 'customer':
-        lines = [
-            "# Dodo Services Customer App Robots.txt",
-            "# Last updated: " + timezone.now().strftime('%Y-%m-%d'),
-            "",
-            "# Allow all crawlers",
-            "User-agent: *",
-            "Allow: /",
-            "Disallow: /api/",
-            "Disallow: /account/",
-            "Disallow: /login",
-            "Disallow: /register",
-            "Disallow: /offline",
-            "Disallow: /_next/",
-            "",
-            "# Sitemap locations",
-            "Sitemap: https://dodoservices.com/sitemap-index.xml",
-            "Sitemap: https://dodoservices.com/sitemap.xml",
-            "",
-            "# Crawl delay for bots",
-            "Crawl-delay: 10",
-        ]
-    else:
-        # For vendor and admin apps, disallow all crawling
-        lines = [
-            f"# Dodo Services {app_type.capitalize()} App Robots.txt",
-            "# Last updated: " + timezone.now().strftime('%Y-%m-%d'),
-            "",
-            "# Disallow all crawlers - This is a private portal",
-            "User-agent: *",
-            "Disallow: /",
-        ]
-
-    return HttpResponse("\n".join(lines), content_type="text/plain")
-
-
-@require_GET
+@require_safe
 def sitemap_xml(request):
-    """Generate sitemap.xml file."""
-    entries = Sitemap.objects.all()
-
-    xml_content = [
-        '<?xml version="1.0" encoding="UTF-8"?>',
-        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9"',
-        '        xmlns:xsi="http://www.w3.org/2001/XMLSchema-instance"',
-        '        xmlns:image="http://www.google.com/schemas/sitemap-image/1.1"',
-        '        xmlns:video="http://www.google.com/schemas/sitemap-video/1.1"',
-        '        xmlns:news="http://www.google.com/schemas/sitemap-news/0.9"',
-        '        xmlns:mobile="http://www.google.com/schemas/sitemap-mobile/1.0"',
-        '        xsi:schemaLocation="http://www.sitemaps.org/schemas/sitemap/0.9 http://www.sitemaps.org/schemas/sitemap/0.9/sitemap.xsd">',
-    ]
-
-    for entry in entries:
-        xml_content.extend([
-            '  <url>',
-            f'    <loc>{entry.url}</loc>',
-            f'    <lastmod>{entry.last_modified.strftime("%Y-%m-%dT%H:%M:%S+00:00")}</lastmod>',
-            f'    <changefreq>{entry.changefreq}</changefreq>',
-            f'    <priority>{entry.priority}</priority>',
-            '    <mobile:mobile/>',
-            '  </url>',
-        ])
-
-    xml_content.append('</urlset>')
-
-    return HttpResponse("\n".join(xml_content), content_type="application/xml")
+    """
+    Serve the sitemap. Small sites get a single urlset; once the entries
+    span more than one section this is the sitemap index instead.
+    """
+    sections = get_sections()
+    if len(sections) > 1:
+        return sitemap_index(request)
+    section = sections[0][0] if sections else 1
+    return sitemap_section(request, section)
+
+
+@require_safe
+def sitemap_index(request):
+    """Serve the sitemap index listing every sitemap section."""
+    sections = get_sections()
+    origin = f'{request.scheme}://{request.get_host()}'
+    last_modified = max((modified for _, modified in sections), default=None)
+
+    def location(section):
+        return origin + reverse('sitemap-section', args=[section])
+
+    return sitemap_response(
+        request, index_cache_key(origin), iter_index_xml(sections, location), last_modified
+    )
+
+
+@require_safe
+def sitemap_section(request, section):
+    """Serve one section (at most SITEMAP_MAX_URLS entries) of the sitemap."""
+    last_modified = dict(get_sections()).get(section)
+    if last_modified is None and section != 1:
+        raise Http404('Unknown sitemap section')
+
+    return sitemap_response(
+        request, section_cache_key(section), iter_section_xml(section), last_modified
+    )
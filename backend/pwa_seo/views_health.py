@@ -1,16 +1,53 @@
-from django.http import JsonResponse
-from django.views.decorators.http import require_GET
-from django.views.decorators.cache import never_cache
+from django.http import HttpResponseNotAllowed, JsonResponse
+from django.utils.cache import add_never_cache_headers
 
+from dodo_backend.health import get_monitor
 
-@require_GET
-@never_cache
-def health_check(request):
+
+async def health_check(request):
     """
     Simple health check endpoint for checking connectivity.
     This endpoint is used by the frontend to verify if the backend is reachable.
+
+    Async so that under ASGI it is answered on the event loop without taking
+    a worker thread. (`require_GET` and `never_cache` are not async-aware in
+    Django 4.2, hence the inline equivalents.)
     """
-    return JsonResponse({
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    response = JsonResponse({
         'status': 'ok',
         'timestamp': request.GET.get('_', ''),
     })
+    add_never_cache_headers(response)
+    return response
+
+
+async def liveness(request):
+    """
+    Liveness probe: the process answers requests. Checks no dependency, so
+    an outage of the database or cache does not get healthy workers restarted.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    response = JsonResponse({'status': 'ok'})
+    add_never_cache_headers(response)
+    return response
+
+
+async def readiness(request):
+    """
+    Readiness probe: the database, cache, task broker and migrations were
+    usable at the last background check (every HEALTH_CHECK_INTERVAL
+    seconds), and the server is not draining. Responds 503 otherwise, so a
+    load balancer routes around this worker. Serving it runs no probe.
+    """
+    if request.method != 'GET':
+        return HttpResponseNotAllowed(['GET'])
+
+    ready, report = get_monitor().report()
+    response = JsonResponse(report, status=200 if ready else 503)
+    add_never_cache_headers(response)
+    return response
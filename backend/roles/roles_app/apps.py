@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RolesAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'roles.roles_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+from rest_framework import permissions
+
+from dodo_backend.local_cache import LocalLRUCache
+from .models import Permission, Role, AdminRole
+
+# user id -> permission codenames. Role changes made by other
+# processes are seen once the entry expires, see RBAC_LOCAL_CACHE_TTL.
+_local = LocalLRUCache(settings.RBAC_LOCAL_CACHE_SIZE, settings.RBAC_LOCAL_CACHE_TTL)
+
+NO_PERMISSIONS = frozenset()
+
+
+def get_cache():
+    return caches[settings.RBAC_CACHE_ALIAS]
+
+
+def _user_key(user_id):
+    return f'rbac:user:{user_id}'
+
+
+def _role_version_key(role_id):
+    return f'rbac:role:{role_id}:version'
+
+
+def _load_permissions(user_id):
+    """Return `(role_id, role_version, codenames)` for a user from the database."""
+    role = (
+        AdminRole.objects.filter(user_id=user_id)
+        .values('role_id', 'role__is_active', 'role__updated_at')
+        .first()
+    )
+    if role is None:
+        return None, None, NO_PERMISSIONS
+
+    version = role['role__updated_at'].timestamp()
+    if not role['role__is_active']:
+        return role['role_id'], version, NO_PERMISSIONS
+
+    codenames = Permission.objects.filter(roles=role['role_id']).values_list('codename', flat=True)
+    return role['role_id'], version, frozenset(codenames)
+
+
+def get_user_permissions(user_id):
+    """
+    Return the set of permission codenames granted to a user through their
+    admin role. Inactive roles grant nothing.
+
+    Results are cached per process and in the shared cache, stamped with
+    the role's `updated_at`; a cached set is only used while it matches the
+    role's current version, which moves whenever the role, its permissions
+    or the user's assignment change.
+    """
+    cached = _local.get(user_id)
+    if cached is not None:
+        return cached
+
+    cache = get_cache()
+    entry = cache.get(_user_key(user_id))
+    if entry is not None:
+        role_id, version, codenames = entry
+        if role_id is None or cache.get(_role_version_key(role_id)) == version:
+            _local.set(user_id, codenames)
+            return codenames
+
+    role_id, version, codenames = _load_permissions(user_id)
+    if role_id is not None:
+        cache.add(_role_version_key(role_id), version, timeout=None)
+    cache.set(_user_key(user_id), (role_id, version, codenames), timeout=settings.RBAC_CACHE_TIMEOUT)
+    _local.set(user_id, codenames)
+    return codenames
+
+
+def has_permission(user, codename):
+    """
+    Return whether a user holds a permission. Superusers hold every
+    permission. The set is memoized on the user object, so repeated checks
+    within a request cost nothing.
+    """
+    if not user or not user.is_authenticated:
+        return False
+    if getattr(user, 'is_superuser', False):
+        return True
+
+    codenames = getattr(user, '_rbac_permissions', None)
+    if codenames is None:
+        codenames = get_user_permissions(user.id)
+        user._rbac_permissions = codenames
+    return codename in codenames
+
+
+def invalidate_user(user_id):
+    """Forget a user's cached permissions, e.g. after their role assignment changed."""
+    get_cache().delete(_user_key(user_id))
+    _local.discard_if(lambda key: key == user_id)
+
+
+def touch_roles(role_ids):
+    """
+    Move the given roles to a new version, invalidating the cached
+    permissions of every user holding them. Used for changes that do not
+    save the role itself, like editing its permission set.
+    """
+    role_ids = list(role_ids)
+    if not role_ids:
+        return
+    now = timezone.now()
+    Role.objects.filter(id__in=role_ids).update(updated_at=now)
+    for role_id in role_ids:
+        set_role_version(role_id, now.timestamp())
+
+
+def set_role_version(role_id, version):
+    get_cache().set(_role_version_key(role_id), version, timeout=None)
+    # Per-process entries do not record their role; drop them all, they are cheap to rebuild
+    _local.clear()
+
+
+class HasPermission(permissions.BasePermission):
+    """
+    Allows access to authenticated users whose admin role grants all of the
+    given permission codenames:
+
+        permission_classes = [IsAdminUser, HasPermission('manage_services')]
+    """
+
+    def __init__(self, *codenames):
+        self.codenames = codenames
+
+    def __call__(self):
+        # DRF instantiates permission_classes; an instance stands in for its class
+        return self
+
+    def has_permission(self, request, view):
+        return all(has_permission(request.user, codename) for codename in self.codenames)
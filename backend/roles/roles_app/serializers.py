@@ -74,7 +74,7 @@ class AdminRoleSerializer(serializers.ModelSerializer):
         admin_role = AdminRole.objects.create(
             user=user,
             role=role,
-            assigned_by=assigned_by,
+            assigned_by_id=assigned_by.id,
             **validated_data
         )
 
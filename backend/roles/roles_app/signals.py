@@ -0,0 +1,57 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import rbac
+from .models import Permission, Role, AdminRole
+
+
+@receiver(post_save, sender=Role)
+def update_role_version(sender, instance, **kwargs):
+    """Saving a role (including activate/deactivate) moves it to a new version."""
+    rbac.set_role_version(instance.pk, instance.updated_at.timestamp())
+
+
+@receiver(m2m_changed, sender=Role.permissions.through)
+def touch_roles_on_permissions_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            rbac.touch_roles([instance.pk])
+        return
+
+    # Changed from the permission side: `pk_set` holds role ids, except on clear
+    if action == 'pre_clear':
+        instance._rbac_role_ids = list(instance.roles.values_list('id', flat=True))
+    elif action == 'post_clear':
+        rbac.touch_roles(getattr(instance, '_rbac_role_ids', []))
+    elif action in ('post_add', 'post_remove'):
+        rbac.touch_roles(pk_set)
+
+
+@receiver(post_save, sender=Permission)
+def touch_roles_on_permission_save(sender, instance, created, **kwargs):
+    # A renamed codename changes the sets of all roles holding the permission
+    if not created:
+        rbac.touch_roles(instance.roles.values_list('id', flat=True))
+
+
+@receiver(pre_delete, sender=Permission)
+def remember_permission_roles(sender, instance, **kwargs):
+    instance._rbac_role_ids = list(instance.roles.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Permission)
+def touch_roles_on_permission_delete(sender, instance, **kwargs):
+    rbac.touch_roles(getattr(instance, '_rbac_role_ids', []))
+
+
+@receiver(pre_save, sender=AdminRole)
+def invalidate_previous_admin(sender, instance, **kwargs):
+    if instance.pk:
+        previous_user_id = AdminRole.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+        if previous_user_id and previous_user_id != instance.user_id:
+            rbac.invalidate_user(previous_user_id)
+
+
+@receiver([post_save, post_delete], sender=AdminRole)
+def invalidate_admin(sender, instance, **kwargs):
+    rbac.invalidate_user(instance.user_id)
@@ -1,3 +1,184 @@
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
 
-# Create your tests here.
+from user_service.user_app.models import User
+from . import rbac
+from .models import Permission, Role, AdminRole
+
+
+def clear_rbac_caches():
+    rbac.get_cache().clear()
+    rbac._local.clear()
+
+
+class RoleListQueryCountTests(TestCase):
+    """Role and admin role listings must not issue queries per row."""
+
+    def setUp(self):
+        clear_rbac_caches()
+        self.admin = User.objects.create(email='admin@example.com', user_type='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        self.permissions = [
+            Permission.objects.create(name=f'Permission {i}', codename=f'perm_{i}')
+            for i in range(3)
+        ]
+
+    def create_admin_roles(self, count, start=0):
+        for i in range(start, start + count):
+            role = Role.objects.create(name=f'Role {i}')
+            role.permissions.set(self.permissions)
+            user = User.objects.create(email=f'admin{i}@example.com', user_type='admin')
+            AdminRole.objects.create(user=user, role=role, assigned_by=self.admin)
+
+    def test_role_query_count_is_constant_per_page(self):
+        # COUNT + SELECT + permissions prefetch
+        self.create_admin_roles(1)
+        with self.assertNumQueries(3):
+            self.client.get('/api/roles/roles/')
+
+        self.create_admin_roles(9, start=1)
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/roles/roles/')
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_admin_role_query_count_is_constant_per_page(self):
+        # COUNT + SELECT joined with user, role, assigned_by + permissions prefetch
+        self.create_admin_roles(1)
+        with self.assertNumQueries(3):
+            self.client.get('/api/roles/admin-roles/')
+
+        self.create_admin_roles(9, start=1)
+        with CaptureQueriesContext(connection) as queries, self.assertNumQueries(3):
+            response = self.client.get('/api/roles/admin-roles/')
+        self.assertEqual(len(response.json()['results']), 10)
+        # User columns the serializer does not show are not read
+        self.assertIn('"mobile"', queries.captured_queries[1]['sql'])
+        self.assertNotIn('"password"', queries.captured_queries[1]['sql'])
+
+
+class PermissionCacheTests(TestCase):
+    """Cached permission sets follow every change to roles, permissions and assignments."""
+
+    def setUp(self):
+        clear_rbac_caches()
+        self.view = Permission.objects.create(name='View bookings', codename='view_bookings')
+        self.edit = Permission.objects.create(name='Edit bookings', codename='edit_bookings')
+        self.role = Role.objects.create(name='Support')
+        self.role.permissions.add(self.view)
+        self.user = User.objects.create(email='support@example.com', user_type='admin')
+        self.admin_role = AdminRole.objects.create(user=self.user, role=self.role)
+
+    def assertPermissions(self, user, codenames):
+        self.assertEqual(rbac.get_user_permissions(user.id), frozenset(codenames))
+
+    def test_repeated_checks_cost_no_queries(self):
+        with self.assertNumQueries(2):
+            self.assertPermissions(self.user, {'view_bookings'})
+        with self.assertNumQueries(0):
+            self.assertPermissions(self.user, {'view_bookings'})
+
+        # Another process: only the shared cache is warm
+        rbac._local.clear()
+        with self.assertNumQueries(0):
+            self.assertPermissions(self.user, {'view_bookings'})
+
+        user = User.objects.get(pk=self.user.pk)
+        with self.assertNumQueries(0):
+            for _ in range(3):
+                self.assertTrue(rbac.has_permission(user, 'view_bookings'))
+                self.assertFalse(rbac.has_permission(user, 'edit_bookings'))
+
+    def test_role_permission_changes(self):
+        self.assertPermissions(self.user, {'view_bookings'})
+
+        self.role.permissions.add(self.edit)
+        self.assertPermissions(self.user, {'view_bookings', 'edit_bookings'})
+
+        self.role.permissions.remove(self.view)
+        self.assertPermissions(self.user, {'edit_bookings'})
+
+        self.role.permissions.clear()
+        self.assertPermissions(self.user, set())
+
+    def test_permission_role_changes(self):
+        self.assertPermissions(self.user, {'view_bookings'})
+
+        self.edit.roles.add(self.role)
+        self.assertPermissions(self.user, {'view_bookings', 'edit_bookings'})
+
+        self.view.roles.remove(self.role)
+        self.assertPermissions(self.user, {'edit_bookings'})
+
+        self.edit.roles.clear()
+        self.assertPermissions(self.user, set())
+
+    def test_permission_rename_and_delete(self):
+        self.assertPermissions(self.user, {'view_bookings'})
+
+        self.view.codename = 'read_bookings'
+        self.view.save()
+        self.assertPermissions(self.user, {'read_bookings'})
+
+        self.view.delete()
+        self.assertPermissions(self.user, set())
+
+    def test_activate_and_deactivate(self):
+        admin = User.objects.create(email='admin@example.com', user_type='admin', is_superuser=True)
+        client = APIClient()
+        client.force_authenticate(user=admin)
+        self.assertPermissions(self.user, {'view_bookings'})
+
+        response = client.post(f'/api/roles/roles/{self.role.pk}/deactivate/')
+        self.assertEqual(response.status_code, 200)
+        self.assertPermissions(self.user, set())
+
+        client.post(f'/api/roles/roles/{self.role.pk}/activate/')
+        self.assertPermissions(self.user, {'view_bookings'})
+
+    def test_admin_role_reassignment(self):
+        other_role = Role.objects.create(name='Bookings')
+        other_role.permissions.add(self.edit)
+        other_user = User.objects.create(email='bookings@example.com', user_type='admin')
+        self.assertPermissions(self.user, {'view_bookings'})
+        self.assertPermissions(other_user, set())
+
+        self.admin_role.role = other_role
+        self.admin_role.save()
+        self.assertPermissions(self.user, {'edit_bookings'})
+
+        self.admin_role.user = other_user
+        self.admin_role.save()
+        self.assertPermissions(self.user, set())
+        self.assertPermissions(other_user, {'edit_bookings'})
+
+        self.admin_role.delete()
+        self.assertPermissions(other_user, set())
+
+
+class HasPermissionTests(TestCase):
+    """HasPermission admits users whose role grants every given codename."""
+
+    def setUp(self):
+        clear_rbac_caches()
+        self.role = Role.objects.create(name='Support')
+        self.role.permissions.add(Permission.objects.create(name='View bookings', codename='view_bookings'))
+        self.user = User.objects.create(email='support@example.com', user_type='admin')
+        AdminRole.objects.create(user=self.user, role=self.role)
+
+    def allows(self, user, *codenames):
+        request = APIRequestFactory().get('/')
+        request.user = user
+        return rbac.HasPermission(*codenames)().has_permission(request, None)
+
+    def test_requires_every_codename(self):
+        self.assertTrue(self.allows(self.user, 'view_bookings'))
+        self.assertFalse(self.allows(self.user, 'view_bookings', 'edit_bookings'))
+        self.assertFalse(self.allows(AnonymousUser(), 'view_bookings'))
+
+    def test_superusers_hold_every_permission(self):
+        superuser = User.objects.create(email='root@example.com', user_type='admin', is_superuser=True)
+        self.assertTrue(self.allows(superuser, 'view_bookings', 'edit_bookings'))
@@ -2,6 +2,7 @@ from rest_framework import viewsets, permissions, status
 from rest_framework.response import Response
 from rest_framework.decorators import action
 
+from user_service.user_app.serializers import UserSerializer
 from .models import Permission, Role, AdminRole
 from .serializers import PermissionSerializer, RoleSerializer, AdminRoleSerializer
 
@@ -21,7 +22,7 @@ class PermissionViewSet(viewsets.ModelViewSet):
 
 
 class RoleViewSet(viewsets.ModelViewSet):
-    queryset = Role.objects.all()
+    queryset = Role.objects.prefetch_related('permissions')
     serializer_class = RoleSerializer
     permission_classes = [IsAdminUser]
 
@@ -47,10 +48,24 @@ class RoleViewSet(viewsets.ModelViewSet):
 
 
 class AdminRoleViewSet(viewsets.ModelViewSet):
-    queryset = AdminRole.objects.all()
+    queryset = AdminRole.objects.select_related(
+        'user', 'role', 'assigned_by'
+    ).prefetch_related('role__permissions')
     serializer_class = AdminRoleSerializer
     permission_classes = [IsAdminUser]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            # Only the user columns UserSerializer shows, for both the admin and the assigner
+            user_fields = UserSerializer.Meta.fields
+            queryset = queryset.only(
+                'id', 'assigned_at', 'updated_at', 'role__id', 'role__name', 'role__description',
+                'role__is_active', 'role__created_at', 'role__updated_at',
+                *(f'user__{name}' for name in user_fields), *(f'assigned_by__{name}' for name in user_fields),
+            )
+        return queryset
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context.update({"request": self.request})
@@ -0,0 +1,20 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import QueuedTask
+
+
+@admin.register(QueuedTask)
+class QueuedTaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'queue', 'status', 'attempts', 'run_at', 'enqueued_at', 'started_at')
+    list_filter = ('status', 'queue', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = ('enqueued_at', 'started_at', 'locked_until', 'last_error')
+    actions = ['requeue']
+
+    @admin.action(description='Requeue selected tasks')
+    def requeue(self, request, queryset):
+        count = queryset.exclude(status='running').update(
+            status='queued', run_at=timezone.now(), attempts=0, locked_until=None
+        )
+        self.message_user(request, f'Requeued {count} tasks')
@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TaskQueueConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'task_queue'
+
+    def ready(self):
+        from dodo_backend.metrics import register_collector
+        from . import signals  # noqa: F401
+        from .metrics import collect_task_metrics
+
+        # Register the tasks of every installed app
+        autodiscover_modules('tasks')
+        register_collector(collect_task_metrics)
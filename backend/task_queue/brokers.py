@@ -0,0 +1,336 @@
+import json
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import QueuedTask
+from .registry import Message
+
+
+@lru_cache(maxsize=None)
+def get_broker():
+    """Return the broker configured by TASK_BROKER."""
+    return import_string(settings.TASK_BROKER)()
+
+
+class BaseBroker:
+    """
+    Stores queued messages until they run. A broker counts an attempt each
+    time it hands a message out; the task's outcome is then reported back
+    through `ack`, `retry` or `fail`.
+
+    Brokers that `consume` are polled by `run_worker`; the others run tasks
+    themselves in the process that queued them.
+    """
+    consumes = False
+
+    def enqueue(self, message):
+        raise NotImplementedError
+
+    def reserve(self, queues, limit):
+        """Claim up to `limit` due messages, taking `queues` in priority order."""
+        return []
+
+    def ack(self, message):
+        """The task succeeded."""
+
+    def retry(self, message, delay, error):
+        """The task failed and should run again in `delay` seconds."""
+        raise NotImplementedError
+
+    def fail(self, message, error):
+        """The task failed for good."""
+
+    def recover(self):
+        """Requeue messages whose worker died before settling them; return how many."""
+        return 0
+
+    def queue_sizes(self):
+        """Return `{queue: number of queued messages}`."""
+        return {}
+
+
+class ImmediateBroker(BaseBroker):
+    """
+    Runs each task inline as it is queued, sleeping through retry backoffs.
+    Countdowns are ignored. Meant for tests and one-off scripts.
+    """
+
+    def enqueue(self, message):
+        from .worker import execute
+
+        message.attempts += 1
+        execute(message, self)
+
+    def retry(self, message, delay, error):
+        time.sleep(delay)
+        message.last_error = error
+        self.enqueue(message)
+
+
+class LocalBroker(BaseBroker):
+    """
+    Runs tasks on a thread pool (TASK_LOCAL_WORKERS threads) in the process
+    that queued them. Needs no infrastructure, but nothing is persisted:
+    tasks still queued when the process exits are lost.
+    """
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.TASK_LOCAL_WORKERS,
+            thread_name_prefix='task',
+        )
+        self._sizes = Counter()
+        self._lock = threading.Lock()
+
+    def enqueue(self, message):
+        with self._lock:
+            self._sizes[message.queue] += 1
+
+        delay = message.run_at - time.time()
+        if delay > 0:
+            timer = threading.Timer(delay, self._submit, [message])
+            timer.daemon = True
+            timer.start()
+        else:
+            self._submit(message)
+
+    def _submit(self, message):
+        from .worker import process
+
+        message.attempts += 1
+        self.executor.submit(process, message, self)
+
+    def _done(self, message):
+        with self._lock:
+            self._sizes[message.queue] -= 1
+
+    def ack(self, message):
+        self._done(message)
+
+    def retry(self, message, delay, error):
+        self._done(message)
+        message.run_at = time.time() + delay
+        message.last_error = error
+        self.enqueue(message)
+
+    def fail(self, message, error):
+        self._done(message)
+
+    def queue_sizes(self):
+        with self._lock:
+            return {queue: size for queue, size in self._sizes.items() if size}
+
+
+def _to_datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=dt_timezone.utc)
+
+
+class DatabaseBroker(BaseBroker):
+    """
+    Keeps messages in the `QueuedTask` table. Workers claim due rows for
+    TASK_VISIBILITY_TIMEOUT seconds; a claim that expires, because its
+    worker died, is released to another worker by `recover`.
+    """
+    consumes = True
+
+    def enqueue(self, message):
+        row = QueuedTask.objects.create(
+            name=message.name,
+            queue=message.queue,
+            args=message.args,
+            kwargs=message.kwargs,
+            run_at=_to_datetime(message.run_at),
+            attempts=message.attempts,
+        )
+        message.id = row.pk
+
+    def reserve(self, queues, limit):
+        messages = []
+        for queue in queues:
+            if len(messages) >= limit:
+                break
+            messages.extend(self._claim(queue, limit - len(messages)))
+        return messages
+
+    def _claim(self, queue, limit):
+        now = timezone.now()
+        ready = QueuedTask.objects.filter(queue=queue, status='queued', run_at__lte=now).order_by('run_at')
+        claim = {
+            'status': 'running',
+            'started_at': now,
+            'locked_until': now + timedelta(seconds=settings.TASK_VISIBILITY_TIMEOUT),
+            'attempts': F('attempts') + 1,
+        }
+
+        if connection.features.has_select_for_update_skip_locked:
+            with transaction.atomic():
+                ids = list(ready.select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+                QueuedTask.objects.filter(id__in=ids).update(**claim)
+        else:
+            # Claim rows one at a time; a row another worker took first updates nothing
+            ids = [
+                pk for pk in ready.values_list('id', flat=True)[:limit]
+                if QueuedTask.objects.filter(id=pk, status='queued').update(**claim)
+            ]
+
+        return [
+            Message(
+                row.name,
+                row.args,
+                row.kwargs,
+                queue=row.queue,
+                run_at=row.run_at.timestamp(),
+                attempts=row.attempts,
+                id=row.pk,
+                last_error=row.last_error,
+            )
+            for row in QueuedTask.objects.filter(id__in=ids).order_by('run_at')
+        ]
+
+    def ack(self, message):
+        QueuedTask.objects.filter(id=message.id).delete()
+
+    def retry(self, message, delay, error):
+        QueuedTask.objects.filter(id=message.id).update(
+            status='queued',
+            run_at=timezone.now() + timedelta(seconds=delay),
+            locked_until=None,
+            last_error=error,
+        )
+
+    def fail(self, message, error):
+        QueuedTask.objects.filter(id=message.id).update(status='failed', locked_until=None, last_error=error)
+
+    def recover(self):
+        return QueuedTask.objects.filter(status='running', locked_until__lt=timezone.now()).update(
+            status='queued', locked_until=None
+        )
+
+    def queue_sizes(self):
+        rows = QueuedTask.objects.filter(status='queued').values('queue').annotate(size=Count('id'))
+        return {row['queue']: row['size'] for row in rows}
+
+
+# Moves up to ARGV[2] messages due by ARGV[1] from a queue to the running set,
+# with claim expiry ARGV[3], atomically so two workers never take the same one.
+RESERVE_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, id in ipairs(ids) do
+    redis.call('ZREM', KEYS[1], id)
+    redis.call('ZADD', KEYS[2], ARGV[3], id)
+end
+return ids
+"""
+
+
+class RedisBroker(BaseBroker):
+    """
+    Keeps messages in Redis (TASK_REDIS_URL): one sorted set per queue
+    scored by due time, and a set of running messages scored by claim
+    expiry. Failed messages are kept under the `failed` set. Requires the
+    `redis` package.
+    """
+    consumes = True
+
+    def __init__(self):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImproperlyConfigured('RedisBroker requires the redis package') from e
+
+        self.client = redis.Redis.from_url(settings.TASK_REDIS_URL)
+        self.prefix = settings.TASK_REDIS_PREFIX
+        self._reserve = self.client.register_script(RESERVE_SCRIPT)
+
+    def _key(self, *parts):
+        return ':'.join((self.prefix,) + parts)
+
+    def _save(self, pipe, message):
+        pipe.set(self._key('message', message.id), json.dumps(message.to_dict()))
+
+    def enqueue(self, message):
+        with self.client.pipeline() as pipe:
+            self._save(pipe, message)
+            pipe.zadd(self._key('queue', message.queue), {message.id: message.run_at})
+            pipe.execute()
+
+    def reserve(self, queues, limit):
+        messages = []
+        for queue in queues:
+            if len(messages) >= limit:
+                break
+            now = time.time()
+            ids = self._reserve(
+                keys=[self._key('queue', queue), self._key('running')],
+                args=[now, limit - len(messages), now + settings.TASK_VISIBILITY_TIMEOUT],
+            )
+            if not ids:
+                continue
+
+            with self.client.pipeline() as pipe:
+                for data in self.client.mget([self._key('message', id.decode()) for id in ids]):
+                    if data is None:
+                        continue
+                    message = Message.from_dict(json.loads(data))
+                    message.attempts += 1
+                    self._save(pipe, message)
+                    messages.append(message)
+                pipe.execute()
+        return messages
+
+    def ack(self, message):
+        with self.client.pipeline() as pipe:
+            pipe.zrem(self._key('running'), message.id)
+            pipe.delete(self._key('message', message.id))
+            pipe.execute()
+
+    def retry(self, message, delay, error):
+        message.run_at = time.time() + delay
+        message.last_error = error
+        with self.client.pipeline() as pipe:
+            pipe.zrem(self._key('running'), message.id)
+            self._save(pipe, message)
+            pipe.zadd(self._key('queue', message.queue), {message.id: message.run_at})
+            pipe.execute()
+
+    def fail(self, message, error):
+        message.last_error = error
+        with self.client.pipeline() as pipe:
+            pipe.zrem(self._key('running'), message.id)
+            self._save(pipe, message)
+            pipe.zadd(self._key('failed'), {message.id: time.time()})
+            pipe.execute()
+
+    def recover(self):
+        now = time.time()
+        recovered = 0
+        for id in self.client.zrangebyscore(self._key('running'), '-inf', now):
+            # Only the worker that removes the claim requeues the message
+            if not self.client.zrem(self._key('running'), id):
+                continue
+            data = self.client.get(self._key('message', id.decode()))
+            if data is not None:
+                message = Message.from_dict(json.loads(data))
+                self.client.zadd(self._key('queue', message.queue), {message.id: now})
+                recovered += 1
+        return recovered
+
+    def queue_sizes(self):
+        prefix = self._key('queue', '')
+        sizes = {}
+        for key in self.client.scan_iter(match=f'{prefix}*'):
+            size = self.client.zcard(key)
+            if size:
+                sizes[key.decode()[len(prefix):]] = size
+        return sizes
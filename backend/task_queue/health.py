@@ -0,0 +1,6 @@
+from .brokers import get_broker
+
+
+def check_broker():
+    """Readiness probe: the task broker can be reached, see dodo_backend.health."""
+    get_broker().queue_sizes()
@@ -0,0 +1,59 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from task_queue.brokers import get_broker
+from task_queue.metrics import task_metrics
+from task_queue.worker import Scheduler, Worker
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks and queue periodic tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--queues',
+            default=','.join(settings.TASK_WORKER_QUEUES),
+            help='Comma separated queues to consume, highest priority first',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.TASK_WORKER_CONCURRENCY,
+            help='Number of tasks run at the same time',
+        )
+        parser.add_argument(
+            '--no-scheduler',
+            action='store_true',
+            help='Do not queue periodic tasks from this worker',
+        )
+        parser.add_argument(
+            '--burst',
+            action='store_true',
+            help='Exit once no task is ready instead of waiting for more',
+        )
+
+    def handle(self, *args, **options):
+        queues = [queue.strip() for queue in options['queues'].split(',') if queue.strip()]
+        broker = get_broker()
+        scheduler = None if options['no_scheduler'] else Scheduler()
+        worker = Worker(queues, options['concurrency'], broker=broker, scheduler=scheduler)
+
+        # Finish the running tasks before exiting
+        signal.signal(signal.SIGTERM, lambda signum, frame: worker.stop())
+        signal.signal(signal.SIGINT, lambda signum, frame: worker.stop())
+
+        if broker.consumes:
+            self.stdout.write(f"Consuming {', '.join(queues)} with {options['concurrency']} threads")
+        else:
+            self.stdout.write(f'{type(broker).__name__} runs tasks where they are queued; only scheduling')
+        worker.run(burst=options['burst'])
+
+        for name, stats in sorted(task_metrics.snapshot().items()):
+            self.stdout.write(
+                f"{name}: {stats['succeeded']} succeeded, {stats['retried']} retried, "
+                f"{stats['failed']} failed, {stats['runtime_mean'] * 1000:.1f}ms mean, "
+                f"{stats['runtime_max'] * 1000:.1f}ms max, {stats['wait_mean'] * 1000:.1f}ms mean wait"
+            )
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
@@ -0,0 +1,89 @@
+import logging
+import threading
+from collections import defaultdict
+
+from dodo_backend.metrics import sample
+
+logger = logging.getLogger(__name__)
+
+OUTCOMES = ('succeeded', 'retried', 'failed')
+
+
+class TaskMetrics:
+    """
+    Per-task counters and timings for the current process: how many runs
+    succeeded, were retried or failed, how long they ran and how long they
+    waited in the queue after becoming due.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = defaultdict(self._empty)
+
+    @staticmethod
+    def _empty():
+        stats = dict.fromkeys(OUTCOMES, 0)
+        stats.update(runtime_total=0.0, runtime_max=0.0, wait_total=0.0, wait_max=0.0)
+        return stats
+
+    def record(self, name, outcome, runtime, wait):
+        with self._lock:
+            stats = self._stats[name]
+            stats[outcome] += 1
+            stats['runtime_total'] += runtime
+            stats['runtime_max'] = max(stats['runtime_max'], runtime)
+            stats['wait_total'] += wait
+            stats['wait_max'] = max(stats['wait_max'], wait)
+
+    def snapshot(self):
+        """Return `{task name: stats}`, with mean runtime and wait per run."""
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                stats = dict(stats)
+                runs = sum(stats[outcome] for outcome in OUTCOMES)
+                stats['runtime_mean'] = stats['runtime_total'] / runs
+                stats['wait_mean'] = stats['wait_total'] / runs
+                result[name] = stats
+            return result
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+
+task_metrics = TaskMetrics()
+
+
+def collect_task_metrics():
+    """Prometheus lines for `/metrics`: this process' task runs, and the broker's queue sizes."""
+    from .brokers import get_broker
+
+    snapshot = task_metrics.snapshot()
+    yield from sample(
+        'task_runs_total', 'Task runs by outcome.', 'counter',
+        {(name, outcome): stats[outcome] for name, stats in snapshot.items() for outcome in OUTCOMES},
+        ('task', 'outcome'),
+    )
+    yield from sample(
+        'task_runtime_seconds_total', 'Time spent running tasks.', 'counter',
+        {(name,): stats['runtime_total'] for name, stats in snapshot.items()},
+        ('task',),
+    )
+    yield from sample(
+        'task_wait_seconds_total', 'Time tasks waited in the queue after becoming due.', 'counter',
+        {(name,): stats['wait_total'] for name, stats in snapshot.items()},
+        ('task',),
+    )
+
+    try:
+        sizes = get_broker().queue_sizes()
+    except Exception:
+        # An unreachable broker must not break the scrape
+        logger.exception("Could not read task queue sizes")
+        return
+    yield from sample(
+        'task_queue_size', 'Messages waiting per queue.', 'gauge',
+        {(queue,): size for queue, size in sizes.items()},
+        ('queue',),
+    )
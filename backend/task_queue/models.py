@@ -0,0 +1,40 @@
+from django.db import models
+from django.utils import timezone
+
+
+class QueuedTask(models.Model):
+    """
+    A task waiting in, or failed out of, the database queue (see
+    task_queue.brokers.DatabaseBroker). Rows are deleted once the task
+    succeeds; failed tasks stay for inspection and can be requeued.
+    """
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    )
+
+    name = models.CharField(max_length=200)
+    queue = models.CharField(max_length=50, default='default')
+    args = models.JSONField(default=list)
+    kwargs = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    enqueued_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    locked_until = models.DateTimeField(null=True, blank=True)  # Claim expiry of a running task
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        verbose_name = 'Queued Task'
+        verbose_name_plural = 'Queued Tasks'
+        indexes = [
+            # Workers poll for due tasks per queue
+            models.Index(fields=['queue', 'run_at'], condition=models.Q(status='queued'), name='task_ready_idx'),
+            # Claims of crashed workers are found by expiry
+            models.Index(fields=['locked_until'], condition=models.Q(status='running'), name='task_running_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
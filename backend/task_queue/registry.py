@@ -0,0 +1,177 @@
+import json
+import time
+import uuid
+from datetime import timedelta
+
+# name -> Task. Filled as task modules are imported; TaskQueueConfig.ready()
+# imports the `tasks` module of every installed app.
+TASKS = {}
+
+
+class Retry(Exception):
+    """
+    Raised by a task to be run again later, up to its `max_retries`.
+    `countdown` overrides the task's exponential backoff, in seconds.
+    """
+
+    def __init__(self, message='', countdown=None):
+        super().__init__(message)
+        self.countdown = countdown
+
+
+class Message:
+    """
+    One queued run of a task. Arguments are kept JSON-encodable so a message
+    can be stored by any broker; `run_at` is a Unix timestamp.
+    """
+
+    def __init__(self, name, args=(), kwargs=None, queue='default', run_at=None, attempts=0, id=None, last_error=''):
+        self.id = id or uuid.uuid4().hex
+        self.name = name
+        self.args = list(args)
+        self.kwargs = kwargs or {}
+        self.queue = queue
+        self.run_at = run_at if run_at is not None else time.time()
+        self.attempts = attempts
+        self.last_error = last_error
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'args': self.args,
+            'kwargs': self.kwargs,
+            'queue': self.queue,
+            'run_at': self.run_at,
+            'attempts': self.attempts,
+            'last_error': self.last_error,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+    def __repr__(self):
+        return f'<Message {self.name} {self.id}>'
+
+
+class Task:
+    """
+    A function that can run in the background. Calling the task runs it
+    inline; `delay()` and `apply_async()` hand it to the configured broker.
+    """
+
+    def __init__(self, func, name=None, queue='default', max_retries=0, retry_backoff=1.0, retry_on=()):
+        self.func = func
+        self.name = name or f'{func.__module__}.{func.__name__}'
+        self.queue = queue
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.retry_on = tuple(retry_on)
+        self.__doc__ = func.__doc__
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def __repr__(self):
+        return f'<Task {self.name}>'
+
+    def delay(self, *args, **kwargs):
+        """Queue the task with the given arguments."""
+        return self.apply_async(args, kwargs)
+
+    def apply_async(self, args=(), kwargs=None, countdown=None, queue=None):
+        """
+        Queue the task.
+
+        Args:
+            args: Positional arguments, JSON-encodable
+            kwargs: Keyword arguments, JSON-encodable
+            countdown: Seconds to wait before the task may run
+            queue: Queue to use instead of the task's own
+
+        Returns:
+            Message: The queued message
+        """
+        from .brokers import get_broker
+
+        # Round-trip the arguments so tasks see the same values whichever broker runs them
+        args, kwargs = json.loads(json.dumps([list(args), kwargs or {}]))
+        message = Message(
+            self.name,
+            args,
+            kwargs,
+            queue=queue or self.queue,
+            run_at=time.time() + (countdown or 0),
+        )
+        get_broker().enqueue(message)
+        return message
+
+    def retry_delay(self, error, attempt):
+        """
+        Return the seconds to wait before retrying after `attempt` failed
+        with `error`, or None if the task should not be retried.
+        """
+        if attempt > self.max_retries:
+            return None
+        if isinstance(error, Retry):
+            if error.countdown is not None:
+                return error.countdown
+        elif not isinstance(error, self.retry_on):
+            return None
+        return self.retry_backoff * (2 ** (attempt - 1))
+
+
+class PeriodicTask(Task):
+    """A task the worker's scheduler queues every `every`."""
+
+    def __init__(self, func, every, **options):
+        super().__init__(func, **options)
+        self.every = every if isinstance(every, timedelta) else timedelta(seconds=every)
+
+
+def task(func=None, **options):
+    """
+    Register a function as a background task:
+
+        @task(queue='otp', max_retries=3, retry_backoff=0.5)
+        def send_otp(mobile, otp):
+            ...
+
+        send_otp.delay(mobile, otp)
+
+    Options:
+        name: Registry name, defaults to the function's dotted path
+        queue: Queue the task is sent to
+        max_retries: Times a failed run is retried
+        retry_backoff: Seconds before the first retry, doubled for each following one
+        retry_on: Exception types that are retried; other exceptions fail the
+            task unless it raises `Retry`
+    """
+    def decorator(func):
+        return register(Task(func, **options))
+    return decorator(func) if func is not None else decorator
+
+
+def periodic_task(every, **options):
+    """
+    Register a task that `run_worker` queues every `every` (a timedelta or
+    seconds). Across workers each interval is queued once, see
+    task_queue.worker.Scheduler. Takes the same options as `task`.
+    """
+    def decorator(func):
+        return register(PeriodicTask(func, every, **options))
+    return decorator
+
+
+def register(task):
+    TASKS[task.name] = task
+    return task
+
+
+def get_task(name):
+    return TASKS[name]
+
+
+def get_periodic_tasks():
+    return [task for task in TASKS.values() if isinstance(task, PeriodicTask)]
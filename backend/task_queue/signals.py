@@ -0,0 +1,11 @@
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .brokers import get_broker
+
+
+@receiver(setting_changed)
+def reset_broker(sender, setting, **kwargs):
+    """Use the new broker after TASK_* settings change, e.g. in tests."""
+    if setting.startswith('TASK_'):
+        get_broker.cache_clear()
@@ -0,0 +1,142 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .brokers import DatabaseBroker
+from .metrics import task_metrics
+from .models import QueuedTask
+from .registry import Message, Retry, periodic_task, task
+from .worker import Scheduler, execute
+
+calls = []
+
+
+@task(name='task_queue.tests.record', max_retries=2, retry_backoff=0)
+def record(value, fail_times=0):
+    calls.append(value)
+    if calls.count(value) <= fail_times:
+        raise Retry('not yet')
+
+
+@task(name='task_queue.tests.broken', max_retries=3, retry_backoff=0)
+def broken():
+    raise ValueError('broken')
+
+
+@periodic_task(every=timedelta(minutes=5), name='task_queue.tests.tick')
+def tick():
+    calls.append('tick')
+
+
+class TaskTestCase(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        cache.clear()
+        task_metrics.reset()
+
+
+@override_settings(TASK_BROKER='task_queue.brokers.ImmediateBroker')
+class ExecutionTests(TaskTestCase):
+
+    def test_retries_until_success(self):
+        with self.assertLogs('task_queue.worker', 'WARNING'):
+            record.delay('a', fail_times=2)
+
+        self.assertEqual(calls, ['a', 'a', 'a'])
+        stats = task_metrics.snapshot()['task_queue.tests.record']
+        self.assertEqual((stats['retried'], stats['succeeded'], stats['failed']), (2, 1, 0))
+
+    def test_gives_up_after_max_retries(self):
+        with self.assertLogs('task_queue.worker', 'WARNING'):
+            record.delay('b', fail_times=5)
+
+        self.assertEqual(calls, ['b', 'b', 'b'])
+        self.assertEqual(task_metrics.snapshot()['task_queue.tests.record']['failed'], 1)
+
+    def test_unexpected_errors_are_not_retried(self):
+        with self.assertLogs('task_queue.worker', 'ERROR'):
+            broken.delay()
+
+        stats = task_metrics.snapshot()['task_queue.tests.broken']
+        self.assertEqual((stats['retried'], stats['failed']), (0, 1))
+
+    def test_arguments_are_json_encoded(self):
+        record.delay(('x', 1))
+
+        self.assertEqual(calls, [['x', 1]])
+
+
+class DatabaseBrokerTests(TaskTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.broker = DatabaseBroker()
+
+    def test_message_is_claimed_once(self):
+        self.broker.enqueue(_message('c'))
+
+        [message] = self.broker.reserve(['default'], 10)
+        self.assertEqual(message.attempts, 1)
+        self.assertEqual(self.broker.reserve(['default'], 10), [])
+
+        execute(message, self.broker)
+        self.assertEqual(calls, ['c'])
+        self.assertFalse(QueuedTask.objects.exists())
+
+    def test_queues_are_taken_in_priority_order(self):
+        self.broker.enqueue(_message('low'))
+        self.broker.enqueue(_message('high', queue='otp'))
+
+        messages = self.broker.reserve(['otp', 'default'], 1)
+        self.assertEqual([message.args for message in messages], [['high']])
+
+    def test_retry_waits_for_backoff(self):
+        self.broker.enqueue(_message('d'))
+        [message] = self.broker.reserve(['default'], 10)
+
+        self.broker.retry(message, 60, 'Retry: not yet')
+
+        row = QueuedTask.objects.get()
+        self.assertEqual((row.status, row.attempts, row.last_error), ('queued', 1, 'Retry: not yet'))
+        self.assertEqual(self.broker.reserve(['default'], 10), [])
+
+    def test_failed_message_is_kept(self):
+        self.broker.enqueue(_message('e'))
+        [message] = self.broker.reserve(['default'], 10)
+
+        self.broker.fail(message, 'ValueError: broken')
+
+        self.assertEqual(QueuedTask.objects.get().status, 'failed')
+        self.assertEqual(self.broker.queue_sizes(), {})
+
+    def test_expired_claim_is_recovered(self):
+        self.broker.enqueue(_message('f'))
+        self.broker.reserve(['default'], 10)
+        QueuedTask.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+
+        self.assertEqual(self.broker.recover(), 1)
+        [message] = self.broker.reserve(['default'], 10)
+        self.assertEqual(message.attempts, 2)
+
+
+@override_settings(TASK_BROKER='task_queue.brokers.ImmediateBroker')
+class SchedulerTests(TaskTestCase):
+
+    def test_queues_each_interval_once_across_schedulers(self):
+        now = 1000 * 5 * 60
+        first, second = Scheduler([tick]), Scheduler([tick])
+
+        first.tick(now)
+        first.tick(now + 1)
+        second.tick(now + 1)
+        self.assertEqual(calls, ['tick'])
+
+        second.tick(now + 5 * 60)
+        self.assertEqual(calls, ['tick', 'tick'])
+
+
+def _message(value, queue='default'):
+    return Message('task_queue.tests.record', [value], queue=queue)
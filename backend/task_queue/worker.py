@@ -0,0 +1,149 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import close_old_connections
+
+from .brokers import get_broker
+from .metrics import task_metrics
+from .registry import Retry, get_periodic_tasks, get_task
+
+logger = logging.getLogger(__name__)
+
+
+def execute(message, broker):
+    """
+    Run a message's task and settle it with the broker: ack it on success,
+    retry it if the task allows another attempt, fail it otherwise.
+    """
+    try:
+        task = get_task(message.name)
+    except KeyError:
+        logger.error(f"Unknown task {message.name}, discarding {message.id}")
+        broker.fail(message, f'Unknown task {message.name}')
+        return
+
+    waited = max(0.0, time.time() - message.run_at)
+    started = time.monotonic()
+    try:
+        task.func(*message.args, **message.kwargs)
+    except Exception as e:
+        runtime = time.monotonic() - started
+        error = f'{type(e).__name__}: {e}'
+        delay = task.retry_delay(e, message.attempts)
+        if delay is None:
+            task_metrics.record(task.name, 'failed', runtime, waited)
+            logger.error(
+                f"Task {task.name} failed (attempt {message.attempts}): {error}",
+                exc_info=not isinstance(e, Retry),
+            )
+            broker.fail(message, error)
+        else:
+            task_metrics.record(task.name, 'retried', runtime, waited)
+            logger.warning(f"Retrying task {task.name} in {delay}s after: {error}")
+            broker.retry(message, delay, error)
+    else:
+        runtime = time.monotonic() - started
+        task_metrics.record(task.name, 'succeeded', runtime, waited)
+        logger.info(f"Task {task.name} succeeded in {runtime:.3f}s after waiting {waited:.3f}s")
+        broker.ack(message)
+
+
+def process(message, broker):
+    """`execute` for pool threads, which manage their own database connections."""
+    close_old_connections()
+    try:
+        execute(message, broker)
+    finally:
+        close_old_connections()
+
+
+class Scheduler:
+    """
+    Queues periodic tasks once per interval. Intervals are aligned to the
+    epoch and claimed in the TASK_SCHEDULE_CACHE_ALIAS cache, so several
+    workers running a scheduler still queue each interval once, provided
+    that cache is shared. Schedules `tasks`, by default every registered
+    periodic task.
+    """
+
+    def __init__(self, tasks=None):
+        self.tasks = tasks
+        self.last_intervals = {}
+
+    def tick(self, now=None):
+        """Queue the periodic tasks that are due; return them."""
+        now = now or time.time()
+        cache = caches[settings.TASK_SCHEDULE_CACHE_ALIAS]
+        tasks = self.tasks if self.tasks is not None else get_periodic_tasks()
+        queued = []
+
+        for task in tasks:
+            every = task.every.total_seconds()
+            interval = int(now // every)
+            if self.last_intervals.get(task.name) == interval:
+                continue
+            self.last_intervals[task.name] = interval
+
+            if cache.add(f'tasks:periodic:{task.name}:{interval}', True, timeout=int(every) + 60):
+                task.delay()
+                queued.append(task)
+
+        return queued
+
+
+class Worker:
+    """
+    Claims messages from a consuming broker and runs them on a pool of
+    `concurrency` threads, taking `queues` in priority order. Runs the
+    scheduler, if given, between polls.
+    """
+
+    def __init__(self, queues, concurrency, broker=None, scheduler=None):
+        self.queues = queues
+        self.concurrency = concurrency
+        self.broker = broker or get_broker()
+        self.scheduler = scheduler
+        self._stopping = threading.Event()
+
+    def stop(self):
+        """Stop claiming messages; `run` returns once the running tasks finish."""
+        self._stopping.set()
+
+    def run(self, burst=False):
+        """Work until stopped, or with `burst` until no message is ready."""
+        poll_interval = settings.TASK_POLL_INTERVAL
+        next_recovery = 0
+        running = set()
+
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='task-worker') as pool:
+            while not self._stopping.is_set():
+                close_old_connections()
+                if self.scheduler is not None:
+                    self.scheduler.tick()
+
+                messages = []
+                if self.broker.consumes:
+                    if time.monotonic() >= next_recovery:
+                        recovered = self.broker.recover()
+                        if recovered:
+                            logger.warning(f"Requeued {recovered} tasks with expired claims")
+                        next_recovery = time.monotonic() + settings.TASK_VISIBILITY_TIMEOUT / 2
+
+                    free = self.concurrency - len(running)
+                    if free:
+                        messages = self.broker.reserve(self.queues, free)
+                    for message in messages:
+                        running.add(pool.submit(process, message, self.broker))
+
+                if burst and not messages and not running:
+                    break
+                if not messages:
+                    if running:
+                        wait(running, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    else:
+                        self._stopping.wait(poll_interval)
+                running = {future for future in running if not future.done()}
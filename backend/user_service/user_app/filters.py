@@ -0,0 +1,35 @@
+from dodo_backend.exports import parse_bool, parse_moment
+
+# Query params of the list endpoints, their exports and `export_users`: {param: (lookup, parse)}
+USER_FILTERS = {
+    'user_type': ('user_type', str),
+    'is_active': ('is_active', parse_bool),
+    'is_staff': ('is_staff', parse_bool),
+    'joined_after': ('date_joined__gte', parse_moment),
+    'joined_before': ('date_joined__lt', parse_moment),
+}
+
+VENDOR_PROFILE_FILTERS = {
+    'is_verified': ('is_verified', parse_bool),
+    'is_active': ('user__is_active', parse_bool),
+    'created_after': ('created_at__gte', parse_moment),
+    'created_before': ('created_at__lt', parse_moment),
+}
+
+USER_EXPORT_COLUMNS = {
+    name: name for name in
+    ['id', 'mobile', 'email', 'first_name', 'last_name', 'user_type', 'is_active', 'is_staff', 'date_joined']
+}
+
+VENDOR_PROFILE_EXPORT_COLUMNS = {
+    'id': 'id',
+    'user_id': 'user_id',
+    'mobile': 'user__mobile',
+    'email': 'user__email',
+    'business_name': 'business_name',
+    'business_address': 'business_address',
+    'service_areas': 'service_areas',
+    'is_verified': 'is_verified',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
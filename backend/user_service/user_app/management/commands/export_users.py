@@ -0,0 +1,16 @@
+from dodo_backend.exports import ExportCommand
+from user_service.user_app.filters import (
+    USER_EXPORT_COLUMNS,
+    USER_FILTERS,
+    VENDOR_PROFILE_EXPORT_COLUMNS,
+    VENDOR_PROFILE_FILTERS,
+)
+from user_service.user_app.models import User, VendorProfile
+
+
+class Command(ExportCommand):
+    help = 'Write all users or vendor profiles as CSV or NDJSON'
+    exports = {
+        'users': (User.objects.all, USER_EXPORT_COLUMNS, USER_FILTERS),
+        'vendor_profiles': (VendorProfile.objects.all, VENDOR_PROFILE_EXPORT_COLUMNS, VENDOR_PROFILE_FILTERS),
+    }
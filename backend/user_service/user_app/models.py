@@ -58,6 +58,12 @@ class User(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'mobile'  # Mobile is the primary identifier
     REQUIRED_FIELDS = []  # No required fields for creating a user
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the user list, newest first
+            models.Index(fields=['date_joined', 'id'], name='user_date_joined_idx'),
+        ]
+
     def __str__(self):
         if self.mobile:
             return self.mobile
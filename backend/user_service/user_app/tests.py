@@ -1,3 +1,124 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from .models import User, CustomerProfile, VendorProfile, AdminProfile
+
+
+class ProfileListQueryCountTests(TestCase):
+    """Profile listings must load the nested user in the same query."""
+
+    def setUp(self):
+        self.admin = User.objects.create(email='admin@example.com', user_type='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+
+    def create_profiles(self, count, start=0):
+        for i in range(start, start + count):
+            user = User.objects.create(mobile=f'90000000{i:02d}')
+            CustomerProfile.objects.create(user=user)
+            VendorProfile.objects.create(user=user, business_name=f'Vendor {i}', business_address='')
+            AdminProfile.objects.create(user=user)
+
+    def assert_constant_queries(self, url):
+        # COUNT + SELECT joined with user
+        with self.assertNumQueries(2):
+            response = self.client.get(url)
+        return response
+
+    def test_query_count_is_constant_per_page(self):
+        urls = [
+            '/api/users/customer-profiles/',
+            '/api/users/vendor-profiles/',
+            '/api/users/admin-profiles/',
+        ]
+
+        self.create_profiles(1)
+        for url in urls:
+            self.assert_constant_queries(url)
+
+        self.create_profiles(9, start=1)
+        for url in urls:
+            response = self.assert_constant_queries(url)
+            self.assertEqual(len(response.json()['results']), 10)
+
+    def test_lists_skip_unused_user_columns(self):
+        self.create_profiles(1)
+        for url in ['/api/users/users/', '/api/users/customer-profiles/', '/api/users/vendor-profiles/']:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            select = queries.captured_queries[-1]['sql']
+            self.assertIn('"mobile"', select)
+            self.assertNotIn('"password"', select)
+            self.assertNotIn('"last_login"', select)
+
+
+class ExportTests(TestCase):
+    """Exports stream what the list endpoints return, in one query whatever the row count."""
+
+    def setUp(self):
+        self.admin = User.objects.create(email='admin@example.com', user_type='admin', is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(user=self.admin)
+        for i in range(25):
+            user = User.objects.create(mobile=f'90000000{i:02d}', user_type='vendor', is_active=i % 5 != 0)
+            VendorProfile.objects.create(
+                user=user, business_name=f'Vendor {i}', business_address='Pune', is_verified=i % 2 == 0
+            )
+
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        # Rows are read while the response is consumed
+        with self.assertNumQueries(1):
+            return b''.join(response.streaming_content).decode()
+
+    def test_users_csv_with_list_filters(self):
+        content = self.export('/api/users/users/export/', user_type='vendor', is_active='false')
+
+        lines = content.splitlines()
+        self.assertEqual(lines[0], 'id,mobile,email,first_name,last_name,user_type,is_active,is_staff,date_joined')
+        self.assertEqual(len(lines), 1 + 5)
+        self.assertEqual(
+            len(lines) - 1,
+            self.client.get('/api/users/users/', {'user_type': 'vendor', 'is_active': 'false'}).json()['count'],
+        )
+
+    def test_csv_escapes_formulas(self):
+        User.objects.filter(mobile='9000000001').update(first_name='=HYPERLINK("http://x")', last_name='-1')
+
+        content = self.export('/api/users/users/export/', user_type='vendor', is_active='true')
+
+        row = next(line for line in content.splitlines() if ',9000000001,' in line)
+        self.assertIn(',"\'=HYPERLINK(""http://x"")",\'-1,', row)
+
+    def test_vendor_profiles_ndjson(self):
+        content = self.export('/api/users/vendor-profiles/export/', file_format='ndjson', is_verified='true')
+
+        rows = [json.loads(line) for line in content.splitlines()]
+        self.assertEqual(len(rows), 13)
+        self.assertEqual(rows[0]['mobile'], '9000000000')
+        self.assertEqual(rows[0]['business_name'], 'Vendor 0')
+
+    def test_regular_users_export_only_themselves(self):
+        user = User.objects.get(mobile='9000000001')
+        self.client.force_authenticate(user=user)
+
+        content = self.export('/api/users/users/export/', file_format='ndjson')
+        self.assertEqual([json.loads(line)['id'] for line in content.splitlines()], [user.id])
+
+    def test_invalid_filter(self):
+        response = self.client.get('/api/users/users/export/', {'joined_after': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_command(self):
+        out = StringIO()
+        call_command('export_users', 'vendor_profiles', '--format', 'ndjson', '--filter', 'is_active=false', stdout=out)
 
-# Create your tests here.
+        self.assertEqual(len(out.getvalue().splitlines()), 5)
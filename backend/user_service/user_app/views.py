@@ -3,6 +3,8 @@ from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.shortcuts import get_object_or_404
 
+from dodo_backend.exports import ExportMixin, apply_filters
+from .filters import USER_EXPORT_COLUMNS, USER_FILTERS, VENDOR_PROFILE_EXPORT_COLUMNS, VENDOR_PROFILE_FILTERS
 from .models import User, CustomerProfile, VendorProfile, AdminProfile
 from .serializers import (
     UserSerializer,
@@ -15,6 +17,11 @@ from .serializers import (
 )
 
 
+def profile_list_columns(serializer_class):
+    """Columns read when listing profiles: the profile's own and the nested user's."""
+    return [*serializer_class.Meta.fields, *(f'user__{name}' for name in UserSerializer.Meta.fields)]
+
+
 class CustomerRegistrationView(views.APIView):
     permission_classes = [permissions.AllowAny]
 
@@ -68,21 +75,33 @@ class AdminRegistrationView(views.APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ExportMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_columns = USER_EXPORT_COLUMNS
+    export_filename = 'users'
+    cursor_ordering = '-date_joined'
 
     def get_queryset(self):
         # Regular users can only see their own profile
         if not self.request.user.is_staff and not self.request.user.is_superuser:
-            return User.objects.filter(id=self.request.user.id)
+            queryset = User.objects.filter(id=self.request.user.id)
         # Admin users can see all users
-        return User.objects.all()
+        else:
+            queryset = User.objects.all()
+
+        if self.action in ('list', 'export'):
+            queryset = apply_filters(queryset, self.request.query_params, USER_FILTERS)
+        if self.action == 'list':
+            # Skips the password hash, last_login and other columns the list does not show
+            queryset = queryset.only(*UserSerializer.Meta.fields)
+        return queryset
 
     @action(detail=False, methods=['get'])
     def me(self, request):
-        serializer = self.get_serializer(request.user)
+        # Token claims such as user_type and is_active may predate a change; show the stored row
+        serializer = self.get_serializer(getattr(request.user, 'instance', request.user))
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
@@ -117,29 +136,43 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 class CustomerProfileViewSet(viewsets.ModelViewSet):
-    queryset = CustomerProfile.objects.all()
+    queryset = CustomerProfile.objects.select_related('user')
     serializer_class = CustomerProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Regular users can only see their own profile
         if not self.request.user.is_staff and not self.request.user.is_superuser:
-            return CustomerProfile.objects.filter(user=self.request.user)
+            queryset = CustomerProfile.objects.select_related('user').filter(user_id=self.request.user.id)
         # Admin users can see all profiles
-        return CustomerProfile.objects.all()
+        else:
+            queryset = CustomerProfile.objects.select_related('user')
 
+        if self.action == 'list':
+            queryset = queryset.only(*profile_list_columns(self.serializer_class))
+        return queryset
 
-class VendorProfileViewSet(viewsets.ModelViewSet):
-    queryset = VendorProfile.objects.all()
+
+class VendorProfileViewSet(ExportMixin, viewsets.ModelViewSet):
+    queryset = VendorProfile.objects.select_related('user')
     serializer_class = VendorProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
+    export_columns = VENDOR_PROFILE_EXPORT_COLUMNS
+    export_filename = 'vendor_profiles'
 
     def get_queryset(self):
         # Regular users can only see their own profile
         if not self.request.user.is_staff and not self.request.user.is_superuser:
-            return VendorProfile.objects.filter(user=self.request.user)
+            queryset = VendorProfile.objects.select_related('user').filter(user_id=self.request.user.id)
         # Admin users can see all profiles
-        return VendorProfile.objects.all()
+        else:
+            queryset = VendorProfile.objects.select_related('user')
+
+        if self.action in ('list', 'export'):
+            queryset = apply_filters(queryset, self.request.query_params, VENDOR_PROFILE_FILTERS)
+        if self.action == 'list':
+            queryset = queryset.only(*profile_list_columns(self.serializer_class))
+        return queryset
 
     @action(detail=True, methods=['post'])
     def verify(self, request, pk=None):
@@ -158,13 +191,18 @@ class VendorProfileViewSet(viewsets.ModelViewSet):
 
 
 class AdminProfileViewSet(viewsets.ModelViewSet):
-    queryset = AdminProfile.objects.all()
+    queryset = AdminProfile.objects.select_related('user')
     serializer_class = AdminProfileSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
         # Regular users can only see their own profile
         if not self.request.user.is_staff and not self.request.user.is_superuser:
-            return AdminProfile.objects.filter(user=self.request.user)
+            queryset = AdminProfile.objects.select_related('user').filter(user_id=self.request.user.id)
         # Admin users can see all profiles
-        return AdminProfile.objects.all()
+        else:
+            queryset = AdminProfile.objects.select_related('user')
+
+        if self.action == 'list':
+            queryset = queryset.only(*profile_list_columns(self.serializer_class))
+        return queryset